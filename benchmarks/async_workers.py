@@ -0,0 +1,96 @@
+"""
+Many slow clients: sync gunicorn workers versus uvicorn workers running the async views.
+
+Both servers run --workers processes against the same seeded scratch
+database; the ASGI one is gunicorn with uvicorn.workers.UvicornWorker serving
+personalwebsite.asgi, so home, about, portfolio and contact are the async
+views. Each of --concurrency clients trickles its request out over
+--client-delay-ms, like a visitor on a slow mobile link, and cycles through
+the four public pages. A sync worker is tied up from accepting a connection
+until the request has fully arrived; an event loop serves other requests in
+the meantime. Run with
+--client-delay-ms 0 to see the per-request cost on fast clients too.
+
+    python -m benchmarks.async_workers --concurrency 64 --client-delay-ms 100
+"""
+import argparse
+import itertools
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import setup_django, benchmark_environment, summarize, report
+
+setup_django()
+
+from django.urls import reverse  # noqa: E402
+
+from benchmarks.routes import gunicorn_server, seed  # noqa: E402
+
+SERVERS = {
+    'sync gunicorn': ('personalwebsite.wsgi:application', 'sync'),
+    'uvicorn workers': ('personalwebsite.asgi:application', 'uvicorn.workers.UvicornWorker'),
+}
+
+
+def slow_get(port, path, delay, pieces=10):
+    """GET path, trickling the request out in pieces over delay seconds; returns (seconds, status)"""
+    request = f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nUser-Agent: slow-client\r\nConnection: close\r\n\r\n'.encode()
+    step = -(-len(request) // pieces)
+    t0 = time.perf_counter()
+    with socket.create_connection(('127.0.0.1', port), timeout=60) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        for start in range(0, len(request), step):
+            if start and delay:
+                time.sleep(delay / pieces)
+            sock.sendall(request[start:start + step])
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    status = int(b''.join(chunks).split(b' ', 2)[1])
+    return time.perf_counter() - t0, status
+
+
+def run(port, requests, concurrency, delay):
+    paths = [reverse(f'pages:{name}') for name in ('home', 'about', 'portfolio', 'contact')]
+    for path in paths:
+        # Fill the page cache so every server starts warm
+        slow_get(port, path, 0)
+    cycle = itertools.cycle(paths)
+    jobs = [next(cycle) for _ in range(requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        outcomes = list(pool.map(lambda path: slow_get(port, path, delay), jobs))
+    result = summarize([elapsed for elapsed, _ in outcomes], time.perf_counter() - started)
+    result['errors'] = sum(status != 200 for _, status in outcomes)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--client-delay-ms', type=float, default=100)
+    args = parser.parse_args()
+
+    results = {}
+    with benchmark_environment():
+        seed(1)
+        for label, (app, worker_class) in SERVERS.items():
+            with gunicorn_server(args.workers, app, worker_class) as port:
+                results[label] = run(port, args.requests, args.concurrency, args.client_delay_ms / 1000)
+
+    for label, result in results.items():
+        report(label, result)
+        if result['errors']:
+            print(f"  {result['errors']} non-200 responses")
+    sync, uvicorn = results['sync gunicorn'], results['uvicorn workers']
+    print(f"throughput: {uvicorn['rps'] / sync['rps']:.2f}x, p95 latency: {sync['p95_ms'] / uvicorn['p95_ms']:.2f}x lower")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Helpers shared by the benchmark scripts in this package.
+
+Every benchmark runs against a throwaway test database and an in-memory cache,
+so it never touches db.sqlite3, a configured Postgres database or the shared
+page cache. Run a benchmark from the repository root, e.g.::
+
+    python -m benchmarks.guest_sessions
+"""
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'personalwebsite.settings')
+    import django
+    django.setup()
+
+
+BENCHMARK_SETTINGS = {
+    'STATICFILES_STORAGE': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+}
+
+
+@contextmanager
+def benchmark_environment(**overrides):
+    """Create a test database and apply benchmark settings for the duration"""
+    from django.db import connection
+    from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    settings_override = override_settings(**{**BENCHMARK_SETTINGS, **overrides})
+    settings_override.enable()
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    scratch_dir = None
+    if connection.vendor == 'sqlite':
+        # A fresh on-disk file per run: in-memory SQLite survives as long as any
+        # thread still holds a connection, and real deployments use a file anyway
+        scratch_dir = tempfile.mkdtemp(prefix='benchmark-')
+        test_settings['NAME'] = os.path.join(scratch_dir, 'db.sqlite3')
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+        settings_override.disable()
+        teardown_test_environment()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples, elapsed):
+    """Latency percentiles in milliseconds plus throughput for a list of per-call durations"""
+    return {
+        'requests': len(samples),
+        'rps': len(samples) / elapsed if elapsed else 0.0,
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+    }
+
+
+def measure(func, iterations, warmup=10):
+    """Call func() repeatedly and return summarize() of the timings"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def report(label, result):
+    print(
+        f"{label:<28} {result['rps']:>9.1f} req/s   "
+        f"p50 {result['p50_ms']:>7.2f} ms   p95 {result['p95_ms']:>7.2f} ms   p99 {result['p99_ms']:>7.2f} ms"
+    )
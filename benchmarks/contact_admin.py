@@ -0,0 +1,111 @@
+"""
+ContactMessage changelist at inbox scale: stock ModelAdmin versus the keyset admin.
+
+Seeds --rows messages (1M by default) straight through the database cursor,
+then renders the changelist as a superuser: the newest page, a page 90% of
+the way down, a full-text search and the unread filter. The stock admin uses
+OFFSET pagination, two COUNT(*) queries and icontains search.
+
+    python -m benchmarks.contact_admin --rows 1000000 --requests 10
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from benchmarks.common import setup_django, benchmark_environment, measure, report
+
+setup_django()
+
+from django.contrib import admin  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from pages import inbox  # noqa: E402
+from pages.admin import ContactMessageAdmin  # noqa: E402
+from pages.models import ContactMessage  # noqa: E402
+
+WORDS = 'hello project website offer quote meeting python django cheap free winner loan'.split()
+
+
+class StockContactMessageAdmin(admin.ModelAdmin):
+    """The ContactMessage admin as it was before keyset pagination"""
+    list_display = ['name', 'email', 'subject', 'read', 'created_at']
+    list_filter = ['read', 'created_at']
+    search_fields = ['name', 'email', 'subject', 'message']
+    list_editable = ['read']
+
+
+def seed(rows, chunk=20000):
+    rng = random.Random(42)
+    now = timezone.now()
+    sql = (
+        'INSERT INTO pages_contactmessage (name, email, subject, message, read, created_at) '
+        'VALUES (%s, %s, %s, %s, %s, %s)'
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, rows, chunk):
+            cursor.executemany(sql, [
+                (
+                    f'Sender {i}', f'sender{i}@example.com', ' '.join(rng.choices(WORDS, k=3)),
+                    ' '.join(rng.choices(WORDS, k=30)) + (' invoice' if i % 1000 == 0 else ''),
+                    i % 50 != 0, connection.ops.adapt_datetimefield_value(now - timedelta(seconds=i)),
+                )
+                for i in range(start, min(start + chunk, rows))
+            ])
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--requests', type=int, default=10)
+    args = parser.parse_args()
+
+    with benchmark_environment():
+        started = time.perf_counter()
+        seed(args.rows)
+        print(f'seeded {args.rows} messages in {time.perf_counter() - started:.1f}s')
+
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        factory = RequestFactory()
+        site = admin.AdminSite(name='admin')
+        stock = StockContactMessageAdmin(ContactMessage, site)
+        keyset = ContactMessageAdmin(ContactMessage, site)
+
+        def view(model_admin, query=''):
+            def call():
+                request = factory.get('/admin/pages/contactmessage/' + query)
+                request.user = user
+                response = model_admin.changelist_view(request)
+                response.render()
+                assert response.status_code == 200, response.status_code
+            return call
+
+        per_page = keyset.list_per_page
+        deep_offset = int(args.rows * 0.9) // per_page * per_page
+        cursor_row = ContactMessage.objects.order_by('-created_at', '-pk').values_list('created_at', 'pk')[deep_offset - 1]
+        runs = {
+            'stock first page': view(stock),
+            'keyset first page': view(keyset),
+            'stock 90% deep': view(stock, f'?p={deep_offset // per_page + 1}'),
+            'keyset 90% deep': view(keyset, f'?after={inbox.encode_cursor(*cursor_row)}'),
+            'stock search': view(stock, '?q=invoice'),
+            'keyset search': view(keyset, '?q=invoice'),
+            'stock unread': view(stock, '?read__exact=0'),
+            'keyset unread': view(keyset, '?read__exact=0'),
+        }
+        results = {label: measure(func, args.requests, warmup=1) for label, func in runs.items()}
+
+    for label, result in results.items():
+        report(label, result)
+    for case in ('first page', '90% deep', 'search', 'unread'):
+        stock_ms, keyset_ms = results[f'stock {case}']['p50_ms'], results[f'keyset {case}']['p50_ms']
+        print(f'{case}: {stock_ms / keyset_ms:.1f}x faster at p50')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Contact form POST throughput: synchronous INSERT versus the write-behind spool.
+
+Concurrent clients submit the contact form through the full middleware stack.
+--db-latency-ms adds a delay to every query to stand in for the network round
+trip to a hosted Postgres, which is where the synchronous path loses its time.
+
+    python -m benchmarks.contact_spool --requests 500 --concurrency 8 --db-latency-ms 5
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import setup_django, benchmark_environment, summarize, report
+
+setup_django()
+
+from django.db import connection, connections  # noqa: E402
+from django.test import Client  # noqa: E402
+
+from pages import spool  # noqa: E402
+from pages.models import ContactMessage  # noqa: E402
+
+SUBMISSION = {
+    'name': 'Load Test',
+    'email': 'load@example.com',
+    'subject': 'Benchmark',
+    'message': 'Hello from the contact form benchmark. ' * 10,
+}
+
+
+def run(requests, concurrency, db_latency, spool_dir):
+    def delayed(execute, sql, params, many, context):
+        time.sleep(db_latency)
+        return execute(sql, params, many, context)
+
+    def post(_):
+        with connection.execute_wrapper(delayed):
+            t0 = time.perf_counter()
+            response = Client().post('/contact/', SUBMISSION, HTTP_HX_REQUEST='true')
+            elapsed = time.perf_counter() - t0
+        assert response.status_code == 200, response.status_code
+        connections.close_all()
+        return elapsed
+
+    with benchmark_environment(CONTACT_SPOOL_DIR=spool_dir, CONTACT_SPOOL_FLUSH_INTERVAL=0):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            samples = list(pool.map(post, range(requests)))
+        result = summarize(samples, time.perf_counter() - started)
+
+        if spool_dir:
+            flush_started = time.perf_counter()
+            spool.flush()
+            result['flush_s'] = time.perf_counter() - flush_started
+        result['saved'] = ContactMessage.objects.count()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--db-latency-ms', type=float, default=5.0)
+    args = parser.parse_args()
+    latency = args.db_latency_ms / 1000
+
+    sync = run(args.requests, args.concurrency, latency, '')
+    spool_dir = tempfile.mkdtemp(prefix='contact-spool-')
+    try:
+        spooled = run(args.requests, args.concurrency, latency, spool_dir)
+    finally:
+        shutil.rmtree(spool_dir)
+
+    report('synchronous INSERT', sync)
+    report('spool + bulk flush', spooled)
+    print(f"rows saved: synchronous {sync['saved']}, spooled {spooled['saved']} (flush took {spooled['flush_s']:.3f} s)")
+    print(f"POST throughput gain: {spooled['rps'] / sync['rps']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Portfolio technology filtering: the in-memory index versus SQL joins.
+
+Seeds --projects projects with six of --technologies technologies each, then
+times one filter (matching projects plus a count for every technology) for a
+single technology, two technologies matched all, and two matched any. "index"
+is pages.facets with the index already built; "join" answers the same
+question with joins through Project.technologies and a grouped COUNT.
+"rebuild" is a full index build, as after a change made by another worker.
+
+    python -m benchmarks.facets --projects 10000 --technologies 200
+"""
+import argparse
+import random
+
+from benchmarks.common import setup_django, benchmark_environment, measure, report
+
+setup_django()
+
+from django.db import connection, transaction  # noqa: E402
+from django.db.models import Count, Q  # noqa: E402
+
+from pages import facets  # noqa: E402
+from pages.models import Project, Technology  # noqa: E402
+
+FILTERS = {
+    'one': (['Technology 0'], True),
+    'two, all': (['Technology 0', 'Technology 1'], True),
+    'two, any': (['Technology 0', 'Technology 1'], False),
+}
+
+
+def seed(projects, technologies):
+    rng = random.Random(42)
+    with transaction.atomic():
+        techs = Technology.objects.bulk_create(Technology(name=f'Technology {i}') for i in range(technologies))
+        rows = Project.objects.bulk_create(Project(title=f'Project {i}', description='A project') for i in range(projects))
+        through = Project.technologies.through
+        # Skewed like real portfolios: a few technologies appear on most projects
+        weights = [1 / (rank + 1) for rank in range(technologies)]
+        through.objects.bulk_create(
+            (
+                through(project_id=project.pk, technology_id=tech.pk)
+                for project in rows
+                for tech in set(rng.choices(techs, weights=weights, k=6))
+            ),
+            batch_size=5000,
+        )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def joined(selected, match_all):
+    projects = Project.objects.all()
+    if match_all:
+        for name in selected:
+            projects = projects.filter(technologies__name=name)
+    else:
+        projects = projects.filter(technologies__name__in=selected).distinct()
+    ids = list(projects.values_list('pk', flat=True))
+    scope = Q(projects__in=projects) if match_all else Q()
+    counts = dict(Technology.objects.annotate(count=Count('projects', filter=scope)).values_list('name', 'count'))
+    return ids, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--projects', type=int, default=10000)
+    parser.add_argument('--technologies', type=int, default=200)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    with benchmark_environment():
+        seed(args.projects, args.technologies)
+        report('rebuild', measure(facets.build, max(args.iterations // 5, 3), warmup=1))
+        facets.get_index()
+        for label, (selected, match_all) in FILTERS.items():
+            ids, found = facets.facets(selected, match_all, '/portfolio/')
+            expected_ids, expected_counts = joined(selected, match_all)
+            assert sorted(ids) == sorted(expected_ids), label
+            assert {facet.name: facet.count for facet in found} == expected_counts, label
+            print(f'{label}: {len(ids)} projects')
+            report(f'{label}: index', measure(lambda: facets.facets(selected, match_all, '/portfolio/'), args.iterations))
+            report(f'{label}: join', measure(lambda: joined(selected, match_all), args.iterations, warmup=2))
+
+
+if __name__ == '__main__':
+    main()
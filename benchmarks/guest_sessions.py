@@ -0,0 +1,72 @@
+"""
+Cold-visitor throughput with the old guest auto-login versus sessionless guests.
+
+Each request comes from a fresh client with no cookies, as a first-time visitor
+or a crawler would. The "before" run swaps in a copy of the previous middleware,
+which did get_or_create + login() and therefore wrote a session row per visitor.
+
+    python -m benchmarks.guest_sessions --requests 2000
+"""
+import argparse
+
+from benchmarks.common import setup_django, benchmark_environment, measure, report
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import login  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.contrib.sessions.models import Session  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.utils.deprecation import MiddlewareMixin  # noqa: E402
+
+CURRENT_MIDDLEWARE = 'pages.middleware.AutoGuestLoginMiddleware'
+LEGACY_MIDDLEWARE = 'benchmarks.guest_sessions.LegacyGuestLoginMiddleware'
+
+
+class LegacyGuestLoginMiddleware(MiddlewareMixin):
+    """The database-backed guest login this benchmark compares against"""
+    def process_request(self, request):
+        if request.user.is_authenticated:
+            return None
+        if request.path.startswith('/login/') or request.path.startswith('/logout/'):
+            return None
+        guest_user, created = User.objects.get_or_create(
+            username='guest',
+            defaults={'email': 'guest@example.com', 'is_staff': False, 'is_superuser': False},
+        )
+        if created:
+            guest_user.set_unusable_password()
+            guest_user.save()
+        login(request, guest_user, backend='django.contrib.auth.backends.ModelBackend')
+        return None
+
+
+def run(legacy, path, requests):
+    middleware = list(settings.MIDDLEWARE)
+    if legacy:
+        middleware[middleware.index(CURRENT_MIDDLEWARE)] = LEGACY_MIDDLEWARE
+
+    with benchmark_environment(MIDDLEWARE=middleware):
+        result = measure(lambda: Client().get(path), requests)
+        result['sessions_created'] = Session.objects.count()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--path', default='/')
+    args = parser.parse_args()
+
+    before = run(True, args.path, args.requests)
+    after = run(False, args.path, args.requests)
+
+    report('before: guest login', before)
+    report('after: sessionless guest', after)
+    print(f"sessions created: before {before['sessions_created']}, after {after['sessions_created']}")
+    print(f"speedup: {after['rps'] / before['rps']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
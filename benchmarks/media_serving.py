@@ -0,0 +1,74 @@
+"""
+Media throughput: django.views.static.serve versus pages.media.serve_media.
+
+Both views are called directly with the same request and the body is fully
+consumed, so the numbers compare the Python-side cost of each path. Under
+gunicorn, serve_media additionally gets sendfile(2) through wsgi.file_wrapper,
+and repeat visitors mostly hit the 304 and immutable paths measured below.
+
+    python -m benchmarks.media_serving --size-kb 512 --requests 500
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+from benchmarks.common import setup_django, measure, report
+
+setup_django()
+
+from django.test import RequestFactory  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from django.views.static import serve  # noqa: E402
+
+from pages.media import serve_media  # noqa: E402
+
+FILE_NAME = 'projects/banner.0123456789ab.jpg'
+
+
+def consume(response):
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    else:
+        response.content
+    response.close()
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-kb', type=int, default=512)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    media_root = tempfile.mkdtemp(prefix='media-benchmark-')
+    try:
+        os.makedirs(os.path.join(media_root, 'projects'))
+        with open(os.path.join(media_root, FILE_NAME), 'wb') as handle:
+            handle.write(os.urandom(args.size_kb * 1024))
+
+        factory = RequestFactory()
+        url = '/media/' + FILE_NAME
+        with override_settings(MEDIA_ROOT=media_root):
+            etag = serve_media(factory.get(url), FILE_NAME)['ETag']
+            runs = {
+                'static.serve full': lambda: consume(serve(factory.get(url), FILE_NAME, document_root=media_root)),
+                'serve_media full': lambda: consume(serve_media(factory.get(url), FILE_NAME)),
+                'serve_media 64KB range': lambda: consume(serve_media(factory.get(url, HTTP_RANGE='bytes=0-65535'), FILE_NAME)),
+                'serve_media 304': lambda: consume(serve_media(factory.get(url, HTTP_IF_NONE_MATCH=etag), FILE_NAME)),
+            }
+            results = {label: measure(func, args.requests) for label, func in runs.items()}
+    finally:
+        shutil.rmtree(media_root)
+
+    for label, result in results.items():
+        report(label, result)
+    baseline = results['static.serve full']['rps']
+    megabytes = args.size_kb / 1024
+    print(f"full-file throughput: static.serve {baseline * megabytes:.0f} MB/s, "
+          f"serve_media {results['serve_media full']['rps'] * megabytes:.0f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Anonymous GET throughput of the public pages: the page cache versus the
+pre-rendered files, with a bare WSGI app reading the same files as the floor.
+
+All three run on the threaded wsgiref server from benchmarks.routes against
+the same seeded scratch database. "page cache" is the full stack serving
+cache hits; "pre-rendered" has PRERENDER_DIR set, so
+PrerenderedPagesMiddleware answers before sessions, authentication and the
+views; "raw file" skips Django altogether and is what static-file speed means
+on this server.
+
+    python -m benchmarks.prerender --requests 2000 --concurrency 8
+"""
+import argparse
+import shutil
+import tempfile
+
+from benchmarks.common import setup_django, benchmark_environment, report
+
+setup_django()
+
+from django.test.utils import override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from benchmarks.routes import Case, run_case, seed, wsgiref_server  # noqa: E402
+from pages import prerender  # noqa: E402
+
+
+def raw_file_app(root):
+    """WSGI app that returns the pre-rendered file for the path and nothing else"""
+    def app(environ, start_response):
+        partial = 'HTTP_HX_REQUEST' in environ
+        content = prerender.page_file(environ['PATH_INFO'], partial, root).read_bytes()
+        start_response('200 OK', [('Content-Type', prerender.CONTENT_TYPE), ('Content-Length', str(len(content)))])
+        return [content]
+    return app
+
+
+def run(server, requests, concurrency):
+    results = {}
+    with server as port:
+        for name in prerender.PAGES:
+            for hx in (False, True):
+                case = Case(f"{name}{' hx' if hx else ''}", 'GET', reverse(f'pages:{name}'), False, 200, hx)
+                headers = {'HX-Request': 'true'} if hx else {}
+                results[case.label] = run_case(port, case, headers, requests, concurrency, warmup=20)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000, help='measured requests per page')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='benchmark-prerender-')
+    try:
+        with benchmark_environment():
+            seed(1)
+            prerender.render_pages(root=root)
+            results = {'page cache': run(wsgiref_server(), args.requests, args.concurrency)}
+            with override_settings(PRERENDER_DIR=root):
+                results['pre-rendered'] = run(wsgiref_server(), args.requests, args.concurrency)
+            results['raw file'] = run(wsgiref_server(raw_file_app(root)), args.requests, args.concurrency)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    for mode, pages in results.items():
+        print(mode)
+        for label, result in pages.items():
+            report(f'  {label}', result)
+            if result['errors']:
+                print(f"    {result['errors']} non-200 responses")
+    totals = {mode: sum(result['rps'] for result in pages.values()) / len(pages) for mode, pages in results.items()}
+    print(
+        f"mean req/s: page cache {totals['page cache']:.0f}, pre-rendered {totals['pre-rendered']:.0f} "
+        f"({totals['pre-rendered'] / totals['page cache']:.1f}x), raw file {totals['raw file']:.0f} "
+        f"(pre-rendered at {totals['pre-rendered'] / totals['raw file']:.0%} of it)"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,391 @@
+"""
+Latency and throughput of every route in pages/urls.py over real HTTP.
+
+Seeds a scratch database with a portfolio-sized data set (--scale multiplies
+it), starts a WSGI server on a free local port and drives each route with
+--concurrency client threads: plain and HX-Request variants of every GET, plus
+the contact form POST. Admin-only routes are requested with a staff session;
+delete_experience targets an id that does not exist so the seeded data
+survives. Queries per request are counted in process, with the Django test
+client, on a warm page cache.
+
+    python -m benchmarks.routes --requests 500 --concurrency 8
+    python -m benchmarks.routes --server gunicorn --workers 3 --save baseline.json
+    python -m benchmarks.routes --compare baseline.json
+
+--server wsgiref (the default) runs a threaded wsgiref server in this process;
+--server gunicorn starts `gunicorn -c gunicorn.conf.py --workers N` as the
+Dockerfile does, against the same scratch database. --save writes the results as a JSON baseline;
+--compare prints the change against one and exits with status 1 when any
+route's p50 got more than --threshold percent slower.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from http.cookies import SimpleCookie
+from socketserver import ThreadingMixIn
+from urllib.parse import urlencode
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from benchmarks.common import setup_django, benchmark_environment, summarize
+
+setup_django()
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from pages import search, urls as page_urls  # noqa: E402
+from pages.models import ContactMessage, Experience, Project, Skill, Technology  # noqa: E402
+from pages.rendering import render_markdown  # noqa: E402
+
+GUNICORN_CONFIG = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+
+SUBMISSION = {
+    'name': 'Load Test',
+    'email': 'load@example.com',
+    'subject': 'Benchmark',
+    'message': 'Hello from the route benchmark. ' * 10,
+}
+
+# url name -> (kwargs, admin session, expected status); EXPERIENCE is replaced by a seeded id
+EXPERIENCE = object()
+ROUTES = {
+    'home': ({}, False, 200),
+    'about': ({}, False, 200),
+    'portfolio': ({}, False, 200),
+    'contact': ({}, False, 200),
+    'search': ({}, False, 200),
+    'experiences': ({}, True, 200),
+    'add_experience': ({}, True, 200),
+    'edit_experience': ({'experience_id': EXPERIENCE}, True, 200),
+    'delete_experience': ({'experience_id': 0}, True, 302),
+    'login': ({}, False, 200),
+    'logout': ({}, False, 302),
+    'cache_stats': ({}, True, 200),
+    'favicon': ({}, False, 204),
+}
+
+WORDS = (
+    'built deployed scalable pipeline model inference django python service latency '
+    'dashboard realtime api postgres docker search ranking users production team'
+).split()
+
+
+@dataclass
+class Case:
+    label: str
+    method: str
+    path: str
+    admin: bool
+    status: int
+    hx: bool
+    data: dict = field(default_factory=dict)
+
+
+def seed(scale):
+    """A portfolio-sized data set: dozens of projects and skills, a long contact inbox"""
+    rng = random.Random(42)
+
+    def text(words):
+        return ' '.join(rng.choices(WORDS, k=words)).capitalize() + '.'
+
+    technologies = Technology.objects.bulk_create(Technology(name=f'Technology {i}') for i in range(40 * scale))
+    projects = Project.objects.bulk_create(
+        Project(
+            title=f'Project {i}', description=text(80), github_url=f'https://github.com/example/project-{i}',
+            featured=i < 3, display_order=i,
+        )
+        for i in range(30 * scale)
+    )
+    through = Project.technologies.through
+    through.objects.bulk_create(
+        through(project_id=project.pk, technology_id=tech.pk)
+        for project in projects
+        for tech in rng.sample(technologies, 6)
+    )
+    categories = [code for code, _ in Skill.CATEGORY_CHOICES]
+    Skill.objects.bulk_create(
+        Skill(name=f'Skill {i}', category=categories[i % len(categories)], icon='*', level=rng.randint(40, 100), display_order=i)
+        for i in range(60 * scale)
+    )
+    experiences = []
+    for i in range(12 * scale):
+        description = '\n'.join(f'- {text(20)}' for _ in range(5))
+        experiences.append(Experience(
+            title=f'Engineer {i}', company=f'Company {i}', start_date=date(2015, 1, 1) + timedelta(days=120 * i),
+            description=description, description_html=render_markdown(description), display_order=i,
+        ))
+    Experience.objects.bulk_create(experiences)
+    ContactMessage.objects.bulk_create(
+        ContactMessage(name=f'Sender {i}', email=f'sender{i}@example.com', subject=text(4), message=text(60), read=i % 5 != 0)
+        for i in range(5000 * scale)
+    )
+    # bulk_create sends no signals
+    search.rebuild()
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def build_cases():
+    """Every route in pages/urls.py, each as a full page and as an HTMX partial"""
+    names = {pattern.name for pattern in page_urls.urlpatterns}
+    if names != set(ROUTES):
+        raise SystemExit(f'ROUTES is out of date with pages/urls.py: {sorted(names ^ set(ROUTES))}')
+    experience_id = Experience.objects.values_list('pk', flat=True).first()
+    cases = []
+    for name, (kwargs, admin, status) in ROUTES.items():
+        kwargs = {key: experience_id if value is EXPERIENCE else value for key, value in kwargs.items()}
+        path = reverse(f'pages:{name}', kwargs=kwargs)
+        for hx in (False, True):
+            cases.append(Case(f"{name}{' hx' if hx else ''}", 'GET', path, admin, status, hx))
+    for hx in (False, True):
+        cases.append(Case(f"contact POST{' hx' if hx else ''}", 'POST', reverse('pages:contact'), False, 200, hx, SUBMISSION))
+    return cases
+
+
+def count_queries(cases, admin_client):
+    """Queries per request for each case on a warm page cache"""
+    guest_client = Client()
+    counts = {}
+    for case in cases:
+        client = admin_client if case.admin else guest_client
+        extra = {'HTTP_HX_REQUEST': 'true'} if case.hx else {}
+        call = client.post if case.method == 'POST' else client.get
+        call(case.path, case.data, **extra)
+        with CaptureQueriesContext(connection) as queries:
+            call(case.path, case.data, **extra)
+        counts[case.label] = len(queries)
+    return counts
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+@contextmanager
+def wsgiref_server(app=None):
+    server = make_server('127.0.0.1', 0, app or get_wsgi_application(), ThreadingWSGIServer, QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_port
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'server exited with status {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f'server did not start listening on port {port}')
+
+
+@contextmanager
+def gunicorn_server(workers, app='personalwebsite.wsgi:application', worker_class='sync', config=None, env=None):
+    """
+    gunicorn pointed at the scratch database. Without a config file it runs
+    with gunicorn's defaults (gunicorn would otherwise pick up
+    ./gunicorn.conf.py); worker_class=None leaves the choice to the config.
+    """
+    port = free_port()
+    with tempfile.TemporaryDirectory(prefix='benchmark-gunicorn-') as scratch:
+        if config is None:
+            config = os.path.join(scratch, 'empty.conf.py')
+            open(config, 'w').close()
+        server_env = {
+            **os.environ,
+            'DATABASE_URL': f"sqlite:///{connection.settings_dict['NAME']}",
+            'CACHE_LOCATION': os.path.join(scratch, 'cache'),
+            'ALLOWED_HOSTS': '127.0.0.1',
+            **(env or {}),
+        }
+        command = [sys.executable, '-m', 'gunicorn', '--config', config, '--bind', f'127.0.0.1:{port}',
+                   '--workers', str(workers), '--log-level', 'warning', app]
+        if worker_class:
+            command[-1:-1] = ['--worker-class', worker_class]
+        process = subprocess.Popen(command, env=server_env)
+        try:
+            wait_for_port(port, process)
+            yield port
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def session_cookies(port, admin_session):
+    """Cookie headers for guests and for the admin, both carrying a CSRF token for the POST"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    conn.request('GET', reverse('pages:login'))
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    cookies = SimpleCookie(response.getheader('Set-Cookie'))
+    token = cookies['csrftoken'].value
+    guest = f'csrftoken={token}'
+    return token, guest, f'{guest}; sessionid={admin_session}'
+
+
+def run_case(port, case, headers, requests, concurrency, warmup):
+    body = urlencode(case.data) if case.method == 'POST' else None
+
+    def call(_):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        t0 = time.perf_counter()
+        conn.request(case.method, case.path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        elapsed = time.perf_counter() - t0
+        conn.close()
+        return elapsed, response.status
+
+    for _ in range(warmup):
+        call(None)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        outcomes = list(pool.map(call, range(requests)))
+    result = summarize([elapsed for elapsed, _ in outcomes], time.perf_counter() - started)
+    result['errors'] = sum(status != case.status for _, status in outcomes)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    print(f"{'route':<28} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'errors':>7}")
+    for label, result in results.items():
+        print(
+            f"{label:<28} {result['rps']:>9.1f} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+            f"{result['p99_ms']:>9.2f} {result['queries']:>8} {result['errors']:>7}"
+        )
+
+
+def compare(results, baseline, threshold):
+    """Print the change against a saved baseline; returns the labels that regressed"""
+    print(f"\ncompared with {baseline['meta'].get('commit') or 'baseline'} ({baseline['meta']['created']}):")
+    regressions = []
+    for label, result in results.items():
+        before = baseline['results'].get(label)
+        if before is None:
+            print(f'{label:<28} new')
+            continue
+        p50_change = (result['p50_ms'] / before['p50_ms'] - 1) * 100 if before['p50_ms'] else 0.0
+        rps_change = (result['rps'] / before['rps'] - 1) * 100 if before['rps'] else 0.0
+        query_change = result['queries'] - before['queries']
+        regressed = p50_change > threshold or query_change > 0
+        if regressed:
+            regressions.append(label)
+        print(
+            f"{label:<28} p50 {p50_change:>+7.1f}%   req/s {rps_change:>+7.1f}%   "
+            f"queries {query_change:>+3}{'   REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=('wsgiref', 'gunicorn'), default='wsgiref')
+    parser.add_argument('--workers', type=int, default=3, help='gunicorn workers')
+    parser.add_argument('--requests', type=int, default=300, help='measured requests per route')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--scale', type=int, default=1, help='multiplier for the seeded data volume')
+    parser.add_argument('--save', metavar='PATH', help='write the results to a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare the results with a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=10.0, help='allowed p50 slowdown in percent')
+    args = parser.parse_args()
+
+    with benchmark_environment():
+        seed(args.scale)
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'benchmark')
+        admin_client = Client()
+        admin_client.force_login(admin)
+        cases = build_cases()
+        queries = count_queries(cases, admin_client)
+
+        server = gunicorn_server(args.workers, worker_class=None, config=GUNICORN_CONFIG) if args.server == 'gunicorn' else wsgiref_server()
+        results = {}
+        with server as port:
+            token, guest_cookie, admin_cookie = session_cookies(port, admin_client.cookies['sessionid'].value)
+            for case in cases:
+                headers = {'Cookie': admin_cookie if case.admin else guest_cookie}
+                if case.hx:
+                    headers['HX-Request'] = 'true'
+                if case.method == 'POST':
+                    headers['Content-Type'] = 'application/x-www-form-urlencoded'
+                    headers['X-CSRFToken'] = token
+                results[case.label] = run_case(port, case, headers, args.requests, args.concurrency, args.warmup)
+                results[case.label]['queries'] = queries[case.label]
+
+    print_results(results)
+    data = {
+        'meta': {
+            'commit': git_commit(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'server': args.server,
+            'workers': args.workers if args.server == 'gunicorn' else None,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'scale': args.scale,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'results': results,
+    }
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(data, f, indent=2)
+        print(f'\nsaved {args.save}')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Site search latency at --documents search documents (100k by default).
+
+Seeds the documents in bulk, so the full-text index is built by the same
+triggers that maintain it. Their words follow a Zipf distribution over a
+20,000-word vocabulary, the most frequent words being the ones below, so a
+common word matches most documents. search() is timed for a rare word, a
+common word, a two-letter prefix as typed into the live search, and two
+words. "full-text" goes through the index with caching off,
+"cached" is a repeat of the same normalized query, and "icontains" is the
+unindexed fallback, which scans every document.
+
+    python -m benchmarks.search --documents 100000 --iterations 200
+"""
+import argparse
+import itertools
+import random
+import string
+
+from benchmarks.common import setup_django, benchmark_environment, measure, report
+
+setup_django()
+
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from pages import search  # noqa: E402
+from pages.models import SearchDocument  # noqa: E402
+
+WORDS = (
+    'built deployed scalable pipeline model inference django python service latency '
+    'dashboard realtime api postgres docker search ranking users production team'
+).split()
+RARE_WORDS = ['kubernetes', 'haskell', 'webassembly', 'quantization']
+QUERIES = {
+    'rare word': 'haskell',
+    'common word': 'built',
+    'prefix': 'la',
+    'two words': 'realtime ranking',
+}
+
+
+def seed(documents):
+    rng = random.Random(42)
+    vocabulary = WORDS + [
+        ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))) for _ in range(20000 - len(WORDS))
+    ]
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+
+    def words(count):
+        return rng.choices(vocabulary, cum_weights=weights, k=count)
+
+    kinds = [kind for kind, _ in SearchDocument.KIND_CHOICES]
+    with transaction.atomic():
+        SearchDocument.objects.bulk_create(
+            (
+                SearchDocument(
+                    kind=kinds[i % len(kinds)], object_id=i,
+                    title=' '.join(words(4)).capitalize(),
+                    # One document in a thousand mentions a rare word
+                    body=' '.join(words(60) + ([rng.choice(RARE_WORDS)] if i % 1000 == 0 else [])),
+                )
+                for i in range(documents)
+            ),
+            batch_size=2000,
+        )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=100000)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    with benchmark_environment():
+        seed(args.documents)
+        for label, query in QUERIES.items():
+            print(f'{label} ({query!r})')
+            with override_settings(PAGE_CACHE_ENABLED=False):
+                report(f'{label}: full-text', measure(lambda: search.search(query), args.iterations))
+            report(f'{label}: cached', measure(lambda: search.search(query), args.iterations))
+            fallback = itertools.repeat(search.normalize(query))
+            report(f'{label}: icontains', measure(
+                lambda: search._search_fallback(next(fallback), search.RESULT_LIMIT), max(args.iterations // 10, 5), warmup=2,
+            ))
+
+
+if __name__ == '__main__':
+    main()
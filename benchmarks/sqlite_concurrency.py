@@ -0,0 +1,112 @@
+"""
+Read and write throughput of several gunicorn workers sharing one SQLite file,
+with Django's default SQLite settings and with SQLITE_TUNED.
+
+Both servers run --workers sync workers against the same seeded scratch
+database with the page cache off, so every page view reads from SQLite. Three
+workloads run with --concurrency clients: reads (about and portfolio), writes
+(HTMX contact form submissions, one INSERT each) and a mix of three reads to
+one write, where the default rollback journal makes readers wait for writers.
+Both servers get DATABASE_URL, and so persistent connections; the difference
+is the pragmas and BEGIN IMMEDIATE. Non-200 responses (typically "database is
+locked") are counted as errors.
+
+    python -m benchmarks.sqlite_concurrency --workers 3 --concurrency 16
+"""
+import argparse
+import http.client
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from benchmarks.common import setup_django, benchmark_environment, summarize, report
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from benchmarks.routes import SUBMISSION, gunicorn_server, seed, session_cookies  # noqa: E402
+
+MODES = {
+    'default': {'SQLITE_TUNED': 'false'},
+    'tuned': {'SQLITE_TUNED': 'true'},
+}
+# workload -> writes per cycle of four requests
+WORKLOADS = {'reads': 0, 'writes': 4, 'mixed': 1}
+
+
+def request(port, job):
+    method, path, body, headers = job
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    started = time.perf_counter()
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+    finally:
+        conn.close()
+    return method, time.perf_counter() - started, response.status
+
+
+def run(port, writes_per_cycle, requests, concurrency):
+    token, guest_cookie, _ = session_cookies(port, '')
+    reads = itertools.cycle([reverse('pages:about'), reverse('pages:portfolio')])
+    write = ('POST', reverse('pages:contact'), urlencode(SUBMISSION), {
+        'Cookie': guest_cookie, 'X-CSRFToken': token, 'HX-Request': 'true',
+        'Content-Type': 'application/x-www-form-urlencoded',
+    })
+    jobs = []
+    for index in range(requests):
+        if index % 4 < writes_per_cycle:
+            jobs.append(write)
+        else:
+            jobs.append(('GET', next(reads), None, {}))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        outcomes = list(pool.map(lambda job: request(port, job), jobs))
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for method, kind in (('GET', 'reads'), ('POST', 'writes')):
+        samples = [(seconds, status) for m, seconds, status in outcomes if m == method]
+        if samples:
+            results[kind] = summarize([seconds for seconds, _ in samples], elapsed)
+            results[kind]['errors'] = sum(status != 200 for _, status in samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=2000, help='requests per workload')
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    results = {}
+    with benchmark_environment():
+        seed(1)
+        for mode, env in MODES.items():
+            # WAL persists in the file; start every mode from the rollback journal
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode = DELETE')
+            connection.close()
+            with gunicorn_server(args.workers, env={**env, 'PAGE_CACHE_ENABLED': 'false'}) as port:
+                for workload, writes_per_cycle in WORKLOADS.items():
+                    results[mode, workload] = run(port, writes_per_cycle, args.requests, args.concurrency)
+
+    for (mode, workload), kinds in results.items():
+        for kind, result in kinds.items():
+            report(f'{mode} {workload}: {kind}', result)
+            if result['errors']:
+                print(f"  {result['errors']} non-200 responses")
+    for workload in WORKLOADS:
+        default = sum(result['rps'] for result in results['default', workload].values())
+        tuned = sum(result['rps'] for result in results['tuned', workload].values())
+        print(f'{workload}: {default:.0f} -> {tuned:.0f} req/s ({tuned / default:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
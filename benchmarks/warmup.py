@@ -0,0 +1,84 @@
+"""
+First-request latency of a freshly started gunicorn worker, with and without
+the post-fork warm-up in gunicorn.conf.py.
+
+Each round starts gunicorn -c gunicorn.conf.py with a single worker and an
+empty page cache, against the same seeded scratch database, waits --settle
+seconds for the worker to boot, and then requests each public page once. The
+"cold" server runs with GUNICORN_WARM_UP=false and is otherwise identical, so
+the difference is what a visitor saves on the first hit after a deploy or a
+max_requests recycle.
+
+    python -m benchmarks.warmup --rounds 5
+"""
+import argparse
+import http.client
+import statistics
+import time
+
+from benchmarks.common import setup_django, benchmark_environment
+
+setup_django()
+
+from django.urls import reverse  # noqa: E402
+
+from benchmarks.routes import GUNICORN_CONFIG, gunicorn_server, seed  # noqa: E402
+from pages.warmup import PRIMED_PAGES  # noqa: E402
+
+SERVERS = {
+    'cold worker': {'GUNICORN_WARM_UP': 'false'},
+    'warmed-up worker': {'GUNICORN_WARM_UP': 'true'},
+}
+
+
+def timed_get(port, path):
+    """GET path on a new connection; returns (seconds, status)"""
+    started = time.perf_counter()
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        conn.request('GET', path)
+        response = conn.getresponse()
+        response.read()
+    finally:
+        conn.close()
+    return time.perf_counter() - started, response.status
+
+
+def first_requests(env, rounds, settle):
+    """Per-page first-request latencies in milliseconds over rounds fresh servers"""
+    paths = [reverse(name) for name in PRIMED_PAGES]
+    samples = {path: [] for path in paths}
+    for _ in range(rounds):
+        with gunicorn_server(1, worker_class=None, config=GUNICORN_CONFIG, env=env) as port:
+            time.sleep(settle)
+            for path in paths:
+                elapsed, status = timed_get(port, path)
+                if status != 200:
+                    raise SystemExit(f'GET {path} returned {status}')
+                samples[path].append(elapsed * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=5, help='server restarts per configuration')
+    parser.add_argument('--settle', type=float, default=3.0, help='seconds to wait for the worker to boot')
+    args = parser.parse_args()
+
+    results = {}
+    with benchmark_environment():
+        seed(1)
+        for label, env in SERVERS.items():
+            results[label] = first_requests(env, args.rounds, args.settle)
+
+    cold, warm = results['cold worker'], results['warmed-up worker']
+    print(f"{'first request (median)':<24} {'cold':>10} {'warmed up':>12}")
+    for path in cold:
+        print(f'{path:<24} {statistics.median(cold[path]):>7.1f} ms {statistics.median(warm[path]):>9.1f} ms')
+    cold_total = sum(statistics.median(samples) for samples in cold.values())
+    warm_total = sum(statistics.median(samples) for samples in warm.values())
+    print(f"{'all pages':<24} {cold_total:>7.1f} ms {warm_total:>9.1f} ms   ({cold_total / warm_total:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+gunicorn settings for the Docker image and Render (`gunicorn -c gunicorn.conf.py`).
+
+The application is imported once in the master (preload_app) and forked,
+and each worker then warms itself up (pages/warmup.py) before it accepts a
+request, so neither a deploy nor a worker recycle puts a cold worker in front
+of visitors. Workers are recycled after max_requests, with jitter so they do
+not all restart at once.
+
+Every value can be overridden from the environment; see below.
+"""
+import os
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 3))
+# gthread: each worker serves GUNICORN_THREADS requests at once, so a slow
+# client or query does not stall the whole worker
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+warm_up_workers = os.environ.get('GUNICORN_WARM_UP', 'true').lower() in ('1', 'true', 'yes')
+
+
+def pre_fork(server, worker):
+    # Connections opened while preloading must not be shared with the children
+    if 'django.db' in sys.modules:
+        from django.db import connections
+        connections.close_all()
+    if 'personalwebsite.backends.postgresql_pool.pool' in sys.modules:
+        from personalwebsite.backends.postgresql_pool import pool
+        pool.close_all()
+
+
+def post_worker_init(worker):
+    """Runs in each new worker after fork and application load, before it accepts requests"""
+    if not warm_up_workers:
+        return
+    from pages.warmup import warm_up
+    worker.log.info('Warm-up: %s', warm_up())
@@ -1,7 +1,21 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
+from . import inbox, search
 from .models import Project, Technology, Skill, Experience, ContactMessage
 
 
+class IndexedSearchMixin:
+    """Search the site search index instead of icontains scans where the backend has one"""
+
+    def get_search_results(self, request, queryset, search_term):
+        if search.normalize(search_term):
+            results = search.filter_queryset(queryset, search_term)
+            if results is not None:
+                return results, False
+        return super().get_search_results(request, queryset, search_term)
+
+
 @admin.register(Technology)
 class TechnologyAdmin(admin.ModelAdmin):
     list_display = ['name', 'created_at']
@@ -10,7 +24,7 @@ class TechnologyAdmin(admin.ModelAdmin):
 
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ['title', 'featured', 'display_order', 'created_at']
     list_filter = ['featured', 'created_at', 'technologies']
     search_fields = ['title', 'description']
@@ -42,7 +56,7 @@ class SkillAdmin(admin.ModelAdmin):
 
 
 @admin.register(Experience)
-class ExperienceAdmin(admin.ModelAdmin):
+class ExperienceAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ['title', 'company', 'start_date', 'end_date', 'is_current', 'display_order']
     list_filter = ['start_date', 'end_date', 'created_at']
     search_fields = ['title', 'company', 'description']
@@ -65,13 +79,47 @@ class ExperienceAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at']
 
 
+class ArchivedFilter(admin.SimpleListFilter):
+    """Show the inbox (unarchived messages) unless the archive is asked for"""
+    title = 'folder'
+    parameter_name = 'folder'
+
+    def lookups(self, request, model_admin):
+        return [('archive', 'Archive'), ('all', 'All messages')]
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': 'Inbox',
+        }
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': self.value() == lookup,
+                'query_string': changelist.get_query_string({self.parameter_name: lookup}),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        if self.value() == 'archive':
+            return queryset.filter(archived=True)
+        if self.value() == 'all':
+            return queryset
+        return queryset.filter(archived=False)
+
+
 @admin.register(ContactMessage)
 class ContactMessageAdmin(admin.ModelAdmin):
     list_display = ['name', 'email', 'subject', 'read', 'created_at']
-    list_filter = ['read', 'created_at']
+    list_filter = [ArchivedFilter, 'read', 'created_at']
     search_fields = ['name', 'email', 'subject', 'message']
     readonly_fields = ['name', 'email', 'subject', 'message', 'created_at']
     list_editable = ['read']
+    # Large inboxes: cursor pagination, no full COUNT(*), and ordering fixed to the keyset
+    show_full_result_count = False
+    sortable_by = ()
+    search_help_text = 'Matches whole words or word prefixes in the name, email, subject and message'
+    actions = ['mark_read', 'mark_unread', 'archive', 'unarchive', 'delete_messages']
     
     fieldsets = (
         ('Contact Information', {
@@ -81,7 +129,7 @@ class ContactMessageAdmin(admin.ModelAdmin):
             'fields': ('subject', 'message')
         }),
         ('Status', {
-            'fields': ('read',)
+            'fields': ('read', 'archived')
         }),
         ('Timestamps', {
             'fields': ('created_at',),
@@ -92,3 +140,63 @@ class ContactMessageAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         """Disable adding messages through admin (only via contact form)"""
         return False
+
+    def get_changelist(self, request, **kwargs):
+        return inbox.KeysetChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """Use the full-text index instead of icontains scans where the backend has one"""
+        if search_term.strip():
+            results = inbox.search(queryset, search_term)
+            if results is not None:
+                return results, False
+        return super().get_search_results(request, queryset, search_term)
+
+    def get_actions(self, request):
+        # delete_selected loads every object to list them; delete_messages does not
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def _bulk_update(self, request, queryset, values, done_message):
+        """Apply values to the selection (or the whole filtered changelist) in chunks"""
+        total, _ = inbox.count_rows(queryset)
+        progress = inbox.log_progress(f'{request.user}: {done_message}', total) if total > inbox.BULK_CHUNK_SIZE else None
+        changed = inbox.update_in_chunks(queryset, values, progress=progress)
+        self.message_user(request, f'{done_message.capitalize()} {changed:,} message{"s" if changed != 1 else ""}.', messages.SUCCESS)
+
+    @admin.action(description='Mark selected messages as read', permissions=['change'])
+    def mark_read(self, request, queryset):
+        self._bulk_update(request, queryset, {'read': True}, 'marked as read')
+
+    @admin.action(description='Mark selected messages as unread', permissions=['change'])
+    def mark_unread(self, request, queryset):
+        self._bulk_update(request, queryset, {'read': False}, 'marked as unread')
+
+    @admin.action(description='Archive selected messages', permissions=['change'])
+    def archive(self, request, queryset):
+        self._bulk_update(request, queryset, {'archived': True}, 'archived')
+
+    @admin.action(description='Move selected messages back to the inbox', permissions=['change'])
+    def unarchive(self, request, queryset):
+        self._bulk_update(request, queryset, {'archived': False}, 'restored')
+
+    @admin.action(description='Delete selected messages', permissions=['delete'])
+    def delete_messages(self, request, queryset):
+        """Confirm with a count rather than a list of every object, then delete in chunks"""
+        total, exact = inbox.count_rows(queryset)
+        if request.POST.get('post'):
+            progress = inbox.log_progress(f'{request.user}: deleting', total) if total > inbox.BULK_CHUNK_SIZE else None
+            deleted = inbox.delete_in_chunks(queryset, progress=progress)
+            self.message_user(request, f'Deleted {deleted:,} message{"s" if deleted != 1 else ""}.', messages.SUCCESS)
+            return None
+
+        return TemplateResponse(request, 'admin/pages/contactmessage/delete_messages_confirmation.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Delete messages?',
+            'opts': self.opts,
+            'count': f'{total:,}' if exact else inbox.count_display(total, queryset.db),
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
@@ -0,0 +1,79 @@
+"""
+Async versions of the public views, used when ASYNC_VIEWS is on (the default
+under personalwebsite/asgi.py).
+
+They query through the async ORM API and render the same templates with the
+same contexts as their counterparts in views.py. Under an ASGI server a
+request waiting on the database, or on a slow client, then holds an event
+loop slot rather than a worker. By the time these run,
+AutoGuestLoginMiddleware has loaded the user and session, so rendering
+touches no database connection from the event loop.
+"""
+from asgiref.sync import sync_to_async
+from django.shortcuts import render
+
+from . import cache as page_cache
+from . import search as site_search
+from . import spool
+from .conditional import conditional_page
+from .forms import ContactForm
+from .models import Project, Technology, Skill, Experience
+from .views import (
+    CONTACT_CONTEXT, about_context, contact_submitted, home_context, portfolio_context, portfolio_filter, render_page,
+    search_context,
+)
+
+
+@conditional_page()
+@page_cache.cache_page_versioned()
+async def home(request):
+    """Home page view"""
+    return render(request, 'pages/home.html', home_context())
+
+
+@conditional_page(Skill, Experience)
+@page_cache.cache_page_versioned(Skill, Experience)
+async def about(request):
+    """About page view"""
+    skills = [skill async for skill in Skill.objects.all()]
+    experience = [entry async for entry in Experience.objects.all()]
+    return render_page(request, 'pages/about.html', 'pages/about_content.html', about_context(skills, experience))
+
+
+@conditional_page(Project, Technology, Project.technologies.through)
+@page_cache.cache_page_versioned(Project, Technology)
+async def portfolio(request):
+    """Portfolio page view, filtered by ?tech= (and ?match=any)"""
+    # The index may need a rebuild, which queries the database
+    projects, filters = await sync_to_async(portfolio_filter)(request)
+    # async iteration fetches the rows and runs the prefetch in one sync_to_async call
+    projects = [project async for project in projects]
+    context = portfolio_context(projects, **filters)
+    return render_page(request, 'pages/portfolio.html', 'pages/portfolio_content.html', context)
+
+
+@page_cache.cache_page_versioned()
+async def contact(request):
+    """Contact page view"""
+    if request.method == 'POST':
+        form = ContactForm(request.POST)
+        if form.is_valid():
+            if spool.enabled():
+                # fsync must not block the event loop
+                await sync_to_async(spool.submit, thread_sensitive=False)(form.cleaned_data)
+            else:
+                # is_valid() already built the instance; this is form.save() for a form without m2m fields
+                await form.instance.asave()
+
+        response = contact_submitted(request)
+        if response:
+            return response
+
+    return render_page(request, 'pages/contact.html', 'pages/contact_content.html', CONTACT_CONTEXT)
+
+
+async def search(request):
+    """Search page view; HTMX live search gets just the results"""
+    query = request.GET.get('q', '').strip()
+    results = await sync_to_async(site_search.search)(query)
+    return render_page(request, 'pages/search.html', 'pages/search_results.html', search_context(query, results))
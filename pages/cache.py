@@ -0,0 +1,213 @@
+"""
+Full-page cache for the public views.
+
+Cached pages are keyed on the request path and the query parameters the
+public pages read (see cache_path), whether the request is an HTMX partial,
+and the current version counter of every content model the page
+depends on. Signals in pages/signals.py bump a model's counter whenever it is
+saved, deleted or has its many-to-many links changed, so an edit makes every
+dependent cache key unreachable as soon as it commits - no TTL tuning
+involved. Bumping only after the commit matters: a request served while the
+transaction is open still reads the old rows, and must cache them under the
+old key.
+"""
+import os
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.dispatch import Signal
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import urlencode
+
+VERSION_KEY = 'pages:version:{label}'
+PAGE_KEY = 'pages:page:{partial}:{path}:{versions}'
+# Query parameters the public pages read (the portfolio's technology filter
+# and the search box), and whether each takes several values. A request with
+# any other parameter is not cached, so junk query strings cannot flood the cache.
+QUERY_PARAMS = {'tech': True, 'match': False, 'q': False}
+
+# Sent by bump_version() with models=<the invalidated models>
+versions_bumped = Signal()
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _version_key(model):
+    return VERSION_KEY.format(label=model._meta.label_lower)
+
+
+def get_versions(models):
+    """Return the current version counter of each model, initialising missing ones"""
+    keys = [_version_key(model) for model in models]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            # Seed from the clock rather than 0 so a counter that was evicted
+            # can never count back up into keys of pages cached before eviction
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        versions.append(version)
+    return versions
+
+
+def bump_version(*models):
+    """Invalidate every cached page that depends on any of the given models"""
+    for model in models:
+        key = _version_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+    versions_bumped.send(sender=bump_version, models=models)
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def stats():
+    """Hit/miss counters for this process"""
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {
+        'pid': os.getpid(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats['hits'] = _stats['misses'] = 0
+
+
+def is_partial(request):
+    """
+    An HTMX request for just the content block. HTMX restoring a page missing
+    from its history cache sends HX-Request too, but needs the whole page.
+    """
+    return bool(request.headers.get('HX-Request')) and request.headers.get('HX-History-Restore-Request') != 'true'
+
+
+def cache_path(request):
+    """
+    The request path plus the query parameters a page reads, in a fixed
+    order. Empty values are dropped, as are repeats of a multi-valued
+    parameter; a single-valued one keeps its last value, which is the one
+    QueryDict.get() returns.
+    """
+    params = []
+    for name, multiple in QUERY_PARAMS.items():
+        values = dict.fromkeys(request.GET.getlist(name)) if multiple else [request.GET.get(name)]
+        params += [(name, value) for value in values if value]
+    return f'{request.path}?{urlencode(params)}' if params else request.path
+
+
+def is_cacheable(request):
+    """Only anonymous/guest GETs with nothing queued for display are shared"""
+    if not getattr(settings, 'PAGE_CACHE_ENABLED', True):
+        return False
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if any(name not in QUERY_PARAMS for name in request.GET):
+        return False
+    if getattr(request.user, 'is_staff', False):
+        return False
+    return not len(get_messages(request))
+
+
+def page_key(request, models=()):
+    versions = '.'.join(str(version) for version in get_versions(models)) if models else '-'
+    return PAGE_KEY.format(
+        partial=1 if is_partial(request) else 0,
+        path=cache_path(request),
+        versions=versions,
+    )
+
+
+def _lookup(request, models):
+    """(cache key, cached (content, content type) or None)"""
+    key = page_key(request, models)
+    return key, cache.get(key)
+
+
+def _hit(cached):
+    _record('hits')
+    content, content_type = cached
+    response = HttpResponse(content, content_type=content_type)
+    response['X-Page-Cache'] = 'HIT'
+    return response
+
+
+def _storable(response):
+    return response.status_code == 200 and not response.streaming
+
+
+def _entry(response):
+    return response.content, response['Content-Type']
+
+
+def _finish(response):
+    patch_vary_headers(response, ('HX-Request', 'HX-History-Restore-Request'))
+    return response
+
+
+def cache_page_versioned(*models):
+    """
+    Cache a view's response until one of ``models`` changes.
+
+    Usage::
+
+        @cache_page_versioned(Skill, Experience)
+        def about(request):
+            ...
+
+    Async views are supported too; the version lookup and cache read then
+    share one sync_to_async call.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if not is_cacheable(request):
+                    return await view_func(request, *args, **kwargs)
+
+                key, cached = await sync_to_async(_lookup)(request, models)
+                if cached is not None:
+                    return _finish(_hit(cached))
+                _record('misses')
+                response = await view_func(request, *args, **kwargs)
+                if _storable(response):
+                    await cache.aset(key, _entry(response), settings.PAGE_CACHE_TIMEOUT)
+                response['X-Page-Cache'] = 'MISS'
+                return _finish(response)
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable(request):
+                return view_func(request, *args, **kwargs)
+
+            key, cached = _lookup(request, models)
+            if cached is not None:
+                return _finish(_hit(cached))
+            _record('misses')
+            response = view_func(request, *args, **kwargs)
+            if _storable(response):
+                cache.set(key, _entry(response), settings.PAGE_CACHE_TIMEOUT)
+            response['X-Page-Cache'] = 'MISS'
+            return _finish(response)
+        return wrapper
+    return decorator
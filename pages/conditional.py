@@ -0,0 +1,130 @@
+"""
+Conditional GET support for the public pages.
+
+Each page gets an ETag derived from one cheap aggregate per content model
+(latest timestamp, row count and highest pk), so If-None-Match is answered
+with a 304 before the page cache is consulted or any template is rendered.
+
+There is deliberately no Last-Modified: the latest timestamp alone misses
+deleted rows, link changes and queryset.update() writes, so If-Modified-Since
+would answer 304 for changed content.
+"""
+import hashlib
+import os
+from functools import lru_cache, wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .cache import cache_path, is_partial
+
+
+def _template_dirs():
+    from django.template import engines
+    for engine in engines.all():
+        yield from engine.template_dirs
+
+
+def _latest_template_mtime():
+    latest = 0
+    for directory in _template_dirs():
+        for root, _, files in os.walk(directory):
+            for name in files:
+                latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+    return str(int(latest))
+
+
+@lru_cache(maxsize=1)
+def _cached_build_id():
+    return settings.BUILD_ID or _latest_template_mtime()
+
+
+def build_id():
+    """Identifies the deployed templates, so a deploy changes every ETag"""
+    if settings.DEBUG and not settings.BUILD_ID:
+        # Templates are edited in place during development
+        return _latest_template_mtime()
+    return _cached_build_id()
+
+
+def _model_state(model):
+    """(latest timestamp or None, row count, latest pk) for one model"""
+    field_names = {field.name for field in model._meta.concrete_fields}
+    timestamp = next((name for name in ('updated_at', 'created_at') if name in field_names), None)
+    aggregates = {'count': Count('pk'), 'last_pk': Max('pk')}
+    if timestamp:
+        aggregates['last'] = Max(timestamp)
+    state = model._default_manager.order_by().aggregate(**aggregates)
+    return state.get('last'), state['count'], state['last_pk']
+
+
+def content_validators(request, models):
+    """Compute the etag once per request for the given models"""
+    memo = request.__dict__.setdefault('_content_validators', {})
+    if models in memo:
+        return memo[models]
+
+    parts = [
+        build_id(),
+        # Only the query parameters a page reads, as in the page cache key
+        cache_path(request),
+        'partial' if is_partial(request) else 'full',
+        'staff' if getattr(request.user, 'is_staff', False) else 'public',
+    ]
+    for model in models:
+        last, count, last_pk = _model_state(model)
+        parts.append(f'{model._meta.label_lower}:{last and last.isoformat()}:{count}:{last_pk}')
+
+    memo[models] = hashlib.blake2b('|'.join(parts).encode(), digest_size=16).hexdigest()
+    return memo[models]
+
+
+def _etag(request, models):
+    """The quoted etag, in the form django.utils.cache expects"""
+    return quote_etag(content_validators(request, models))
+
+
+def _finish(request, response, etag, last_modified=None):
+    # As django.views.decorators.http.condition does
+    if request.method in ('GET', 'HEAD'):
+        if last_modified and not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(last_modified)
+        response.headers.setdefault('ETag', etag)
+    patch_vary_headers(response, ('HX-Request', 'HX-History-Restore-Request'))
+    # Let browsers keep the page but revalidate it on every use
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_page(*models):
+    """
+    Answer conditional GETs for a view whose output depends only on ``models``.
+
+    Through models may be listed too; they contribute their row count and
+    highest pk, which changes whenever a link is added or removed. Works on
+    sync and async views; for an async view the aggregates run in one
+    sync_to_async call.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                etag = await sync_to_async(_etag)(request, models)
+                response = get_conditional_response(request, etag=etag)
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                return _finish(request, response, etag)
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            etag = _etag(request, models)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            return _finish(request, response, etag)
+        return wrapper
+    return decorator
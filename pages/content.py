@@ -0,0 +1,190 @@
+"""
+Streaming JSONL export and import of the site content.
+
+Each line is one object, in the shape of a Django fixture entry:
+
+    {"model": "pages.project", "fields": {"title": "...", "technologies": ["Django", ...]}}
+
+Objects are matched on a natural key instead of their primary key, so a file
+exported from one environment can be imported into another. The natural keys
+are Technology.name, Skill.name, Project.title and Experience (title,
+company, start_date). Export walks each table with QuerySet.iterator().
+Import upserts batch_size lines at a time, each batch in its own transaction
+(see pages.seeding), so memory use does not grow with the size of the file.
+Uploaded image files are not included: only their stored names and
+dimensions are, and an import never removes an image.
+"""
+import json
+from dataclasses import dataclass
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from . import search
+from .cache import bump_version
+from .models import Project, Technology, Skill, Experience
+from .rendering import render_markdown
+from .seeding import UpsertResult, sync_m2m, upsert
+
+
+@dataclass(frozen=True)
+class ContentSpec:
+    model: type
+    key: object
+    fields: tuple
+
+    @property
+    def label(self):
+        return self.model._meta.label_lower
+
+
+IMAGE_FIELDS = ('image', 'image_width', 'image_height')
+
+# Export order; technologies come before the projects that link to them
+CONTENT_SPECS = (
+    ContentSpec(Technology, 'name', ('name',)),
+    ContentSpec(Skill, 'name', ('name', 'category', 'icon', 'level', 'display_order')),
+    ContentSpec(Project, 'title', ('title', 'description', 'github_url', 'featured', 'display_order', *IMAGE_FIELDS)),
+    ContentSpec(Experience, ('title', 'company', 'start_date'), (
+        'title', 'company', 'start_date', 'end_date', 'description', 'display_order', *IMAGE_FIELDS,
+    )),
+)
+BY_LABEL = {spec.label: spec for spec in CONTENT_SPECS}
+
+
+class ContentError(ValueError):
+    """A line of an import file that cannot be applied"""
+
+
+def _serialize(spec, obj):
+    fields = {}
+    for name in spec.fields:
+        value = getattr(obj, name)
+        if name == 'image':
+            value = value.name or None
+        fields[name] = value
+    if spec.model is Project:
+        # Prefetched, so this costs no query per project
+        fields['technologies'] = obj.get_technologies_list()
+    return fields
+
+
+def export(stream, chunk_size=500):
+    """Write every content object to stream as JSON lines; returns {label: count}"""
+    counts = {}
+    for spec in CONTENT_SPECS:
+        queryset = spec.model.objects.order_by('pk')
+        if spec.model is Project:
+            queryset = queryset.prefetch_related('technologies')
+        counts[spec.label] = 0
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            record = {'model': spec.label, 'fields': _serialize(spec, obj)}
+            stream.write(json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+            counts[spec.label] += 1
+    return counts
+
+
+def _parse_fields(spec, fields, line_number):
+    opts = spec.model._meta
+    row = {}
+    for name, value in fields.items():
+        if name == 'technologies' and spec.model is Project:
+            continue
+        if name not in spec.fields:
+            raise ContentError(f'line {line_number}: unknown field {name!r} for {spec.label}')
+        try:
+            row[name] = opts.get_field(name).to_python(value)
+        except Exception as exc:
+            raise ContentError(f'line {line_number}: {name}: {exc}') from exc
+    key_fields = (spec.key,) if isinstance(spec.key, str) else spec.key
+    missing = [name for name in key_fields if name not in row]
+    if missing:
+        raise ContentError(f'line {line_number}: {spec.label} is missing {", ".join(missing)}')
+    if spec.model is Experience and 'description' in row:
+        # bulk writes skip Experience.save(), which normally renders this
+        row['description_html'] = render_markdown(row['description'])
+    if not row.get('image'):
+        # An import never clears an image; NULL and '' would otherwise compare as changed
+        for name in IMAGE_FIELDS:
+            row.pop(name, None)
+    return row
+
+
+class Importer:
+    """Applies an import file batch by batch; results accumulate per model label"""
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.results = {spec.label: UpsertResult() for spec in CONTENT_SPECS}
+        self.links_added = self.links_removed = 0
+
+    def run(self, stream):
+        try:
+            self._read(stream)
+        finally:
+            # Batches already committed stay written when a later line fails,
+            # so invalidate whatever changed either way
+            self._invalidate()
+        return self.results
+
+    def _read(self, stream):
+        batch, batch_type = [], None
+        for line_number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                spec = BY_LABEL[record['model']]
+                fields = record['fields']
+            except (ValueError, KeyError, TypeError) as exc:
+                raise ContentError(f'line {line_number}: not a content record ({exc})') from exc
+            if batch and (spec is not batch_type or len(batch) >= self.batch_size):
+                self._apply(batch_type, batch)
+                batch = []
+            batch_type = spec
+            batch.append((_parse_fields(spec, fields, line_number), fields.get('technologies')))
+        if batch:
+            self._apply(batch_type, batch)
+
+    def _invalidate(self):
+        changed = [Project, Technology] if self.links_added or self.links_removed else []
+        changed += [BY_LABEL[label].model for label, result in self.results.items() if result.changed]
+        if changed:
+            # Bulk writes send no signals; update search and invalidate the cached pages once at the end
+            search.sync_models(*changed)
+            bump_version(*set(changed))
+
+    def _apply(self, spec, batch):
+        # Later lines win when a batch repeats a key
+        rows = list({self._key(spec, row): row for row, _ in batch}.values())
+        with transaction.atomic():
+            instances, result = upsert(spec.model, spec.key, rows)
+            self._add(spec.label, result)
+            if spec.model is Project:
+                self._link_technologies(instances, batch)
+
+    def _key(self, spec, row):
+        if isinstance(spec.key, str):
+            return row[spec.key]
+        return tuple(row[name] for name in spec.key)
+
+    def _link_technologies(self, projects, batch):
+        linked = {row['title']: names for row, names in batch if names is not None}
+        if not linked:
+            return
+        names = sorted({name for project_names in linked.values() for name in project_names})
+        techs, result = upsert(Technology, 'name', [{'name': name} for name in names])
+        self._add(Technology._meta.label_lower, UpsertResult(created=result.created))
+        added, removed = sync_m2m(
+            Project.technologies.through, 'project_id', 'technology_id',
+            {projects[title].pk: {techs[name].pk for name in project_names} for title, project_names in linked.items()},
+        )
+        self.links_added += added
+        self.links_removed += removed
+
+    def _add(self, label, result):
+        total = self.results[label]
+        total.created += result.created
+        total.updated += result.updated
+        total.unchanged += result.unchanged
@@ -0,0 +1,231 @@
+"""
+Critical CSS extraction for the page templates.
+
+The Tailwind build in static/css/site.css covers every template. For each
+full page template, build_critical_css keeps only the rules that style the
+markup above the fold: the base layout up to the content block (header,
+overlay) plus the first CRITICAL_CSS_FOLD characters of the page's content
+block, with includes expanded; a screen-filling hero section ends it early.
+The result is written to static/css/critical/<template>.css and inlined by
+the {% critical_css %} tag, which then loads the full stylesheet without
+blocking rendering.
+
+Elements hidden on first paint (the loader overlay, the closed mobile menu)
+are left out of that markup, as are transition utilities, which only act
+when a style changes. Selectors are matched on class and element names, so
+the extraction is a static approximation that errs on the side of keeping
+rules: a selector is kept when every class and element it names appears in
+that markup. Interaction states (:hover, :focus, ...) and pseudo-elements
+that never show on first paint (::backdrop, ::placeholder, ...) are left to
+the full stylesheet. build_critical_css fails when a page's critical CSS is
+larger than CRITICAL_CSS_BUDGET bytes, since inlined CSS past the first
+round trip delays the first paint it is meant to speed up.
+"""
+import re
+from html.parser import HTMLParser
+
+from django.template.loader import get_template
+
+CRITICAL_DIR = 'css/critical'
+
+CLASS_ATTR_RE = re.compile(r'\bclass="([^"]*)"')
+CLASS_SELECTOR_RE = re.compile(r'\.((?:\\.|[\w-])+)')
+TAG_RE = re.compile(r'<([a-zA-Z][\w-]*)')
+ATTRIBUTE_SELECTOR_RE = re.compile(r'\[[^\]]*\]')
+PSEUDO_SELECTOR_RE = re.compile(r'::?[\w-]+')
+TYPE_SELECTOR_RE = re.compile(r'[a-zA-Z][\w-]*')
+# States and pseudo-elements that cannot show on first paint; scrollbars
+# (::-webkit-scrollbar) and ::before/::after take up space, so they stay
+DEFERRED_PSEUDO_RE = re.compile(
+    r':(?:hover|focus|focus-visible|focus-within|active|visited|disabled|checked|invalid|'
+    r'-moz-focusring|-moz-ui-invalid)(?![\w-])'
+    r'|::?(?:backdrop|placeholder|file-selector-button|selection|marker|-moz-[\w-]+|-webkit-(?!scrollbar)[\w-]+)'
+)
+INCLUDE_RE = re.compile(r"""{%\s*include\s+['"]([^'"]+)['"][^%]*%}""")
+CONTENT_BLOCK_RE = re.compile(r'{%\s*block\s+content\s*%}(.*?){%\s*endblock', re.S)
+# A hero section at least as tall as the viewport: nothing after it is on first paint
+HERO_RE = re.compile(r'<section\b[^>]*\bmin-h-screen\b.*?</section>', re.S)
+EXTENDS_RE = re.compile(r"""{%\s*extends\s+['"]([^'"]+)['"]""")
+ANIMATION_RE = re.compile(r'animation(?:-name)?:([^;}]+)')
+CSS_ESCAPE_RE = re.compile(r'\\(.)')
+# {% picture %} and {% responsive_image %} render <picture><source><img class="css_class">
+IMAGE_TAG_RE = re.compile(r"""{%\s*(?:picture|responsive_image)\b[^%]*?\bcss_class=(['"])(.*?)\1[^%]*%}""")
+# Utilities that only take effect when a style changes after the first paint
+DEFERRED_CLASS_RE = re.compile(r'(?:transition|duration|ease|delay)(?:-|$)')
+# A responsive utility that shows an element hidden on small screens, e.g. md:flex
+RESPONSIVE_DISPLAY_RE = re.compile(r':(?:block|flex|grid|inline|inline-block|inline-flex|table|contents)$')
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+
+def critical_name(template_name):
+    """Static path of the critical CSS for a template, e.g. css/critical/about.css"""
+    stem = template_name.rsplit('/', 1)[-1].rsplit('.', 1)[0]
+    return f'{CRITICAL_DIR}/{stem}.css'
+
+
+def template_source(name, depth=0):
+    """Template source with {% include %}s expanded in place"""
+    source = get_template(name).template.source
+    if depth > 5:
+        return source
+    return INCLUDE_RE.sub(lambda match: template_source(match.group(1), depth + 1), source)
+
+
+def above_the_fold(template_name, fold):
+    """Markup visible on first paint: the layout plus the start of the content block"""
+    source = template_source(template_name)
+    parent = EXTENDS_RE.search(source)
+    if not parent:
+        return source[:fold]
+    block = CONTENT_BLOCK_RE.search(source)
+    content = block.group(1) if block else ''
+    hero = HERO_RE.search(content)
+    if hero:
+        content = content[:hero.end()]
+    # Only the layout above the content block; the footer is never on first paint
+    layout = re.split(r'{%\s*block\s+content\s*%}', template_source(parent.group(1)))[0]
+    return layout + content[:fold]
+
+
+def _initially_hidden(attrs):
+    classes = (attrs.get('class') or '').split()
+    if 'hidden' in attrs or 'x-cloak' in attrs:
+        return True
+    if 'display:none' in (attrs.get('style') or '').replace(' ', ''):
+        return True
+    return 'hidden' in classes and not any(RESPONSIVE_DISPLAY_RE.search(name) for name in classes)
+
+
+class _VisibleMarkup(HTMLParser):
+    """Collects the start tags of the elements that are displayed on first paint"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tags = []
+        self.hidden_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        opens = tag not in VOID_ELEMENTS
+        if self.hidden_depth:
+            self.hidden_depth += opens
+            return
+        attrs = dict(attrs)
+        if _initially_hidden(attrs):
+            self.hidden_depth = int(opens)
+            return
+        self.tags.append(f'<{tag} class="{attrs.get("class") or ""}">')
+
+    def handle_endtag(self, tag):
+        if self.hidden_depth and tag not in VOID_ELEMENTS:
+            self.hidden_depth -= 1
+
+
+def visible_markup(markup):
+    """The start tags of markup (with their classes) minus anything inside an element hidden on first paint"""
+    markup = IMAGE_TAG_RE.sub(r'<picture><source><img class="\2"></picture>', markup)
+    parser = _VisibleMarkup()
+    parser.feed(markup)
+    parser.close()
+    return ''.join(parser.tags)
+
+
+def used_tags(markup):
+    return {tag.lower() for tag in TAG_RE.findall(markup)}
+
+
+def used_classes(markup):
+    classes = set()
+    for value in CLASS_ATTR_RE.findall(markup):
+        # Skip template syntax inside the attribute; its branches are often below the fold anyway
+        value = re.sub(r'{%.*?%}|{{.*?}}', ' ', value)
+        classes.update(name for name in value.split() if not DEFERRED_CLASS_RE.match(name))
+    return classes
+
+
+def split_rules(css):
+    """Top-level (prelude, body) pairs; bodies of at-rules may contain nested rules"""
+    rules = []
+    depth = start = 0
+    prelude = None
+    in_string = None
+    for index, char in enumerate(css):
+        if in_string:
+            if char == in_string and css[index - 1] != '\\':
+                in_string = None
+        elif char in '"\'':
+            in_string = char
+        elif char == '{':
+            if depth == 0:
+                prelude = css[start:index].strip()
+                start = index + 1
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                rules.append((prelude, css[start:index]))
+                start = index + 1
+        elif char == ';' and depth == 0:
+            # Statement at-rules such as @import / @charset
+            rules.append((css[start:index].strip(), None))
+            start = index + 1
+    return rules
+
+
+def split_selectors(prelude):
+    """Split a selector list on commas that are not inside parentheses"""
+    selectors, depth, start = [], 0, 0
+    for index, char in enumerate(prelude):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(prelude[start:index])
+            start = index + 1
+    selectors.append(prelude[start:])
+    return selectors
+
+
+def selector_matches(selector, classes, tags):
+    names = [CSS_ESCAPE_RE.sub(r'\1', name) for name in CLASS_SELECTOR_RE.findall(selector)]
+    if not all(name in classes for name in names):
+        return False
+    # What is left once classes are removed: element names, attributes and pseudo-classes
+    rest = CLASS_SELECTOR_RE.sub('', selector)
+    if DEFERRED_PSEUDO_RE.search(rest):
+        return False
+    rest = PSEUDO_SELECTOR_RE.sub('', ATTRIBUTE_SELECTOR_RE.sub('', rest))
+    return all(tag.lower() in tags for tag in TYPE_SELECTOR_RE.findall(rest))
+
+
+def prune(css, classes, tags):
+    """Rules of css that apply to markup using only the given classes and elements; returns (css, animation names)"""
+    kept, animations, keyframes = [], set(), {}
+    for prelude, body in split_rules(css):
+        if body is None:
+            kept.append(prelude + ';')
+        elif prelude.startswith('@keyframes') or prelude.startswith('@-webkit-keyframes'):
+            keyframes[prelude.split()[-1]] = f'{prelude}{{{body}}}'
+        elif prelude.startswith('@font-face'):
+            # Fonts are loaded from Google Fonts, not this stylesheet
+            continue
+        elif prelude.startswith(('@media', '@supports')):
+            inner, inner_animations = prune(body, classes, tags)
+            if inner:
+                kept.append(f'{prelude}{{{inner}}}')
+                animations |= inner_animations
+        else:
+            selectors = [s for s in split_selectors(prelude) if selector_matches(s, classes, tags)]
+            if selectors:
+                kept.append(f'{",".join(selectors)}{{{body}}}')
+                for value in ANIMATION_RE.findall(body):
+                    animations.update(re.split(r'[\s,]+', value.strip()))
+    kept.extend(rule for name, rule in keyframes.items() if name in animations)
+    return ''.join(kept), animations
+
+
+def extract(css, template_name, fold):
+    """Critical CSS for one page template"""
+    markup = visible_markup(above_the_fold(template_name, fold))
+    critical, _ = prune(css, used_classes(markup), used_tags(markup))
+    return critical
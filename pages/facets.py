@@ -0,0 +1,194 @@
+"""
+Technology facets for the portfolio: /portfolio/?tech=Python&tech=Django.
+
+Each process keeps an inverted index from technology to the projects that
+use it, so filtering and counting never join Project.technologies. A set of
+projects is a Python int used as a bitmap, with bit n set for project n:
+intersection and union are & and |, and a count is int.bit_count(), each
+a C loop over one machine word per 64 projects.
+
+The index is built with one query over the link table and tagged with the
+Project and Technology version counters from pages/cache.py. m2m_changed
+on Project.technologies updates it in place once the transaction commits,
+right after the counters are bumped for the same change.
+Any other change bumps the counters, whether it comes from this process or
+another worker, and the next request rebuilds the index.
+"""
+import threading
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+from django.db import transaction
+
+from . import cache as page_cache
+from .models import Project, Technology
+
+MODELS = (Project, Technology)
+PARAM = 'tech'
+MATCH_PARAM = 'match'
+# Technologies per filter; more than this are ignored
+MAX_SELECTED = 20
+
+_lock = threading.Lock()
+_index = None
+
+
+def bitmap(ids):
+    """A bitmap with the given ids set"""
+    # Set bits in a byte buffer: OR-ing into a growing int copies it every time
+    ids = list(ids)
+    data = bytearray(max(ids, default=-1) // 8 + 1)
+    for pk in ids:
+        data[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(data, 'little')
+
+
+# byte value -> positions of its set bits
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+def members(bits):
+    """The ids in a bitmap, ascending"""
+    # A byte at a time: shifting a bit at a time is quadratic in the bitmap's size
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    return [offset * 8 + bit for offset, byte in enumerate(data) if byte for bit in _BYTE_BITS[byte]]
+
+
+class TechnologyIndex:
+    def __init__(self, names, postings, projects, versions):
+        self.names = names          # technology name -> id
+        self.postings = postings    # technology id -> bitmap of project ids
+        self.projects = projects    # bitmap of every project id
+        self.versions = versions
+
+    def matching(self, names, match_all=True):
+        """Bitmap of the projects using all (or any) of the named technologies"""
+        sets = [self.postings.get(self.names.get(name), 0) for name in names]
+        if match_all:
+            bits = self.projects
+            for posting in sets:
+                bits &= posting
+            return bits
+        bits = 0
+        for posting in sets:
+            bits |= posting
+        return bits
+
+    def counts(self, scope):
+        """Technology name -> how many projects in the scope bitmap use it, for every technology"""
+        return {name: (self.postings.get(pk, 0) & scope).bit_count() for name, pk in self.names.items()}
+
+
+def build(versions=None):
+    """Read the whole index from the database; versions are read first so a concurrent change forces a rebuild"""
+    if versions is None:
+        versions = page_cache.get_versions(MODELS)
+    names = dict(Technology.objects.order_by('name').values_list('name', 'pk'))
+    linked = {pk: [] for pk in names.values()}
+    for technology_id, project_id in Project.technologies.through.objects.values_list('technology_id', 'project_id'):
+        linked.setdefault(technology_id, []).append(project_id)
+    postings = {technology_id: bitmap(ids) for technology_id, ids in linked.items()}
+    projects = bitmap(Project.objects.values_list('pk', flat=True))
+    return TechnologyIndex(names, postings, projects, versions)
+
+
+def get_index():
+    """This process's index, rebuilt when the content it was built from has changed"""
+    global _index
+    versions = page_cache.get_versions(MODELS)
+    index = _index
+    if index is None or index.versions != versions:
+        index = build(versions)
+        with _lock:
+            _index = index
+    return index
+
+
+def _apply(changes):
+    """
+    Apply (technology id, project id, linked) changes if the index was
+    current just before the bump made for them. Runs on commit, right after
+    that bump: pages.signals registers it first.
+    """
+    global _index
+    after = page_cache.get_versions(MODELS)
+    # The bump added exactly one to each counter; anything else means a missed change
+    before = [version - 1 for version in after]
+    with _lock:
+        index = _index
+        if index is None:
+            return
+        if index.versions != before:
+            # Missed a change (or the index was rebuilt meanwhile); rebuild on next use
+            _index = None
+            return
+        for technology_id, project_id, linked in changes:
+            posting = index.postings.get(technology_id, 0)
+            index.postings[technology_id] = posting | 1 << project_id if linked else posting & ~(1 << project_id)
+        index.versions = after
+
+
+def links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    m2m_changed on Project.technologies, from either side. Runs after
+    pages.signals scheduled the version bump for the same change, so the
+    update below runs once that bump has happened on commit.
+    """
+    if action == 'pre_clear':
+        # Remember what is about to be unlinked
+        related = instance.projects if reverse else instance.technologies
+        instance._facet_cleared = set(related.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    linked = action == 'post_add'
+    others = instance.__dict__.pop('_facet_cleared', set()) if action == 'post_clear' else pk_set
+    if reverse:
+        changes = [(instance.pk, project_id, linked) for project_id in others]
+    else:
+        changes = [(technology_id, instance.pk, linked) for technology_id in others]
+    transaction.on_commit(lambda: _apply(changes))
+
+
+@dataclass(frozen=True)
+class Facet:
+    name: str
+    count: int
+    selected: bool
+    url: str
+
+
+def selection(query):
+    """(selected technology names, match all) from a request's GET parameters"""
+    names = list(dict.fromkeys(name for name in query.getlist(PARAM) if name))[:MAX_SELECTED]
+    return names, query.get(MATCH_PARAM) != 'any'
+
+
+def filter_url(path, names, match_all):
+    params = [(PARAM, name) for name in names]
+    if not match_all and names:
+        params.append((MATCH_PARAM, 'any'))
+    return f'{path}?{urlencode(params)}' if params else path
+
+
+def facets(selected, match_all, path):
+    """
+    (ids of the matching projects, or None when nothing is selected, and a
+    Facet for every technology). With match all a count is how many projects
+    would be left with that technology added; with match any it is how many
+    projects use it.
+    """
+    index = get_index()
+    ids = None
+    scope = index.projects
+    if selected:
+        matches = index.matching(selected, match_all)
+        ids = members(matches)
+        if match_all:
+            scope = matches
+    chosen = set(selected)
+    result = []
+    for name, count in index.counts(scope).items():
+        toggled = [other for other in selected if other != name] if name in chosen else [*selected, name]
+        result.append(Facet(name, count, name in chosen, filter_url(path, toggled, match_all)))
+    return ids, result
@@ -1,5 +1,5 @@
 from django import forms
-from .models import Experience
+from .models import Experience, ContactMessage
 
 class ExperienceForm(forms.ModelForm):
     """Form for adding/editing experience entries"""
@@ -56,3 +56,10 @@ class ExperienceForm(forms.ModelForm):
         self.fields['display_order'].required = False
         self.fields['image'].required = False
 
+
+class ContactForm(forms.ModelForm):
+    """Validates contact submissions; the markup lives in contact_content.html"""
+    
+    class Meta:
+        model = ContactMessage
+        fields = ['name', 'email', 'subject', 'message']
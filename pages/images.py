@@ -0,0 +1,153 @@
+"""
+Resized WebP/JPEG derivatives of uploaded Project and Experience images.
+
+Derivatives live next to the uploads under MEDIA_ROOT/derivatives/ and are
+named after the source file and target width, e.g.
+``derivatives/projects/site-384w.webp``. They are produced by a background
+thread after the saving transaction commits, or in bulk by the
+generate_image_derivatives command, and never while serving a page.
+
+The widths written are recorded on the row (e.g. Project.image_derivatives,
+along with the source name they were made from), so building a srcset
+never asks the storage backend which files exist.
+"""
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import ExifTags, Image, ImageOps
+
+from .cache import bump_version
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_ROOT = 'derivatives'
+
+# Format name -> (Pillow format, save options)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# EXIF orientations that swap width and height
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-derivatives')
+
+
+def derivative_widths():
+    return getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', (96, 192, 384, 768))
+
+
+def widths_for(source_width):
+    """Target widths that would not upscale an image source_width pixels wide"""
+    widths = [w for w in derivative_widths() if not source_width or w < source_width]
+    return widths or [min(derivative_widths())]
+
+
+def derivative_name(name, width, fmt):
+    stem, _ = posixpath.splitext(name)
+    return posixpath.join(DERIVATIVE_ROOT, f'{stem}-{width}w.{fmt}')
+
+
+def _encode(image, width, fmt):
+    pil_format, options = FORMATS[fmt]
+    resized = image.copy()
+    resized.thumbnail((width, width * 10), Image.LANCZOS)
+    if pil_format == 'JPEG' and resized.mode not in ('RGB', 'L'):
+        # JPEG has no alpha channel; flatten onto white
+        background = Image.new('RGB', resized.size, 'white')
+        background.paste(resized, mask=resized.convert('RGBA').split()[-1])
+        resized = background
+    buffer = BytesIO()
+    resized.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def _record_field(field_file):
+    return f'{field_file.field.name}_derivatives'
+
+
+def recorded_widths(field_file):
+    """Widths generated for field_file's current upload, or None if none were recorded"""
+    record = getattr(field_file.instance, _record_field(field_file), None)
+    if record and record.get('name') == field_file.name:
+        return record['widths']
+    return None
+
+
+def _record(field_file, widths):
+    if recorded_widths(field_file) == widths:
+        return
+    instance, attname = field_file.instance, _record_field(field_file)
+    record = {'name': field_file.name, 'widths': widths}
+    setattr(instance, attname, record)
+    if instance.pk is not None:
+        # update() rather than save(): saving would schedule derivatives again
+        type(instance)._default_manager.filter(pk=instance.pk).update(**{attname: record})
+
+
+def generate_derivatives(field_file, force=False):
+    """Write any missing derivatives for one image and record them; returns how many were written"""
+    if not field_file:
+        return 0
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as source:
+        # Only the header is read until load(); getexif() would load a PNG
+        image = Image.open(source)
+        exif = Image.Exif()
+        exif.load(image.info.get('exif', b''))
+        transposed = exif.get(ExifTags.Base.Orientation) in TRANSPOSED_ORIENTATIONS
+        widths = widths_for(image.height if transposed else image.width)
+        wanted = [(width, fmt, derivative_name(field_file.name, width, fmt)) for width in widths for fmt in FORMATS]
+        missing = [item for item in wanted if force or not storage.exists(item[2])]
+        if missing:
+            image = ImageOps.exif_transpose(image)
+            image.load()
+
+    for width, fmt, name in missing:
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, ContentFile(_encode(image, width, fmt)))
+    _record(field_file, widths)
+    return len(missing)
+
+
+def _generate_in_background(model, pk, field_name):
+    try:
+        instance = model._default_manager.filter(pk=pk).first()
+        if instance is None:
+            return
+        field_file = getattr(instance, field_name)
+        before = recorded_widths(field_file)
+        generate_derivatives(field_file)
+        if recorded_widths(field_file) != before:
+            # Cached pages were rendered with the previous srcset
+            bump_version(model)
+    except Exception:
+        logger.exception('Generating derivatives for %s %s failed', model.__name__, pk)
+    finally:
+        close_old_connections()
+
+
+def schedule_derivatives(instance, field_name='image'):
+    """Queue derivative generation for after the current transaction commits"""
+    if not getattr(instance, field_name):
+        return
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: _executor.submit(_generate_in_background, model, pk, field_name))
+
+
+def srcset(field_file, fmt):
+    """srcset value listing the recorded derivatives of field_file"""
+    if not field_file:
+        return ''
+    storage = field_file.storage
+    return ', '.join(
+        f'{storage.url(derivative_name(field_file.name, width, fmt))} {width}w'
+        for width in recorded_widths(field_file) or ()
+    )
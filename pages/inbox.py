@@ -0,0 +1,279 @@
+"""
+Keeps the ContactMessage admin responsive with very large inboxes.
+
+* Keyset pagination on (created_at, id): every page is an index range scan
+  of list_per_page + 1 rows, however deep it is, instead of OFFSET.
+* Counts are estimated on Postgres (pg_class.reltuples for the whole table,
+  the planner's row estimate for a filtered changelist) and capped at
+  COUNT_CAP elsewhere, so no page ever counts a million rows.
+* Search goes through a full-text index over name, email, subject and
+  message: a GIN expression index on Postgres and an external-content FTS5
+  table, kept in sync by triggers, on SQLite.
+* Bulk triage (read/unread/archive/delete) runs as set-based UPDATE/DELETE
+  statements over chunks of primary keys, one short transaction per chunk,
+  so a selection of any size never holds a long lock.
+"""
+import json
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.admin.views.main import ChangeList
+from django.db import connections, transaction
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+COUNT_CAP = 10000
+BULK_CHUNK_SIZE = 2000
+AFTER_VAR = 'after'
+BEFORE_VAR = 'before'
+
+TABLE = 'pages_contactmessage'
+FTS_TABLE = 'pages_contactmessage_fts'
+SEARCH_COLUMNS = ('name', 'email', 'subject', 'message')
+# Must stay identical to the indexed expression for Postgres to use the index
+PG_SEARCH_DOCUMENT = "to_tsvector('english', " + " || ' ' || ".join(SEARCH_COLUMNS) + ")"
+PG_SEARCH_INDEX = 'contact_search_idx'
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _fts_statements():
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+    delete_old = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f'INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});'
+    return {
+        f'{FTS_TABLE}_ai': f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN {insert_new} END',
+        f'{FTS_TABLE}_ad': f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN {delete_old} END',
+        f'{FTS_TABLE}_au': (
+            f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {columns} ON {TABLE} '
+            f'BEGIN {delete_old} {insert_new} END'
+        ),
+    }
+
+
+def ensure_search_index(connection):
+    """
+    Create the full-text index if it is missing; safe to call repeatedly.
+
+    Runs from the migration that introduced it and again after every migrate,
+    because SQLite drops the triggers whenever a migration rebuilds the table.
+    """
+    if TABLE not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {PG_SEARCH_INDEX} ON {TABLE} USING gin ({PG_SEARCH_DOCUMENT})')
+        elif connection.vendor == 'sqlite':
+            triggers = _fts_statements()
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s", [TABLE]
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            if existing.issuperset(triggers):
+                return
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"{', '.join(SEARCH_COLUMNS)}, content='{TABLE}', content_rowid='id')"
+            )
+            for statement in triggers.values():
+                cursor.execute(statement)
+            # Rows written while the triggers were missing are not indexed yet
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'DROP INDEX IF EXISTS {PG_SEARCH_INDEX}')
+        elif connection.vendor == 'sqlite':
+            for name in _fts_statements():
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def _fts_query(term):
+    """Every word must appear, matched as a prefix; quoting disarms FTS5 syntax"""
+    words = term.split()
+    return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+# tsquery operators and quoting; dropping them leaves only words for the parser
+TSQUERY_SYNTAX = re.compile(r"[&|!():*<>'\\]")
+
+
+def _pg_query(term):
+    """Every word must appear, matched as a prefix, like _fts_query; to_tsquery drops stopwords"""
+    words = TSQUERY_SYNTAX.sub(' ', term).split()
+    return ' & '.join(f'{word}:*' for word in words)
+
+
+def search(queryset, term):
+    """Filter queryset to messages matching term, or None if this backend has no search index"""
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        return queryset.filter(RawSQL(
+            f"{PG_SEARCH_DOCUMENT} @@ to_tsquery('english', %s)", [_pg_query(term)], output_field=BooleanField(),
+        ))
+    if vendor == 'sqlite':
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [_fts_query(term)],
+        ))
+    return None
+
+
+def _planner_estimate(queryset):
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            # -1 until the table has been vacuumed or analyzed
+            return row[0] if row and row[0] >= 0 else None
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_rows(queryset):
+    """(count, exact) without counting more than COUNT_CAP rows"""
+    if connections[queryset.db].vendor == 'postgresql':
+        estimate = _planner_estimate(queryset.order_by())
+        if estimate is not None and estimate > COUNT_CAP:
+            return estimate, False
+        return queryset.count(), True
+    count = queryset.order_by()[:COUNT_CAP + 1].count()
+    return (COUNT_CAP, False) if count > COUNT_CAP else (count, True)
+
+
+def count_display(count, using):
+    """Human-readable form of an inexact count_rows() result"""
+    if connections[using].vendor == 'postgresql':
+        return f'about {count:,}'
+    return f'{count:,}+'
+
+
+def _pk_chunks(queryset, chunk_size):
+    """Successive lists of at most chunk_size primary keys of queryset, in pk order"""
+    keys = queryset.order_by('pk').values_list('pk', flat=True)
+    last = None
+    while True:
+        chunk = list((keys if last is None else keys.filter(pk__gt=last))[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+def apply_in_chunks(queryset, operation, chunk_size=None, progress=None):
+    """
+    Call operation(chunk) for successive chunks of queryset, each chunk a
+    pk__in queryset committed in its own transaction. operation returns the
+    number of rows it affected; progress(done) is called after every chunk.
+    Returns the total.
+    """
+    manager = queryset.model._default_manager.db_manager(queryset.db)
+    done = 0
+    for pks in _pk_chunks(queryset, chunk_size or BULK_CHUNK_SIZE):
+        with transaction.atomic(using=queryset.db):
+            done += operation(manager.filter(pk__in=pks))
+        if progress:
+            progress(done)
+    return done
+
+
+def log_progress(description, total):
+    """progress callback for apply_in_chunks that logs how far a large operation has got"""
+    started = time.monotonic()
+
+    def progress(done):
+        logger.info('%s: %d of ~%d rows after %.1fs', description, done, max(done, total), time.monotonic() - started)
+    return progress
+
+
+def update_in_chunks(queryset, values, **kwargs):
+    """Chunked queryset.update(**values), skipping rows that already have the values"""
+    return apply_in_chunks(queryset.exclude(**values), lambda chunk: chunk.update(**values), **kwargs)
+
+
+def delete_in_chunks(queryset, **kwargs):
+    return apply_in_chunks(queryset, lambda chunk: chunk.delete()[0], **kwargs)
+
+
+def encode_cursor(created_at, pk):
+    delta = created_at - EPOCH
+    return f'{(delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds}.{pk}'
+
+
+def decode_cursor(value):
+    """(created_at, pk) from encode_cursor(), or None if malformed"""
+    try:
+        micros, pk = value.split('.')
+        return EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+class KeysetChangeList(ChangeList):
+    """ChangeList paged by (created_at, id) cursors instead of page numbers"""
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(AFTER_VAR, None)
+        lookup_params.pop(BEFORE_VAR, None)
+        return lookup_params
+
+    def get_results(self, request):
+        # Filter and search links must start again from the newest message
+        self.params.pop(AFTER_VAR, None)
+        self.params.pop(BEFORE_VAR, None)
+        after = decode_cursor(request.GET.get(AFTER_VAR))
+        before = None if after else decode_cursor(request.GET.get(BEFORE_VAR))
+
+        per_page = self.list_per_page
+        if before:
+            created_at, pk = before
+            keys_qs = self.queryset.filter(
+                Q(created_at__gt=created_at) | Q(pk__gt=pk), created_at__gte=created_at,
+            ).order_by('created_at', 'pk')
+        else:
+            keys_qs = self.queryset.order_by('-created_at', '-pk')
+            if after:
+                created_at, pk = after
+                # The redundant created_at bound lets the index seek straight to the cursor
+                keys_qs = keys_qs.filter(Q(created_at__lt=created_at) | Q(pk__lt=pk), created_at__lte=created_at)
+        keys = list(keys_qs.values_list('created_at', 'pk')[:per_page + 1])
+        more = len(keys) > per_page
+        keys = keys[:per_page]
+        if before:
+            keys.reverse()
+
+        has_newer = bool(after) or (bool(before) and more)
+        has_older = bool(before) or more
+        self.newest_url = self.get_query_string() if (after or before) else None
+        self.newer_url = self.get_query_string({BEFORE_VAR: encode_cursor(*keys[0])}) if keys and has_newer else None
+        self.older_url = self.get_query_string({AFTER_VAR: encode_cursor(*keys[-1])}) if keys and has_older else None
+
+        self.result_count, self.result_count_exact = count_rows(self.queryset)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = self.queryset.filter(pk__in=[pk for _, pk in keys]).order_by('-created_at', '-pk')
+        # The stock page-number pagination stays switched off; pagination.html uses the URLs above
+        self.can_show_all = False
+        self.multi_page = False
+        self.paginator = None
+
+    @property
+    def result_count_display(self):
+        if self.result_count_exact:
+            return f'{self.result_count:,}'
+        return count_display(self.result_count, self.queryset.db)
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from pages.critical_css import CRITICAL_DIR, EXTENDS_RE, critical_name, extract
+
+class Command(BaseCommand):
+    help = 'Extracts the above-the-fold CSS of each page template from the Tailwind build into static/css/critical/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stylesheet', default='css/site.css', help='Static path of the full stylesheet')
+        parser.add_argument('--output', default=str(Path(settings.BASE_DIR) / 'static' / CRITICAL_DIR),
+                            help='Directory to write the critical CSS files to')
+
+    def handle(self, *args, **options):
+        stylesheet = finders.find(options['stylesheet'])
+        if not stylesheet:
+            raise CommandError(f"{options['stylesheet']} not found; run npm run build-css first")
+        css = Path(stylesheet).read_text()
+        fold = getattr(settings, 'CRITICAL_CSS_FOLD', 3000)
+
+        # Inlined CSS past the first round trip delays the paint it is meant to speed up
+        budget = getattr(settings, 'CRITICAL_CSS_BUDGET', 10 * 1024)
+
+        templates_dir = Path(settings.BASE_DIR) / 'pages' / 'templates' / 'pages'
+        extracted = {}
+        for template in sorted(templates_dir.glob('*.html')):
+            if not EXTENDS_RE.search(template.read_text()):
+                # HTMX partials are swapped into a page that already has the stylesheet
+                continue
+            name = f'pages/{template.name}'
+            extracted[name] = extract(css, name, fold)
+        over = [f'{name} ({len(critical)} bytes)' for name, critical in extracted.items() if len(critical) > budget]
+        if over:
+            raise CommandError(f"Critical CSS over the {budget} byte budget: {', '.join(over)}")
+
+        output = Path(options['output'])
+        output.mkdir(parents=True, exist_ok=True)
+        for name, critical in extracted.items():
+            target = output / Path(critical_name(name)).name
+            target.write_text(critical)
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: {len(critical)} of {len(css)} bytes -> {target.relative_to(settings.BASE_DIR) if target.is_relative_to(settings.BASE_DIR) else target}'
+            ))
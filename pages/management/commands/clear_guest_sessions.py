@@ -0,0 +1,48 @@
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = 'Deletes the sessions created by the old database-backed guest auto-login'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Sessions scanned and deleted per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Count matching sessions without deleting them')
+        parser.add_argument('--delete-user', action='store_true', help='Also delete the guest user once its sessions are gone')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        guest = User.objects.filter(username='guest').first()
+        if guest is None:
+            self.stdout.write('No guest user found, nothing to clean up.')
+            return
+        guest_id = str(guest.pk)
+
+        scanned = deleted = 0
+        last_key = ''
+        while True:
+            # Keyset pagination over the primary key keeps each batch an index range scan
+            batch = list(
+                Session.objects.filter(session_key__gt=last_key)
+                .order_by('session_key')[:batch_size]
+            )
+            if not batch:
+                break
+            last_key = batch[-1].session_key
+            scanned += len(batch)
+
+            guest_keys = [s.session_key for s in batch if str(s.get_decoded().get(SESSION_KEY)) == guest_id]
+            if guest_keys and not dry_run:
+                Session.objects.filter(session_key__in=guest_keys).delete()
+            deleted += len(guest_keys)
+            self.stdout.write(f'Scanned {scanned} sessions, {deleted} guest sessions so far')
+
+        verb = 'Would delete' if dry_run else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {deleted} guest sessions out of {scanned}'))
+
+        if options['delete_user'] and not dry_run:
+            guest.delete()
+            self.stdout.write(self.style.SUCCESS('Deleted the guest user'))
@@ -0,0 +1,48 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from pages import content
+
+class Command(BaseCommand):
+    help = 'Exports or imports projects, technologies, skills and experiences as streaming JSONL'
+
+    def add_arguments(self, parser):
+        subcommands = parser.add_subparsers(dest='subcommand', required=True)
+        export = subcommands.add_parser('export', help='Write all content as JSON lines')
+        export.add_argument('--output', '-o', default='-', help='File to write, or - for stdout (default)')
+        export.add_argument('--chunk-size', type=int, default=500, help='Rows fetched per database round trip')
+        load = subcommands.add_parser('import', help='Create or update content from JSON lines')
+        load.add_argument('path', help='File to read, or - for stdin')
+        load.add_argument('--batch-size', type=int, default=500, help='Lines applied per transaction')
+
+    def handle(self, *args, **options):
+        if options['subcommand'] == 'export':
+            self.export(options)
+        else:
+            self.load(options)
+
+    def export(self, options):
+        if options['output'] == '-':
+            counts = content.export(self.stdout, chunk_size=options['chunk_size'])
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                counts = content.export(output, chunk_size=options['chunk_size'])
+        summary = ', '.join(f'{count} {label}' for label, count in counts.items())
+        # Keep stdout clean for the JSON lines themselves
+        self.stderr.write(self.style.SUCCESS(f'Exported {summary}'))
+
+    def load(self, options):
+        importer = content.Importer(batch_size=options['batch_size'])
+        try:
+            if options['path'] == '-':
+                results = importer.run(sys.stdin)
+            else:
+                with open(options['path'], encoding='utf-8') as source:
+                    results = importer.run(source)
+        except content.ContentError as exc:
+            raise CommandError(f'Import stopped at {exc}; earlier batches were committed')
+        for label, result in results.items():
+            self.stdout.write(self.style.SUCCESS(f'{label}: {result}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'project technologies: {importer.links_added} added, {importer.links_removed} removed'
+        ))
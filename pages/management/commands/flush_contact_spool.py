@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from pages import spool
+
+class Command(BaseCommand):
+    help = 'Writes spooled contact form submissions to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk_create')
+        parser.add_argument('--loop', action='store_true', help='Keep flushing every --interval seconds')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between flushes with --loop')
+
+    def handle(self, *args, **options):
+        if not spool.enabled():
+            raise CommandError('CONTACT_SPOOL_DIR is not set, so there is no spool to flush.')
+
+        while True:
+            flushed = spool.flush(batch_size=options['batch_size'])
+            if flushed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} contact submissions'))
+            if not options['loop']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from pages.cache import bump_version
+from pages.images import generate_derivatives, recorded_widths
+from pages.models import Project, Experience
+
+class Command(BaseCommand):
+    help = 'Generates resized WebP/JPEG variants for existing project and experience images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate derivatives that already exist')
+
+    def handle(self, *args, **options):
+        for model in (Project, Experience):
+            written = images = 0
+            recorded = False
+            for instance in model.objects.exclude(image='').exclude(image__isnull=True).iterator():
+                if not instance.image.storage.exists(instance.image.name):
+                    self.stderr.write(f'Missing file for {model.__name__} {instance.pk}: {instance.image.name}')
+                    continue
+                images += 1
+                if instance.image_width is None:
+                    # Rows uploaded before the dimension fields existed
+                    model.objects.filter(pk=instance.pk).update(
+                        image_width=instance.image.width, image_height=instance.image.height,
+                    )
+                before = recorded_widths(instance.image)
+                written += generate_derivatives(instance.image, force=options['force'])
+                recorded |= recorded_widths(instance.image) != before
+
+            if recorded:
+                bump_version(model)
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural.title()}: wrote {written} derivatives for {images} images'
+            ))
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from pages import prerender
+
+class Command(BaseCommand):
+    help = 'Renders the public pages to static HTML files for the pre-rendered page middleware or a front proxy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('pages', nargs='*', metavar='page',
+                            help=f"Pages to render (default: all of {', '.join(prerender.PAGES)})")
+        parser.add_argument('--output', help='Directory to write to (default: PRERENDER_DIR)')
+        parser.add_argument('--clear', action='store_true', help='Delete the files instead, so the views serve every request')
+
+    def handle(self, *args, **options):
+        root = options['output']
+        if not root and not prerender.enabled():
+            raise CommandError('PRERENDER_DIR is not set; pass --output to render somewhere else.')
+        unknown = set(options['pages']) - set(prerender.PAGES)
+        if unknown:
+            raise CommandError(f"Unknown pages: {', '.join(sorted(unknown))}")
+        names = options['pages'] or None
+
+        if options['clear']:
+            removed = prerender.remove_pages(names, root)
+            self.stdout.write(self.style.SUCCESS(f'Removed {removed} pre-rendered files'))
+            return
+
+        written = prerender.render_pages(names, root)
+        self.stdout.write(self.style.SUCCESS(f'Rendered {len(written)} files to {root or settings.PRERENDER_DIR}'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from pages import search
+from pages.cache import bump_version
+
+class Command(BaseCommand):
+    help = 'Recreates the site search index and brings every search document up to date'
+
+    def handle(self, *args, **options):
+        search.ensure_search_index(connection)
+        written = search.rebuild()
+        if written:
+            # Cached results were computed from the old documents
+            bump_version(*search.SEARCH_MODELS)
+        self.stdout.write(self.style.SUCCESS(f'Updated {written} search documents'))
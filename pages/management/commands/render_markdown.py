@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from pages import search
+from pages.cache import bump_version
+from pages.models import Experience
+from pages.rendering import markdown_to_html
+
+class Command(BaseCommand):
+    help = 'Backfills Experience.description_html from the markdown descriptions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows written per UPDATE batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pending = []
+        updated = 0
+
+        experiences = Experience.objects.only('id', 'description', 'description_html').order_by('pk')
+        for experience in experiences.iterator(chunk_size=batch_size):
+            html = markdown_to_html(experience.description)
+            if html == experience.description_html:
+                continue
+            experience.description_html = html
+            pending.append(experience)
+            if len(pending) >= batch_size:
+                Experience.objects.bulk_update(pending, ['description_html'])
+                updated += len(pending)
+                pending = []
+
+        if pending:
+            Experience.objects.bulk_update(pending, ['description_html'])
+            updated += len(pending)
+
+        if updated:
+            # bulk_update skips post_save, so update search and invalidate cached pages explicitly
+            search.sync_models(Experience)
+            bump_version(Experience)
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered {updated} experience descriptions'))
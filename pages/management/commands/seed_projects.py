@@ -1,5 +1,9 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from pages import search
+from pages.cache import bump_version
 from pages.models import Project, Technology
+from pages.seeding import sync_m2m, upsert
 
 class Command(BaseCommand):
     help = 'Populates the database with initial portfolio projects'
@@ -7,14 +11,6 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         self.stdout.write('Adding projects...')
 
-        # Helper function to get or create techs
-        def get_techs(names):
-            tech_objs = []
-            for name in names:
-                tech, created = Technology.objects.get_or_create(name=name.strip())
-                tech_objs.append(tech)
-            return tech_objs
-
         # Define the projects data
         projects_data = [
             {
@@ -43,25 +39,38 @@ class Command(BaseCommand):
             }
         ]
 
-        # Loop through and create them
-        for p_data in projects_data:
-            project, created = Project.objects.get_or_create(
-                title=p_data["title"],
-                defaults={
-                    "description": p_data["description"],
-                    "display_order": p_data["display_order"],
-                    "featured": True
-                }
+        with transaction.atomic():
+            tech_names = sorted({name.strip() for p_data in projects_data for name in p_data["technologies"]})
+            techs, tech_result = upsert(Technology, 'name', [{"name": name} for name in tech_names])
+
+            projects, project_result = upsert(
+                Project,
+                'title',
+                [
+                    {"title": p_data["title"], "description": p_data["description"], "display_order": p_data["display_order"]}
+                    for p_data in projects_data
+                ],
+                create_defaults={"featured": True},
+            )
+
+            added, removed = sync_m2m(
+                Project.technologies.through,
+                'project_id',
+                'technology_id',
+                {
+                    projects[p_data["title"]].pk: {techs[name.strip()].pk for name in p_data["technologies"]}
+                    for p_data in projects_data
+                },
             )
-            
-            # Update existing projects
-            if not created:
-                project.description = p_data["description"]
-                project.display_order = p_data["display_order"]
-                project.save()
 
-            # Add technologies
-            techs = get_techs(p_data["technologies"])
-            project.technologies.set(techs)
-            
-            self.stdout.write(self.style.SUCCESS(f'Successfully processed: {project.title}'))
+            # bulk writes send no post_save/m2m_changed, so update search and invalidate cached pages here
+            if tech_result.changed or project_result.changed or added or removed:
+                transaction.on_commit(self.content_changed)
+
+        self.stdout.write(self.style.SUCCESS(f'Technologies: {tech_result}'))
+        self.stdout.write(self.style.SUCCESS(f'Projects: {project_result}'))
+        self.stdout.write(self.style.SUCCESS(f'Project technologies: {added} added, {removed} removed'))
+
+    def content_changed(self):
+        search.sync_models(Project, Technology)
+        bump_version(Project, Technology)
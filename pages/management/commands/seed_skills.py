@@ -1,5 +1,9 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from pages import search
+from pages.cache import bump_version
 from pages.models import Skill
+from pages.seeding import upsert
 
 class Command(BaseCommand):
     help = 'Populates the database with skills based on the user provided list'
@@ -63,25 +67,24 @@ class Command(BaseCommand):
             {"name": "System Design", "icon": "🏗️", "level": 85, "order": 4, "category": "FUND"},
         ]
 
-        count = 0
-        for s_data in skills_data:
-            skill, created = Skill.objects.get_or_create(
-                name=s_data["name"],
-                defaults={
-                    "icon": s_data["icon"],
-                    "level": s_data["level"],
-                    "display_order": s_data["order"],
-                    "category": s_data["category"]
-                }
-            )
-            
-            # Update existing
-            skill.category = s_data["category"]  # Force update category
-            skill.icon = s_data["icon"]
-            skill.level = s_data["level"]
-            skill.display_order = s_data["order"]
-            skill.save()
-                
-            count += 1
-            
-        self.stdout.write(self.style.SUCCESS(f'Successfully processed {count} skills'))
+        rows = [
+            {
+                "name": s_data["name"],
+                "icon": s_data["icon"],
+                "level": s_data["level"],
+                "display_order": s_data["order"],
+                "category": s_data["category"],
+            }
+            for s_data in skills_data
+        ]
+        with transaction.atomic():
+            _, result = upsert(Skill, 'name', rows)
+            if result.changed:
+                # bulk writes send no post_save, so update search and invalidate cached pages here
+                transaction.on_commit(self.content_changed)
+
+        self.stdout.write(self.style.SUCCESS(f'Skills: {result}'))
+
+    def content_changed(self):
+        search.sync_models(Skill)
+        bump_version(Skill)
@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from pages import inbox
+from pages.models import ContactMessage
+
+ACTIONS = {
+    'read': {'read': True},
+    'unread': {'read': False},
+    'archive': {'archived': True},
+    'unarchive': {'archived': False},
+}
+
+class Command(BaseCommand):
+    help = 'Marks, archives or deletes contact messages in chunks, reporting progress; for selections too large for the admin'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=[*ACTIONS, 'delete'])
+        parser.add_argument('--search', help='Only messages matching this full-text search')
+        parser.add_argument('--older-than', type=int, metavar='DAYS', help='Only messages received more than DAYS ago')
+        parser.add_argument('--unread', action='store_true', help='Only unread messages')
+        parser.add_argument('--archived', action='store_true', help='Only archived messages')
+        parser.add_argument('--chunk-size', type=int, default=inbox.BULK_CHUNK_SIZE, help='Rows per UPDATE/DELETE')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many messages match')
+
+    def handle(self, *args, **options):
+        queryset = ContactMessage.objects.all()
+        if options['search']:
+            searched = inbox.search(queryset, options['search'])
+            queryset = searched if searched is not None else queryset.filter(message__icontains=options['search'])
+        if options['older_than'] is not None:
+            queryset = queryset.filter(created_at__lt=timezone.now() - timedelta(days=options['older_than']))
+        if options['unread']:
+            queryset = queryset.filter(read=False)
+        if options['archived']:
+            queryset = queryset.filter(archived=True)
+
+        total, exact = inbox.count_rows(queryset)
+        matching = f'{total:,}' if exact else inbox.count_display(total, queryset.db)
+        if options['dry_run']:
+            self.stdout.write(f'{matching} messages match')
+            return
+
+        def progress(done):
+            self.stdout.write(f'  {done:,} of {matching} done', ending='\r')
+            self.stdout.flush()
+
+        action = options['action']
+        if action == 'delete':
+            changed = inbox.delete_in_chunks(queryset, chunk_size=options['chunk_size'], progress=progress)
+        else:
+            changed = inbox.update_in_chunks(queryset, ACTIONS[action], chunk_size=options['chunk_size'], progress=progress)
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f'{action}: {changed:,} messages changed'))
@@ -0,0 +1,156 @@
+"""
+Serving of user uploads under MEDIA_URL.
+
+Replaces django.views.static.serve with a view that:
+
+* streams through FileResponse, so gunicorn can hand the file to sendfile(2)
+  via wsgi.file_wrapper, or delegates entirely to the front proxy with
+  X-Accel-Redirect / X-Sendfile when MEDIA_SENDFILE is configured;
+* answers If-None-Match / If-Modified-Since with 304;
+* supports single byte ranges (206 / 416), honouring If-Range;
+* marks content-hashed upload names as Cache-Control: immutable.
+"""
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.deconstruct import deconstructible
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+# Matches "<stem>.<12 hex digits>.<ext>" as written by HashedUploadTo,
+# including image derivatives named "<stem>.<hash>-384w.webp"
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}(?:-\d+w)?\.[A-Za-z0-9]+$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+CHUNK_SIZE = 64 * 1024
+
+
+@deconstructible
+class HashedUploadTo:
+    """
+    upload_to callable that names uploads after a hash of their content, so
+    a URL always refers to the same bytes and can be cached forever.
+    """
+    def __init__(self, prefix, field_name='image'):
+        self.prefix = prefix
+        self.field_name = field_name
+
+    def __call__(self, instance, filename):
+        stem, ext = posixpath.splitext(os.path.basename(filename))
+        upload = getattr(instance, self.field_name).file
+        digest = hashlib.sha256()
+        upload.seek(0)
+        for chunk in iter(lambda: upload.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+        upload.seek(0)
+        return posixpath.join(self.prefix, f'{stem}.{digest.hexdigest()[:12]}{ext.lower()}')
+
+    def __eq__(self, other):
+        return isinstance(other, HashedUploadTo) and (self.prefix, self.field_name) == (other.prefix, other.field_name)
+
+
+def _parse_range(header, size):
+    """Return (start, end) inclusive for a single satisfiable range, None to ignore, or False if unsatisfiable"""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # Multiple ranges or another unit: sending the whole file is allowed
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _iter_range(path, start, length):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except Exception:
+        raise Http404('Invalid media path')
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404('Media file not found')
+    if not os.path.isfile(full_path):
+        raise Http404('Media file not found')
+
+    size, mtime = stat.st_size, int(stat.st_mtime)
+    etag = quote_etag(f'{mtime:x}-{size:x}')
+    immutable = bool(HASHED_NAME_RE.search(path))
+
+    def finalize(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(mtime)
+        response['Accept-Ranges'] = 'bytes'
+        if immutable:
+            patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+        else:
+            patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE)
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=mtime)
+    if not_modified is not None:
+        return finalize(not_modified)
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    sendfile = getattr(settings, 'MEDIA_SENDFILE', '')
+    if sendfile:
+        # The proxy streams the file and handles Range itself
+        response = HttpResponse(content_type=content_type)
+        if sendfile == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.MEDIA_SENDFILE_PREFIX.rstrip('/') + '/' + path.lstrip('/')
+        else:
+            response['X-Sendfile'] = full_path
+        return finalize(response)
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if range_header and request.headers.get('If-Range', etag) == etag:
+        byte_range = _parse_range(range_header, size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return finalize(response)
+
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(_iter_range(full_path, start, length), status=206, content_type=content_type)
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    else:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return finalize(response)
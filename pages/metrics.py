@@ -0,0 +1,194 @@
+"""
+Per-request timings for RequestMetricsMiddleware (pages/middleware.py).
+
+Each request collects its database time and query count through
+connection.execute_wrapper, and its template render time through a wrapper
+around the Django template backend, into a RequestTiming held in a context
+variable. Finished requests are aggregated here per view into Prometheus
+histograms and counters, which render() serves in the text exposition format.
+
+render() also reports the state of each pooled database connection pool.
+
+The registry lives in process memory: under gunicorn every worker keeps, and
+reports, its own numbers, as /cache-stats/ does.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from personalwebsite.backends.postgresql_pool import pool as db_pool
+
+from . import cache as page_cache
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+current = ContextVar('pages_request_timing', default=None)
+
+
+class RequestTiming:
+    """Time spent by one request, in seconds"""
+
+    def __init__(self):
+        self.db = 0.0
+        self.queries = 0
+        self.template = 0.0
+        self.template_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        """execute_wrapper hook"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+
+    def server_timing(self, total):
+        return (
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries", '
+            f'template;dur={self.template * 1000:.1f}, '
+            f'view;dur={total * 1000:.1f}'
+        )
+
+
+def instrument_templates():
+    """Time the outermost template render of each request; safe to call repeatedly"""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'timed', False):
+        return
+    original = Template.render
+
+    @wraps(original)
+    def render(self, context=None, request=None):
+        timing = current.get()
+        if timing is None:
+            return original(self, context, request)
+        # render_to_string inside a template tag must not count twice
+        timing.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            timing.template_depth -= 1
+            if not timing.template_depth:
+                timing.template += time.perf_counter() - start
+
+    render.timed = True
+    Template.render = render
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += 1
+        self.sum += value
+
+
+_lock = threading.Lock()
+_durations = {}
+_db_durations = {}
+_requests = {}
+_queries = {}
+_template_seconds = {}
+
+
+def observe(view, method, status, timing, total):
+    labels = (view, method)
+    with _lock:
+        _durations.setdefault(labels, Histogram()).observe(total)
+        _db_durations.setdefault(labels, Histogram()).observe(timing.db)
+        _requests[(view, method, str(status))] = _requests.get((view, method, str(status)), 0) + 1
+        _queries[labels] = _queries.get(labels, 0) + timing.queries
+        _template_seconds[labels] = _template_seconds.get(labels, 0.0) + timing.template
+
+
+def reset():
+    with _lock:
+        for registry in (_durations, _db_durations, _requests, _queries, _template_seconds):
+            registry.clear()
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, **extra):
+    pairs = [*zip(names, values), *extra.items()]
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _histogram(lines, name, help_text, histograms):
+    lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for labels, histogram in sorted(histograms.items()):
+        for bound, count in zip(BUCKETS, histogram.counts):
+            lines.append(f'{name}_bucket{_labels(("view", "method"), labels, le=repr(bound))} {count}')
+        lines.append(f'{name}_bucket{_labels(("view", "method"), labels, le="+Inf")} {histogram.total}')
+        lines.append(f'{name}_sum{_labels(("view", "method"), labels)} {_format(histogram.sum)}')
+        lines.append(f'{name}_count{_labels(("view", "method"), labels)} {histogram.total}')
+
+
+def _counter(lines, name, help_text, names, values):
+    lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+    for labels, value in sorted(values.items()):
+        lines.append(f'{name}{_labels(names, labels)} {_format(value)}')
+
+
+POOL_GAUGES = (
+    ('idle', 'Idle connections in the database pool.'),
+    ('in_use', 'Database pool connections lent to requests.'),
+    ('waiting', 'Requests waiting for a database pool connection.'),
+    ('max_size', 'Maximum size of the database pool.'),
+)
+POOL_COUNTERS = (
+    ('checkouts', 'Connections lent from the database pool.'),
+    ('created', 'Connections opened by the database pool.'),
+    ('closed', 'Connections closed by the database pool.'),
+    ('failed_checks', 'Pooled connections that failed a health check.'),
+    ('timeouts', 'Requests that gave up waiting for a database pool connection.'),
+    ('wait_seconds', 'Time requests spent waiting for a database pool connection.'),
+)
+
+
+def _pool_metrics(lines):
+    pool_stats = {(alias,): pool.stats() for alias, pool in db_pool.pools().items()}
+    if not pool_stats:
+        return
+    for key, help_text in POOL_GAUGES:
+        name = f'pages_db_pool_{key}'
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+        lines += [f'{name}{_labels(("alias",), labels)} {stats[key]}' for labels, stats in sorted(pool_stats.items())]
+    for key, help_text in POOL_COUNTERS:
+        _counter(lines, f'pages_db_pool_{key}_total', help_text, ('alias',), {
+            labels: stats[key] for labels, stats in pool_stats.items()
+        })
+
+
+def render():
+    """The registry and the page cache counters in Prometheus text format"""
+    lines = []
+    with _lock:
+        _histogram(lines, 'pages_request_duration_seconds', 'Time spent below the metrics middleware.', _durations)
+        _histogram(lines, 'pages_request_db_seconds', 'Time spent in database queries per request.', _db_durations)
+        _counter(lines, 'pages_requests_total', 'Requests served.', ('view', 'method', 'status'), _requests)
+        _counter(lines, 'pages_db_queries_total', 'Database queries executed.', ('view', 'method'), _queries)
+        _counter(lines, 'pages_template_seconds_total', 'Time spent rendering templates.', ('view', 'method'), _template_seconds)
+    _pool_metrics(lines)
+    cache_stats = page_cache.stats()
+    for outcome in ('hits', 'misses'):
+        name = f'pages_page_cache_{outcome}_total'
+        lines += [f'# HELP {name} Page cache {outcome} in this process.', f'# TYPE {name} counter', f'{name} {cache_stats[outcome]}']
+    return '\n'.join(lines) + '\n'
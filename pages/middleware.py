@@ -1,39 +1,291 @@
-from django.contrib.auth import login
-from django.contrib.auth.models import User
-from django.utils.deprecation import MiddlewareMixin
-
-class AutoGuestLoginMiddleware(MiddlewareMixin):
-    """
-    Automatically logs in users as 'guest' if they're not authenticated.
-    Guest user is created automatically if it doesn't exist.
-    """
-    def process_request(self, request):
-        # Skip if user is already authenticated
-        if request.user.is_authenticated:
-            return None
-        
-        # Skip for login/logout URLs to avoid redirect loops
-        if request.path.startswith('/login/') or request.path.startswith('/logout/'):
-            return None
-        
-        # Get or create guest user
-        guest_user, created = User.objects.get_or_create(
-            username='guest',
-            defaults={
-                'email': 'guest@example.com',
-                'is_staff': False,
-                'is_superuser': False,
-            }
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import middleware as auth
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages import middleware as message
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.sessions import middleware as sessions
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.middleware import clickjacking, common, csrf, security
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import metrics, prerender
+from .cache import is_partial
+
+
+class GuestUser(AnonymousUser):
+    """
+    Anonymous principal presented to visitors who are not logged in.
+    Templates and views tell it apart from real accounts by its username,
+    exactly as they did with the old database-backed 'guest' user.
+    """
+    username = 'guest'
+
+    def __str__(self):
+        return self.username
+
+
+# Stateless, so one instance is shared by every request in the process
+GUEST_USER = GuestUser()
+
+
+class AsyncCapableMiddleware:
+    """
+    Base for middleware that runs natively in both modes, the way Django's
+    MiddlewareMixin does, but without pushing its own work through
+    sync_to_async under ASGI. Subclasses implement handle() and ahandle().
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.ahandle(request)
+        return self.handle(request)
+
+
+class InlineHooksMixin:
+    """
+    For Django's built-in MiddlewareMixin middleware. Under ASGI, MiddlewareMixin
+    runs every process_request and process_response through sync_to_async, a
+    hand-off to the one sync thread and back, which adds up to over a dozen per
+    request for this stack. The hooks of the middleware below do no blocking
+    I/O, so in async mode they are called directly on the event loop instead.
+    """
+    async def __acall__(self, request):
+        response = None
+        if hasattr(self, 'process_request'):
+            response = self.process_request(request)
+        response = response or await self.get_response(request)
+        if hasattr(self, 'process_response'):
+            response = await self.aprocess_response(request, response)
+        return response
+
+    async def aprocess_response(self, request, response):
+        return self.process_response(request, response)
+
+
+class SecurityMiddleware(InlineHooksMixin, security.SecurityMiddleware):
+    pass
+
+
+class SessionMiddleware(InlineHooksMixin, sessions.SessionMiddleware):
+    async def aprocess_response(self, request, response):
+        session = request.session
+        if (session.modified or settings.SESSION_SAVE_EVERY_REQUEST) and not session.is_empty():
+            # Only saving touches the session store
+            return await sync_to_async(self.process_response)(request, response)
+        return self.process_response(request, response)
+
+
+class CommonMiddleware(InlineHooksMixin, common.CommonMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(InlineHooksMixin, csrf.CsrfViewMiddleware):
+    """Assumes CSRF_USE_SESSIONS is off; with it on, process_request could load the session"""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if iscoroutinefunction(self):
+            # The handler calls process_view itself, via sync_to_async unless it is a coroutine function
+            self.process_view = self.aprocess_view
+
+    async def aprocess_view(self, request, callback, callback_args, callback_kwargs):
+        return csrf.CsrfViewMiddleware.process_view(self, request, callback, callback_args, callback_kwargs)
+
+
+class AuthenticationMiddleware(InlineHooksMixin, auth.AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(InlineHooksMixin, message.MessageMiddleware):
+    pass
+
+
+class XFrameOptionsMiddleware(InlineHooksMixin, clickjacking.XFrameOptionsMiddleware):
+    pass
+
+
+class AutoGuestLoginMiddleware(AsyncCapableMiddleware):
+    """
+    Presents unauthenticated visitors as the shared guest principal.
+    Nothing is written to the database or the session, so cold visitors
+    and bots cost no queries and no django_session rows.
+    """
+    def handle(self, request):
+        auth_user = request.user
+
+        def get_user():
+            # Resolved lazily so requests that never look at the user
+            # don't even trigger the session lookup
+            if auth_user.is_authenticated:
+                return auth_user
+            return GUEST_USER
+
+        request.user = SimpleLazyObject(get_user)
+        return self.get_response(request)
+
+    async def ahandle(self, request):
+        # A lazy user would query the session table from the event loop,
+        # which Django refuses; resolve it up front instead. Without a
+        # session cookie there is nothing to look up.
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            request.user = await sync_to_async(_resolve_user)(request.user)
+        else:
+            request.user = GUEST_USER
+        return await self.get_response(request)
+
+
+def _resolve_user(auth_user):
+    # Loading the user also loads the session, so messages and session reads
+    # later in the request need no query either
+    return auth_user if auth_user.is_authenticated else GUEST_USER
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, able to run in an async middleware stack. Stock WhiteNoise is
+    sync-only, and one sync-only middleware makes Django run every view
+    below it through async_to_sync in a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.acall(request)
+        return super().__call__(request)
+
+    async def acall(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
+
+
+class PrerenderedPagesMiddleware(AsyncCapableMiddleware):
+    """
+    Serves the pages written by pages/prerender.py to cookieless GETs, before
+    sessions, authentication or the views run. Requests for pages that have not
+    been rendered fall through to the views. Removes itself from the stack at
+    startup unless PRERENDER_DIR is set.
+    """
+    def __init__(self, get_response):
+        if not prerender.enabled():
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.paths = None
+
+    def handle(self, request):
+        if self.servable(request):
+            page = prerender.load(request.path_info, is_partial(request))
+            if page is not None:
+                return prerender.respond(request, *page)
+        return self.get_response(request)
+
+    async def ahandle(self, request):
+        if self.servable(request):
+            page = await sync_to_async(prerender.load, thread_sensitive=False)(
+                request.path_info, is_partial(request),
+            )
+            if page is not None:
+                return prerender.respond(request, *page)
+        return await self.get_response(request)
+
+    def servable(self, request):
+        """A GET for a pre-rendered page from a visitor with no session and no pending flash message"""
+        if self.paths is None:
+            # Reversed on first use; the URLconf may not be importable yet at startup
+            self.paths = prerender.page_paths()
+        return (
+            request.method in ('GET', 'HEAD')
+            and request.path_info in self.paths
+            and not request.META.get('QUERY_STRING')
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+            and CookieStorage.cookie_name not in request.COOKIES
         )
-        
-        # Set a password for guest (won't be used since we auto-login)
-        if created:
-            guest_user.set_unusable_password()
-            guest_user.save()
-        
-        # Auto-login as guest
-        if not request.user.is_authenticated:
-            login(request, guest_user, backend='django.contrib.auth.backends.ModelBackend')
-        
-        return None
 
+
+class RequestMetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Adds a Server-Timing header (database time and query count, template
+    render time, view time) to every response and aggregates the same numbers
+    per view into the Prometheus histograms served at METRICS_PATH.
+    Removes itself from the stack at startup unless REQUEST_METRICS_ENABLED.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        metrics.instrument_templates()
+
+    def handle(self, request):
+        if request.path == settings.METRICS_PATH:
+            return self.metrics_view(request)
+        timing, token, start = self.begin()
+        try:
+            with self.wrap_connections(timing):
+                response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        return self.finish(request, response, timing, start)
+
+    async def ahandle(self, request):
+        if request.path == settings.METRICS_PATH:
+            return self.metrics_view(request)
+        timing, token, start = self.begin()
+        try:
+            # Connections are shared with the sync_to_async threads the async ORM runs in
+            with self.wrap_connections(timing):
+                response = await self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        return self.finish(request, response, timing, start)
+
+    def begin(self):
+        timing = metrics.RequestTiming()
+        return timing, metrics.current.set(timing), time.perf_counter()
+
+    def wrap_connections(self, timing):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timing.execute))
+        return stack
+
+    def finish(self, request, response, timing, start):
+        total = time.perf_counter() - start
+        match = request.resolver_match
+        metrics.observe(match.view_name if match else '<unmatched>', request.method, response.status_code, timing, total)
+        response['Server-Timing'] = timing.server_timing(total)
+        return response
+
+    def metrics_view(self, request):
+        """Prometheus scrape endpoint: a METRICS_TOKEN bearer token, or an admin session"""
+        expected = getattr(settings, 'METRICS_TOKEN', '')
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        user = request.user
+        is_admin = user.is_authenticated and (user.is_staff or user.is_superuser)
+        if not (is_admin or (expected and constant_time_compare(supplied, expected))):
+            return HttpResponseForbidden()
+        return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0006_alter_skill_display_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='experience',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False, help_text='Rendered from description on save'),
+        ),
+    ]
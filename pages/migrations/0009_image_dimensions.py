@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0008_contactmessage_submission_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='experience',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='experience',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='experience',
+            name='image',
+            field=models.ImageField(blank=True, height_field='image_height', help_text='Company logo or experience image', null=True, upload_to='experiences/', width_field='image_width'),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='image',
+            field=models.ImageField(blank=True, height_field='image_height', help_text='Project screenshot or banner', null=True, upload_to='projects/', width_field='image_width'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:27
+
+from django.db import migrations, models
+import pages.media
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0009_image_dimensions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='experience',
+            name='image',
+            field=models.ImageField(blank=True, height_field='image_height', help_text='Company logo or experience image', null=True, upload_to=pages.media.HashedUploadTo('experiences/'), width_field='image_width'),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='image',
+            field=models.ImageField(blank=True, height_field='image_height', help_text='Project screenshot or banner', null=True, upload_to=pages.media.HashedUploadTo('projects/'), width_field='image_width'),
+        ),
+    ]
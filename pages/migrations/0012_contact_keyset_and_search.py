@@ -0,0 +1,80 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:37
+
+from django.db import migrations, models
+
+# The index as pages.inbox defined it when this migration was written, spelled
+# out so later changes to that module cannot change what this migration does
+CREATE_SEARCH_INDEX = {
+    # GIN expression index; must match inbox.PG_SEARCH_DOCUMENT for queries to use it
+    'postgresql': [
+        "CREATE INDEX IF NOT EXISTS contact_search_idx ON pages_contactmessage "
+        "USING gin (to_tsvector('english', name || ' ' || email || ' ' || subject || ' ' || message))",
+    ],
+    # External-content FTS5 table kept in sync by triggers
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS pages_contactmessage_fts USING fts5("
+        "name, email, subject, message, content='pages_contactmessage', content_rowid='id')",
+        "CREATE TRIGGER IF NOT EXISTS pages_contactmessage_fts_ai AFTER INSERT ON pages_contactmessage BEGIN "
+        "INSERT INTO pages_contactmessage_fts(rowid, name, email, subject, message) "
+        "VALUES (new.id, new.name, new.email, new.subject, new.message); END",
+        "CREATE TRIGGER IF NOT EXISTS pages_contactmessage_fts_ad AFTER DELETE ON pages_contactmessage BEGIN "
+        "INSERT INTO pages_contactmessage_fts(pages_contactmessage_fts, rowid, name, email, subject, message) "
+        "VALUES ('delete', old.id, old.name, old.email, old.subject, old.message); END",
+        "CREATE TRIGGER IF NOT EXISTS pages_contactmessage_fts_au AFTER UPDATE OF name, email, subject, message "
+        "ON pages_contactmessage BEGIN "
+        "INSERT INTO pages_contactmessage_fts(pages_contactmessage_fts, rowid, name, email, subject, message) "
+        "VALUES ('delete', old.id, old.name, old.email, old.subject, old.message); "
+        "INSERT INTO pages_contactmessage_fts(rowid, name, email, subject, message) "
+        "VALUES (new.id, new.name, new.email, new.subject, new.message); END",
+        # Index the messages that already exist
+        "INSERT INTO pages_contactmessage_fts(pages_contactmessage_fts) VALUES ('rebuild')",
+    ],
+}
+
+DROP_SEARCH_INDEX = {
+    'postgresql': ['DROP INDEX IF EXISTS contact_search_idx'],
+    'sqlite': [
+        'DROP TRIGGER IF EXISTS pages_contactmessage_fts_ai',
+        'DROP TRIGGER IF EXISTS pages_contactmessage_fts_ad',
+        'DROP TRIGGER IF EXISTS pages_contactmessage_fts_au',
+        'DROP TABLE IF EXISTS pages_contactmessage_fts',
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    # Postgres GIN expression index or SQLite FTS5 table; other backends keep icontains search
+    for statement in CREATE_SEARCH_INDEX.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    for statement in DROP_SEARCH_INDEX.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0011_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='contactmessage',
+            name='contact_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='contactmessage',
+            name='contact_unread_idx',
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['-created_at', '-id'], name='contact_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(condition=models.Q(('read', False)), fields=['-created_at', '-id'], name='contact_unread_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0012_contact_keyset_and_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactmessage',
+            name='archived',
+            field=models.BooleanField(default=False, help_text='Archived messages are hidden from the inbox'),
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(condition=models.Q(('archived', False)), fields=['-created_at', '-id'], name='contact_inbox_idx'),
+        ),
+    ]
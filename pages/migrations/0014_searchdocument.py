@@ -0,0 +1,108 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:29
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+# The index as pages.search defined it when this migration was written, spelled
+# out so later changes to that module cannot change what this migration does
+CREATE_SEARCH_INDEX = {
+    # Generated tsvector column with a GIN index; titles weigh more than bodies
+    'postgresql': [
+        "ALTER TABLE pages_searchdocument ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', body), 'B')) STORED",
+        'CREATE INDEX IF NOT EXISTS search_document_vector_idx ON pages_searchdocument USING gin (search_vector)',
+    ],
+    # External-content FTS5 table kept in sync by triggers, with prefix indexes for live search
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS pages_searchdocument_fts USING fts5("
+        "title, body, content='pages_searchdocument', content_rowid='id', prefix='2 3 4 5 6')",
+        "CREATE TRIGGER IF NOT EXISTS pages_searchdocument_fts_ai AFTER INSERT ON pages_searchdocument BEGIN "
+        "INSERT INTO pages_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+        "CREATE TRIGGER IF NOT EXISTS pages_searchdocument_fts_ad AFTER DELETE ON pages_searchdocument BEGIN "
+        "INSERT INTO pages_searchdocument_fts(pages_searchdocument_fts, rowid, title, body) "
+        "VALUES ('delete', old.id, old.title, old.body); END",
+        "CREATE TRIGGER IF NOT EXISTS pages_searchdocument_fts_au AFTER UPDATE OF title, body ON pages_searchdocument BEGIN "
+        "INSERT INTO pages_searchdocument_fts(pages_searchdocument_fts, rowid, title, body) "
+        "VALUES ('delete', old.id, old.title, old.body); "
+        "INSERT INTO pages_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    ],
+}
+
+DROP_SEARCH_INDEX = {
+    'postgresql': [
+        'DROP INDEX IF EXISTS search_document_vector_idx',
+        'ALTER TABLE pages_searchdocument DROP COLUMN IF EXISTS search_vector',
+    ],
+    'sqlite': [
+        'DROP TRIGGER IF EXISTS pages_searchdocument_fts_ai',
+        'DROP TRIGGER IF EXISTS pages_searchdocument_fts_ad',
+        'DROP TRIGGER IF EXISTS pages_searchdocument_fts_au',
+        'DROP TABLE IF EXISTS pages_searchdocument_fts',
+    ],
+}
+
+
+def _clean(text):
+    # Collapse whitespace and drop the control characters search uses as highlight markers
+    return ' '.join(text.replace('\x02', ' ').replace('\x03', ' ').split())
+
+
+def _documents(apps):
+    """(kind, object id, title, body) for every project, experience and skill"""
+    Project = apps.get_model('pages', 'Project')
+    Experience = apps.get_model('pages', 'Experience')
+    Skill = apps.get_model('pages', 'Skill')
+    for project in Project.objects.prefetch_related('technologies'):
+        names = ' '.join(technology.name for technology in project.technologies.all())
+        yield 'project', project.pk, project.title, f'{project.description} {names}'
+    for experience in Experience.objects.all():
+        description = strip_tags(experience.description_html) if experience.description_html else experience.description
+        yield 'experience', experience.pk, f'{experience.title} at {experience.company}', description
+    for skill in Skill.objects.all():
+        yield 'skill', skill.pk, skill.name, skill.get_category_display()
+
+
+def create_search_index(apps, schema_editor):
+    # Postgres generated tsvector column with a GIN index, or SQLite FTS5 table; other backends use icontains
+    for statement in CREATE_SEARCH_INDEX.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+    # The triggers index these rows as they are inserted
+    SearchDocument = apps.get_model('pages', 'SearchDocument')
+    SearchDocument.objects.bulk_create(
+        (
+            SearchDocument(kind=kind, object_id=object_id, title=_clean(title)[:500], body=_clean(body))
+            for kind, object_id, title, body in _documents(apps)
+        ),
+        batch_size=500,
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    for statement in DROP_SEARCH_INDEX.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0013_contactmessage_archived'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', 'Project'), ('experience', 'Experience'), ('skill', 'Skill')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=500)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='search_document_object_unique'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
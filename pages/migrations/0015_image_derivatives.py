@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0014_searchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='experience',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, editable=False, help_text='Resized variants written for the image (see pages.images)', null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, editable=False, help_text='Resized variants written for the image (see pages.images)', null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:53
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0015_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='project',
+            name='project_featured_idx',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0016_remove_project_featured_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='searchdocument',
+            name='object_id',
+            field=models.PositiveBigIntegerField(),
+        ),
+    ]
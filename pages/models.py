@@ -1,5 +1,10 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .media import HashedUploadTo
+from .rendering import markdown_to_html, render_markdown
 
 
 class Technology(models.Model):
@@ -19,7 +24,10 @@ class Project(models.Model):
     """Portfolio project"""
     title = models.CharField(max_length=200)
     description = models.TextField()
-    image = models.ImageField(upload_to='projects/', blank=True, null=True, help_text="Project screenshot or banner")
+    image = models.ImageField(upload_to=HashedUploadTo('projects/'), blank=True, null=True, width_field='image_width', height_field='image_height', help_text="Project screenshot or banner")
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_derivatives = models.JSONField(blank=True, null=True, editable=False, help_text="Resized variants written for the image (see pages.images)")
     github_url = models.URLField(max_length=500, blank=True, null=True)
     # live_url field removed
     technologies = models.ManyToManyField(Technology, related_name='projects', blank=True)
@@ -30,13 +38,23 @@ class Project(models.Model):
     
     class Meta:
         ordering = ['display_order', '-created_at']
+        indexes = [
+            models.Index(fields=['display_order', '-created_at'], name='project_order_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
     def get_technologies_list(self):
-        """Return list of technology names for template compatibility"""
-        return [tech.name for tech in self.technologies.all()]
+        """Return list of technology names for template compatibility
+
+        Uses the prefetch_related('technologies') cache when present, so
+        calling this in a loop over a prefetched queryset costs no queries.
+        """
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        if 'technologies' in prefetched:
+            return [tech.name for tech in prefetched['technologies']]
+        return list(self.technologies.values_list('name', flat=True))
 
 
 class Skill(models.Model):
@@ -65,29 +83,66 @@ class Skill(models.Model):
     
     class Meta:
         ordering = ['category', 'display_order', 'name']
+        indexes = [
+            models.Index(fields=['category', 'display_order', 'name'], name='skill_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.get_category_display()})"
 
+    @classmethod
+    def group_by_category(cls, skills):
+        """Group already-fetched skills into {category label: [skills]} in CATEGORY_CHOICES order"""
+        grouped = {code: [] for code, _ in cls.CATEGORY_CHOICES}
+        for skill in skills:
+            if skill.category in grouped:
+                grouped[skill.category].append(skill)
+        return {
+            label: grouped[code]
+            for code, label in cls.CATEGORY_CHOICES
+            if grouped[code]
+        }
+
 
 class Experience(models.Model):
     """Work experience entry"""
     title = models.CharField(max_length=200)
     company = models.CharField(max_length=200)
-    image = models.ImageField(upload_to='experiences/', blank=True, null=True, help_text="Company logo or experience image")
+    image = models.ImageField(upload_to=HashedUploadTo('experiences/'), blank=True, null=True, width_field='image_width', height_field='image_height', help_text="Company logo or experience image")
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_derivatives = models.JSONField(blank=True, null=True, editable=False, help_text="Resized variants written for the image (see pages.images)")
     start_date = models.DateField()
     end_date = models.DateField(blank=True, null=True, help_text="Leave blank if current position")
     description = models.TextField()
+    description_html = models.TextField(blank=True, editable=False, help_text="Rendered from description on save")
     display_order = models.PositiveIntegerField(default=0, help_text="Order for display (lower numbers appear first)")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['display_order', '-start_date']
+        indexes = [
+            models.Index(fields=['display_order', '-start_date'], name='experience_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} at {self.company}"
     
+    def save(self, *args, **kwargs):
+        """Re-render description_html alongside the markdown source"""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'description' in update_fields:
+            self.description_html = markdown_to_html(self.description)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'description_html'}
+        super().save(*args, **kwargs)
+    
+    @property
+    def description_rendered(self):
+        """Stored HTML, falling back to rendering rows that predate description_html"""
+        return mark_safe(self.description_html or render_markdown(self.description))
+    
     @property
     def period(self):
         """Format period string for display"""
@@ -108,11 +163,21 @@ class ContactMessage(models.Model):
     subject = models.CharField(max_length=200)
     message = models.TextField()
     read = models.BooleanField(default=False, help_text="Mark as read after reviewing")
-    created_at = models.DateTimeField(auto_now_add=True)
+    archived = models.BooleanField(default=False, help_text="Archived messages are hidden from the inbox")
+    # Not auto_now_add: spooled submissions keep the time they were received
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Set for spooled submissions so replaying a spool file never duplicates rows
+    submission_id = models.UUIDField(unique=True, null=True, blank=True, editable=False)
     
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Contact Messages"
+        indexes = [
+            # (created_at, id) is the admin's pagination keyset
+            models.Index(fields=['-created_at', '-id'], name='contact_created_idx'),
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(read=False), name='contact_unread_idx'),
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(archived=False), name='contact_inbox_idx'),
+        ]
     
     def __str__(self):
         return f"Message from {self.name} - {self.subject}"
@@ -121,3 +186,26 @@ class ContactMessage(models.Model):
         """Mark message as read"""
         self.read = True
         self.save(update_fields=['read'])
+
+
+class SearchDocument(models.Model):
+    """Searchable text of a project, experience or skill, kept in sync by pages/signals.py (see pages/search.py)"""
+    KIND_CHOICES = [
+        ('project', 'Project'),
+        ('experience', 'Experience'),
+        ('skill', 'Skill'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=500)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_document_object_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
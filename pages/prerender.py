@@ -0,0 +1,153 @@
+"""
+Pre-rendered copies of the public pages.
+
+When PRERENDER_DIR is set, home, about, portfolio and contact are rendered,
+as full pages and as HTMX partials, to HTML files under that directory:
+/about/ becomes about/index.html and about/index.hx.html. PrerenderedPagesMiddleware
+serves them to cookieless GETs before sessions, authentication or the ORM are
+touched, and a front proxy can serve the same files directly. Whenever
+bump_version() invalidates a content model, the pages that render it are
+re-rendered once the transaction commits. A missing file just means the
+request falls through to the dynamic view.
+
+The files hold what a cookieless guest sees, as the page cache does; visitors
+with a session (admins) or a pending flash message always get the dynamic page.
+"""
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+
+from . import views
+from .conditional import _finish
+from .models import Project, Technology, Skill, Experience
+
+logger = logging.getLogger(__name__)
+
+# Page (view name in pages.views) -> content models it renders
+PAGES = {
+    'home': (),
+    'about': (Skill, Experience),
+    'portfolio': (Project, Technology),
+    'contact': (),
+}
+
+CONTENT_TYPE = 'text/html; charset=utf-8'
+
+
+def enabled():
+    return bool(getattr(settings, 'PRERENDER_DIR', ''))
+
+
+def page_file(path, partial, root=None):
+    """File holding the page at URL path; path must end with a slash"""
+    name = 'index.hx.html' if partial else 'index.html'
+    return Path(root or settings.PRERENDER_DIR, path.strip('/'), name)
+
+
+def page_paths():
+    """URL path of every pre-rendered page"""
+    return {reverse(f'pages:{name}'): name for name in PAGES}
+
+
+def render(name, partial):
+    """The page's HTML as a cookieless guest would get it"""
+    from .middleware import GUEST_USER
+
+    request = RequestFactory().get(reverse(f'pages:{name}'), headers={'HX-Request': 'true'} if partial else {})
+    request.user = GUEST_USER
+    response = getattr(views, name)(request)
+    if response.status_code != 200:
+        raise RuntimeError(f'{name} rendered with status {response.status_code}')
+    return response.content
+
+
+def _write(file, content):
+    """Replace file atomically, so a request never reads a half-written page"""
+    file.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=file.parent, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(content)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, file)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def render_pages(names=None, root=None):
+    """Render the named pages (default: all) to disk; returns the files written"""
+    written = []
+    for name in names or PAGES:
+        path = reverse(f'pages:{name}')
+        for partial in (False, True):
+            file = page_file(path, partial, root)
+            _write(file, render(name, partial))
+            written.append(file)
+    return written
+
+
+def remove_pages(names=None, root=None):
+    """Delete the named pages' files so requests fall through to the views; returns how many existed"""
+    removed = 0
+    for name in names or PAGES:
+        for partial in (False, True):
+            try:
+                page_file(reverse(f'pages:{name}'), partial, root).unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def affected_pages(models):
+    return [name for name, dependencies in PAGES.items() if set(dependencies) & set(models)]
+
+
+def _rerender(names):
+    try:
+        render_pages(names)
+    except Exception:
+        # A stale file would be served indefinitely; without one the view serves fresh content
+        logger.exception('Re-rendering %s failed; falling back to the dynamic views', ', '.join(names))
+        remove_pages(names)
+
+
+def versions_bumped(sender, models, **kwargs):
+    """Re-render the pages that depend on the invalidated models after the transaction commits"""
+    if not enabled():
+        return
+    names = affected_pages(models)
+    if names:
+        transaction.on_commit(lambda: _rerender(names))
+
+
+def load(path, partial):
+    """(content, os.stat_result) of the page at path, or None when it has not been rendered"""
+    try:
+        with open(page_file(path, partial), 'rb') as handle:
+            return handle.read(), os.fstat(handle.fileno())
+    except FileNotFoundError:
+        return None
+
+
+def respond(request, content, stat):
+    """Response for a loaded page, answering conditional GETs from the file's mtime and size"""
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(content, content_type=CONTENT_TYPE)
+    response['X-Page-Cache'] = 'PRERENDERED'
+    # A session cookie gets the dynamic page instead
+    patch_vary_headers(response, ('Cookie',))
+    return _finish(request, response, etag, last_modified)
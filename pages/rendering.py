@@ -0,0 +1,57 @@
+"""
+Markdown rendering shared by Experience.save() and the markdown template filter.
+
+markdown.Markdown instances are expensive to build and not thread-safe, so each
+thread keeps one converter and resets it between documents. Rendered HTML is
+also kept in a small LRU keyed by a hash of the source text, which makes
+repeated renders of the same description effectively free.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import markdown
+
+MARKDOWN_EXTENSIONS = ['nl2br', 'fenced_code']
+CACHE_SIZE = 256
+
+_local = threading.local()
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _converter():
+    md = getattr(_local, 'markdown', None)
+    if md is None:
+        md = _local.markdown = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    return md
+
+
+def markdown_to_html(text):
+    """Convert markdown text to HTML, bypassing the LRU"""
+    if not text:
+        return ''
+    md = _converter()
+    try:
+        return md.convert(text)
+    finally:
+        md.reset()
+
+
+def render_markdown(text):
+    """Convert markdown text to HTML, memoised by content hash"""
+    if not text:
+        return ''
+    digest = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+    with _cache_lock:
+        html = _cache.get(digest)
+        if html is not None:
+            _cache.move_to_end(digest)
+            return html
+
+    html = markdown_to_html(text)
+    with _cache_lock:
+        _cache[digest] = html
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return html
@@ -0,0 +1,410 @@
+"""
+Site search across projects, experiences and skills.
+
+Every searchable object has one SearchDocument row holding its title and
+body text (a project's body includes its technologies). Signals in
+pages/signals.py keep the rows in step with saves, deletes and technology
+links; bulk writes call sync() themselves, and `manage.py
+rebuild_search_index` rebuilds everything.
+
+The rows are indexed per backend, as the contact inbox is (pages/inbox.py):
+
+* Postgres: a stored tsvector column generated from the title (weight A)
+  and body (weight B), with a GIN index. Being generated, it can never
+  drift from the row. Results are ranked with ts_rank_cd and highlighted
+  with ts_headline, computed for the top rows only.
+* SQLite: an external-content FTS5 table kept in sync by triggers, with
+  prefix indexes for search-as-you-type. Results are ranked with bm25()
+  and highlighted with highlight() and snippet().
+* Anything else: icontains over the documents, highlighted in Python.
+
+Every word must match, the last one as a prefix for search-as-you-type.
+Every match is ranked, inside the index (FTS5's ORDER BY rank, or one pass
+over the GIN matches on Postgres), and only the top rows are highlighted.
+
+Queries are normalized to lowercase words before anything else, and the
+results of each normalized query are cached against the content models'
+version counters, so an edit invalidates them like it does cached pages.
+"""
+import hashlib
+import re
+from dataclasses import dataclass
+from functools import reduce
+from operator import and_
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+from . import cache as page_cache
+from .models import Project, Technology, Skill, Experience, SearchDocument
+
+TABLE = 'pages_searchdocument'
+FTS_TABLE = 'pages_searchdocument_fts'
+PG_SEARCH_COLUMN = 'search_vector'
+PG_SEARCH_INDEX = 'search_document_vector_idx'
+PG_SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', body), 'B')"
+)
+
+SEARCH_KEY = 'pages:search:{versions}:{digest}'
+# Results depend on every content model: a project's document lists its technologies
+SEARCH_MODELS = (Project, Technology, Skill, Experience)
+RESULT_LIMIT = 20
+MAX_QUERY_WORDS = 8
+SNIPPET_WORDS = 24
+
+# Highlight markers: control characters cannot come from the indexed text
+# (_clean() strips them), so the HTML can be escaped before they become <mark>
+START, STOP = '\x02', '\x03'
+
+
+@dataclass(frozen=True)
+class Result:
+    kind: str
+    object_id: int
+    title: str
+    snippet: str
+    rank: float
+
+    @property
+    def kind_display(self):
+        return dict(SearchDocument.KIND_CHOICES)[self.kind]
+
+    @property
+    def url(self):
+        page, anchor = ('pages:portfolio', 'project') if self.kind == 'project' else ('pages:about', self.kind)
+        return f'{reverse(page)}#{anchor}-{self.object_id}'
+
+    @property
+    def title_html(self):
+        return _highlight_html(self.title)
+
+    @property
+    def snippet_html(self):
+        return _highlight_html(self.snippet)
+
+
+def _highlight_html(text):
+    return mark_safe(escape(text).replace(START, '<mark>').replace(STOP, '</mark>'))
+
+
+def _clean(text):
+    return ' '.join(text.replace(START, ' ').replace(STOP, ' ').split())
+
+
+# Documents. The builders only use model fields, so they also work on the
+# historical models a migration passes in.
+
+def _project_document(project):
+    names = ' '.join(technology.name for technology in project.technologies.all())
+    return project.title, f'{project.description} {names}'
+
+
+def _experience_document(experience):
+    description = strip_tags(experience.description_html) if experience.description_html else experience.description
+    return f'{experience.title} at {experience.company}', description
+
+
+def _skill_document(skill):
+    return skill.name, skill.get_category_display()
+
+
+# kind -> (model name, queryset options, document builder)
+KINDS = {
+    'project': ('Project', lambda queryset: queryset.prefetch_related('technologies'), _project_document),
+    'experience': ('Experience', lambda queryset: queryset, _experience_document),
+    'skill': ('Skill', lambda queryset: queryset, _skill_document),
+}
+KIND_OF_MODEL = {'Project': 'project', 'Experience': 'experience', 'Skill': 'skill'}
+
+
+def kind_of(model):
+    return KIND_OF_MODEL.get(model.__name__)
+
+
+def sync(kind, ids=None, apps=global_apps):
+    """
+    Bring the documents of the given objects (default: every object of that
+    kind) up to date, creating, updating and deleting rows as needed.
+    Returns the number of rows written.
+    """
+    model_name, prepare, build = KINDS[kind]
+    model = apps.get_model('pages', model_name)
+    document_model = apps.get_model('pages', 'SearchDocument')
+    objects = prepare(model.objects.all())
+    existing = document_model.objects.filter(kind=kind)
+    if ids is not None:
+        ids = list(ids)
+        objects = objects.filter(pk__in=ids)
+        existing = existing.filter(object_id__in=ids)
+
+    wanted = {}
+    for obj in objects:
+        title, body = build(obj)
+        wanted[obj.pk] = (_clean(title)[:500], _clean(body))
+    documents = {document.object_id: document for document in existing}
+
+    stale = [document.pk for object_id, document in documents.items() if object_id not in wanted]
+    changed, created = [], []
+    for object_id, (title, body) in wanted.items():
+        document = documents.get(object_id)
+        if document is None:
+            created.append(document_model(kind=kind, object_id=object_id, title=title, body=body))
+        elif (document.title, document.body) != (title, body):
+            document.title, document.body = title, body
+            changed.append(document)
+    if stale:
+        document_model.objects.filter(pk__in=stale).delete()
+    document_model.objects.bulk_update(changed, ['title', 'body'], batch_size=500)
+    document_model.objects.bulk_create(created, batch_size=500)
+    return len(stale) + len(changed) + len(created)
+
+
+def rebuild(apps=global_apps):
+    """Sync every kind; returns the number of rows written"""
+    return sum(sync(kind, apps=apps) for kind in KINDS)
+
+
+def sync_models(*models):
+    """Sync every kind among models, after bulk writes that sent no signals"""
+    if Technology in models:
+        models = {*models, Project}
+    for kind in sorted({kind_of(model) for model in models} - {None}):
+        sync(kind)
+
+
+# Index
+
+def _fts_statements():
+    delete_old = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);"
+    insert_new = f'INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);'
+    return {
+        f'{FTS_TABLE}_ai': f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN {insert_new} END',
+        f'{FTS_TABLE}_ad': f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN {delete_old} END',
+        f'{FTS_TABLE}_au': (
+            f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, body ON {TABLE} '
+            f'BEGIN {delete_old} {insert_new} END'
+        ),
+    }
+
+
+def ensure_search_index(connection):
+    """
+    Create the full-text index if it is missing; safe to call repeatedly.
+
+    Runs from the migration that introduced it and again after every migrate,
+    because SQLite drops the triggers whenever a migration rebuilds the table.
+    """
+    if TABLE not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f'ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS {PG_SEARCH_COLUMN} tsvector '
+                f'GENERATED ALWAYS AS ({PG_SEARCH_DOCUMENT}) STORED'
+            )
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {PG_SEARCH_INDEX} ON {TABLE} USING gin ({PG_SEARCH_COLUMN})')
+        elif connection.vendor == 'sqlite':
+            triggers = _fts_statements()
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s", [TABLE]
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            if existing.issuperset(triggers):
+                return
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"title, body, content='{TABLE}', content_rowid='id', prefix='2 3 4 5 6')"
+            )
+            for statement in triggers.values():
+                cursor.execute(statement)
+            # Rows written while the triggers were missing are not indexed yet
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'DROP INDEX IF EXISTS {PG_SEARCH_INDEX}')
+            cursor.execute(f'ALTER TABLE {TABLE} DROP COLUMN IF EXISTS {PG_SEARCH_COLUMN}')
+        elif connection.vendor == 'sqlite':
+            for name in _fts_statements():
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+# Queries
+
+def normalize(term):
+    """The words of a query, lowercased, as one canonical string"""
+    return ' '.join(re.findall(r'\w+', term.lower())[:MAX_QUERY_WORDS])
+
+
+def _fts_query(query):
+    """Every word must appear; the last one as a prefix, since it may still be being typed"""
+    words = [f'"{word}"' for word in query.split()]
+    return ' '.join(words) + '*'
+
+
+# Every word must match, the last one as a prefix. The prefix is matched both
+# stemmed and as typed: to_tsquery('english') drops a stopword ("the") or may
+# stem a partial word differently, which would leave nothing to match on.
+PG_QUERY = "(to_tsquery('english', %s) && (to_tsquery('english', %s) || to_tsquery('simple', %s)))"
+
+
+def _pg_query(query):
+    """(SQL, params) of the tsquery for a normalized query"""
+    *words, last = query.split()
+    prefix = f'{last}:*'
+    return PG_QUERY, [' & '.join(words), prefix, prefix]
+
+
+def _search_postgresql(connection, query, limit):
+    options = f'StartSel="{START}", StopSel="{STOP}"'
+    tsquery, params = _pg_query(query)
+    with connection.cursor() as cursor:
+        # Every match is ranked; only the rows returned get the (expensive) headlines
+        cursor.execute(
+            f"WITH q AS (SELECT {tsquery} AS q) "
+            f"SELECT kind, object_id, ts_headline('english', title, q, %s), "
+            f"ts_headline('english', body, q, %s), rank FROM ("
+            f"SELECT d.id, d.kind, d.object_id, d.title, d.body, q.q, ts_rank_cd(d.{PG_SEARCH_COLUMN}, q.q) AS rank "
+            f"FROM {TABLE} d, q WHERE d.{PG_SEARCH_COLUMN} @@ q.q "
+            f"ORDER BY rank DESC, d.id DESC LIMIT %s) top ORDER BY rank DESC, id DESC",
+            [
+                *params,
+                f'{options}, HighlightAll=true',
+                f'{options}, MaxFragments=2, MaxWords={SNIPPET_WORDS}, MinWords=8, FragmentDelimiter=" … "',
+                limit,
+            ],
+        )
+        return [Result(*row) for row in cursor.fetchall()]
+
+
+def _search_sqlite(connection, query, limit):
+    match = _fts_query(query)
+    with connection.cursor() as cursor:
+        # bm25() is lower for better matches; title matches count ten times as much.
+        # Every match is ranked, but SQLite keeps only the best rows in its sorter,
+        # so the cost grows with the matches, not with the highlighted results.
+        cursor.execute(
+            f"SELECT d.kind, d.object_id, highlight({FTS_TABLE}, 0, %s, %s), "
+            f"snippet({FTS_TABLE}, 1, %s, %s, '…', %s), -bm25({FTS_TABLE}, 10.0, 1.0) "
+            f"FROM {FTS_TABLE} JOIN {TABLE} d ON d.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s ORDER BY bm25({FTS_TABLE}, 10.0, 1.0), d.id DESC LIMIT %s",
+            [START, STOP, START, STOP, SNIPPET_WORDS, match, limit],
+        )
+        return [Result(*row) for row in cursor.fetchall()]
+
+
+def _search_fallback(query, limit):
+    words = query.split()
+    documents = SearchDocument.objects.filter(
+        reduce(and_, (Q(title__icontains=word) | Q(body__icontains=word) for word in words))
+    ).order_by('kind', 'object_id')[:limit]
+    pattern = re.compile('|'.join(re.escape(word) for word in words), re.IGNORECASE)
+
+    def mark(text):
+        return pattern.sub(lambda match: f'{START}{match.group()}{STOP}', text)
+
+    return [
+        Result(document.kind, document.object_id, mark(document.title), mark(document.body[:300]), 0.0)
+        for document in documents
+    ]
+
+
+def _search(query, limit):
+    connection = connections['default']
+    if connection.vendor == 'postgresql':
+        return _search_postgresql(connection, query, limit)
+    if connection.vendor == 'sqlite':
+        return _search_sqlite(connection, query, limit)
+    return _search_fallback(query, limit)
+
+
+def search_key(query):
+    versions = '.'.join(str(version) for version in page_cache.get_versions(SEARCH_MODELS))
+    return SEARCH_KEY.format(versions=versions, digest=hashlib.md5(query.encode()).hexdigest())
+
+
+def search(term, limit=RESULT_LIMIT):
+    """Ranked, highlighted results for term, best first; cached per normalized query"""
+    query = normalize(term)
+    if not query:
+        return []
+    if not settings.PAGE_CACHE_ENABLED:
+        return _search(query, limit)
+    key = search_key(f'{limit}:{query}')
+    results = cache.get(key)
+    if results is None:
+        results = _search(query, limit)
+        cache.set(key, results, settings.PAGE_CACHE_TIMEOUT)
+    return results
+
+
+def filter_queryset(queryset, term):
+    """
+    Filter a Project, Experience or Skill queryset to objects matching term,
+    or None if this backend has no search index (for the admin's search box)
+    """
+    kind, query = kind_of(queryset.model), normalize(term)
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        tsquery, params = _pg_query(query)
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT object_id FROM {TABLE} WHERE kind = %s AND {PG_SEARCH_COLUMN} @@ {tsquery}", [kind, *params],
+        ))
+    if vendor == 'sqlite':
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT d.object_id FROM {FTS_TABLE} JOIN {TABLE} d ON d.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND d.kind = %s',
+            [_fts_query(query), kind],
+        ))
+    return None
+
+
+# Signal handlers (connected in pages/signals.py)
+
+def content_saved(sender, instance, **kwargs):
+    sync(kind_of(sender), [instance.pk])
+
+
+def content_deleted(sender, instance, **kwargs):
+    SearchDocument.objects.filter(kind=kind_of(sender), object_id=instance.pk).delete()
+
+
+def technology_saved(sender, instance, created, **kwargs):
+    """A renamed technology changes the documents of its projects"""
+    if not created:
+        sync('project', instance.projects.values_list('pk', flat=True))
+
+
+def technology_deleting(sender, instance, **kwargs):
+    # The links are gone by post_delete; remember whose documents mention it
+    instance._search_project_ids = list(instance.projects.values_list('pk', flat=True))
+
+
+def technology_deleted(sender, instance, **kwargs):
+    ids = getattr(instance, '_search_project_ids', None)
+    if ids:
+        sync('project', ids)
+
+
+def technologies_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """m2m_changed on Project.technologies, from either side"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            sync('project', [instance.pk])
+    elif action == 'pre_clear':
+        technology_deleting(sender, instance)
+    elif action in ('post_add', 'post_remove'):
+        sync('project', pk_set)
+    elif action == 'post_clear':
+        technology_deleted(sender, instance)
@@ -0,0 +1,119 @@
+"""
+Set-based upserts for the seed_* management commands.
+
+Existing rows are read once, compared field by field in Python, and then
+written with one bulk_create for new rows and one bulk_update for changed
+ones; unchanged rows are not written at all. Skill.name and Project.title
+are not unique in the schema, so this diffing stands in for
+bulk_create(update_conflicts=True), which needs a unique constraint to
+conflict on, and it can tell updated rows from unchanged ones.
+
+Bulk writes send no model signals, so callers bump the page cache version
+themselves when anything changed.
+"""
+from dataclasses import dataclass
+
+from django.db.models import Q
+from django.utils import timezone
+
+
+@dataclass
+class UpsertResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    @property
+    def changed(self):
+        return bool(self.created or self.updated)
+
+    def __str__(self):
+        return f'{self.created} created, {self.updated} updated, {self.unchanged} unchanged'
+
+
+def upsert(model, key, rows, create_defaults=None):
+    """
+    Insert or update model rows identified by the key field (or tuple of fields).
+
+    rows is a list of {field: value} dicts that all include the key fields;
+    create_defaults are extra values only applied to new rows. Returns
+    ({key value: instance}, UpsertResult) with every row's instance saved.
+    """
+    key_fields = (key,) if isinstance(key, str) else tuple(key)
+
+    def key_of(values, get):
+        found = tuple(get(values, field) for field in key_fields)
+        return found[0] if isinstance(key, str) else found
+
+    lookup = {f'{field}__in': {row[field] for row in rows} for field in key_fields}
+    existing = {key_of(obj, getattr): obj for obj in model.objects.filter(**lookup)}
+    fields = sorted({field for row in rows for field in row if field not in key_fields})
+    has_updated_at = any(field.name == 'updated_at' for field in model._meta.concrete_fields)
+    now = timezone.now()
+
+    result = UpsertResult()
+    to_create, to_update, instances = [], [], {}
+    for row in rows:
+        row_key = key_of(row, dict.__getitem__)
+        obj = existing.get(row_key)
+        if obj is None:
+            obj = model(**{**(create_defaults or {}), **row})
+            to_create.append(obj)
+            result.created += 1
+        elif any(getattr(obj, field) != value for field, value in row.items()):
+            for field, value in row.items():
+                setattr(obj, field, value)
+            if has_updated_at:
+                # bulk_update does not run auto_now
+                obj.updated_at = now
+            to_update.append(obj)
+            result.updated += 1
+        else:
+            result.unchanged += 1
+        instances[row_key] = obj
+
+    if to_create:
+        model.objects.bulk_create(to_create)
+        if any(obj.pk is None for obj in to_create):
+            # Backends that cannot return ids from a bulk insert
+            created = {key_of(obj, getattr): obj for obj in to_create}
+            for saved in model.objects.filter(**lookup).only('pk', *key_fields):
+                if key_of(saved, getattr) in created:
+                    created[key_of(saved, getattr)].pk = saved.pk
+    if to_update:
+        model.objects.bulk_update(to_update, fields + (['updated_at'] if has_updated_at else []))
+    return instances, result
+
+
+def sync_m2m(through, source_field, target_field, links):
+    """
+    Make the through table hold exactly links ({source id: {target ids}}) for the given sources.
+
+    Missing rows are bulk-inserted and surplus rows deleted in one statement
+    each. Returns (added, removed).
+    """
+    current = {}
+    for source_id, target_id in through.objects.filter(**{f'{source_field}__in': list(links)}).values_list(
+        source_field, target_field,
+    ):
+        current.setdefault(source_id, set()).add(target_id)
+
+    missing = [
+        through(**{source_field: source_id, target_field: target_id})
+        for source_id, targets in links.items()
+        for target_id in targets - current.get(source_id, set())
+    ]
+    surplus = [
+        (source_id, target_id)
+        for source_id, targets in current.items()
+        for target_id in targets - links[source_id]
+    ]
+    if missing:
+        through.objects.bulk_create(missing, ignore_conflicts=True)
+    removed = 0
+    if surplus:
+        pairs = Q(pk__in=[])
+        for source_id, target_id in surplus:
+            pairs |= Q(**{source_field: source_id, target_field: target_id})
+        removed, _ = through.objects.filter(pairs).delete()
+    return len(missing), removed
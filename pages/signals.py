@@ -0,0 +1,77 @@
+from django.core.signals import request_finished
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_delete, post_migrate, m2m_changed
+
+from . import facets, inbox, prerender, search, sqlite
+from .cache import bump_version, versions_bumped
+from .images import schedule_derivatives
+from .models import Project, Technology, Skill, Experience
+
+# Models whose rows are rendered on the public pages
+CONTENT_MODELS = (Project, Technology, Skill, Experience)
+
+
+def content_changed(sender, **kwargs):
+    """Invalidate cached pages that render the changed model, once the change is visible to other requests"""
+    # Bumping before the commit would let a concurrent request cache the old rows under the new key
+    transaction.on_commit(lambda: bump_version(sender))
+
+
+def project_technologies_changed(sender, action, **kwargs):
+    """Adding or removing a project's technologies changes both sides of the link"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(lambda: bump_version(Project, Technology))
+
+
+def image_saved(sender, instance, update_fields=None, **kwargs):
+    """Build resized variants of a new or replaced upload off the request path"""
+    if update_fields is None or 'image' in update_fields:
+        schedule_derivatives(instance)
+
+
+def restore_search_indexes(sender, using, **kwargs):
+    """SQLite drops the full-text triggers whenever a migration rebuilds an indexed table"""
+    if sender.name == 'pages':
+        inbox.ensure_search_index(connections[using])
+        search.ensure_search_index(connections[using])
+
+
+for model in CONTENT_MODELS:
+    post_save.connect(content_changed, sender=model, dispatch_uid=f'pages.content_saved.{model.__name__}')
+    post_delete.connect(content_changed, sender=model, dispatch_uid=f'pages.content_deleted.{model.__name__}')
+
+# Site search documents
+for model in (Project, Experience, Skill):
+    post_save.connect(search.content_saved, sender=model, dispatch_uid=f'pages.search_saved.{model.__name__}')
+    post_delete.connect(search.content_deleted, sender=model, dispatch_uid=f'pages.search_deleted.{model.__name__}')
+post_save.connect(search.technology_saved, sender=Technology, dispatch_uid='pages.search_technology_saved')
+pre_delete.connect(search.technology_deleting, sender=Technology, dispatch_uid='pages.search_technology_deleting')
+post_delete.connect(search.technology_deleted, sender=Technology, dispatch_uid='pages.search_technology_deleted')
+
+for model in (Project, Experience):
+    post_save.connect(image_saved, sender=model, dispatch_uid=f'pages.image_saved.{model.__name__}')
+
+versions_bumped.connect(prerender.versions_bumped, dispatch_uid='pages.prerender_affected_pages')
+
+connection_created.connect(sqlite.configure, dispatch_uid='pages.sqlite_configure')
+request_finished.connect(sqlite.optimize_if_due, dispatch_uid='pages.sqlite_optimize')
+
+post_migrate.connect(restore_search_indexes, dispatch_uid='pages.restore_search_indexes')
+
+m2m_changed.connect(
+    project_technologies_changed,
+    sender=Project.technologies.through,
+    dispatch_uid='pages.project_technologies_changed',
+)
+# After the handler above, so its on_commit update runs after the bump it checks for
+m2m_changed.connect(
+    facets.links_changed,
+    sender=Project.technologies.through,
+    dispatch_uid='pages.facets_links_changed',
+)
+m2m_changed.connect(
+    search.technologies_changed,
+    sender=Project.technologies.through,
+    dispatch_uid='pages.search_technologies_changed',
+)
@@ -0,0 +1,210 @@
+"""
+Write-behind spool for contact form submissions.
+
+When CONTACT_SPOOL_DIR is set, the contact view appends each validated
+submission as one JSON line to a local spool file and fsyncs it before
+responding, instead of waiting on the database. flush() later moves the
+spool aside and writes it to the database with bulk_create. It runs from a
+background thread in each worker, from the flush_contact_spool command, or
+from both.
+
+Every record carries a submission_id that is unique in the database, so a
+spool file that is replayed after a crash never creates duplicate messages.
+Lines that cannot be read back (a write torn by a crash, or a record that
+does not fit the model) are moved to a rejected file for inspection instead
+of being dropped.
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import ContactMessage
+
+logger = logging.getLogger(__name__)
+
+SPOOL_NAME = 'contact.jsonl'
+REJECTED_NAME = 'rejected.jsonl'
+PROCESSING_SUFFIX = '.processing'
+
+_flusher_lock = threading.Lock()
+_flusher = None
+
+
+def enabled():
+    return bool(getattr(settings, 'CONTACT_SPOOL_DIR', ''))
+
+
+def spool_dir():
+    path = Path(settings.CONTACT_SPOOL_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@contextmanager
+def _file_lock(name, blocking=True):
+    """Cross-process lock on a sibling lock file; yields False if not acquired"""
+    fd = os.open(spool_dir() / name, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def submit(cleaned_data):
+    """Durably append one validated submission to the spool"""
+    record = {
+        'submission_id': str(uuid.uuid4()),
+        'created_at': timezone.now().isoformat(),
+        'name': cleaned_data['name'],
+        'email': cleaned_data['email'],
+        'subject': cleaned_data['subject'],
+        'message': cleaned_data['message'],
+    }
+    line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+
+    directory = spool_dir()
+    path = directory / SPOOL_NAME
+    with _file_lock('spool.lock'):
+        created = not path.exists()
+        fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            if _ends_mid_line(fd):
+                # A crash tore the last write; keep this record off that line
+                line = b'\n' + line
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        if created:
+            # Make the new directory entry itself durable
+            _fsync_dir(directory)
+
+    ensure_flusher()
+    return record['submission_id']
+
+
+def _ends_mid_line(fd):
+    size = os.fstat(fd).st_size
+    return bool(size) and os.pread(fd, 1, size - 1) != b'\n'
+
+
+def _append_durably(path, data):
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    try:
+        os.write(fd, data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _claim_spool(directory):
+    """Atomically move the live spool aside so writers start a fresh file"""
+    path = directory / SPOOL_NAME
+    with _file_lock('spool.lock'):
+        if path.exists() and path.stat().st_size:
+            path.rename(directory / f'contact-{time.time_ns()}.jsonl{PROCESSING_SUFFIX}')
+
+
+def _read_records(path):
+    rejected = []
+    with open(path, 'rb') as spool_file:
+        for line_number, line in enumerate(spool_file, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                message = ContactMessage(
+                    submission_id=uuid.UUID(record['submission_id']),
+                    created_at=datetime.fromisoformat(record['created_at']),
+                    name=record['name'],
+                    email=record['email'],
+                    subject=record['subject'],
+                    message=record['message'],
+                )
+            except (KeyError, TypeError, ValueError):
+                # A line torn by a crash mid-write, which submit() leaves on its own line, or a bad record
+                logger.warning('Rejecting unreadable line %d in %s', line_number, path)
+                rejected.append(line if line.endswith(b'\n') else line + b'\n')
+                continue
+            yield message
+    if rejected:
+        # Durable before the caller removes the spool file they came from
+        _append_durably(path.parent / REJECTED_NAME, b''.join(rejected))
+
+
+def flush(batch_size=500):
+    """Write every spooled submission to the database; returns how many were read"""
+    directory = spool_dir()
+    flushed = 0
+    with _file_lock('flush.lock', blocking=False) as acquired:
+        if not acquired:
+            # Another worker or the management command is already flushing
+            return 0
+
+        _claim_spool(directory)
+        for path in sorted(directory.glob(f'*{PROCESSING_SUFFIX}')):
+            batch = []
+            with transaction.atomic():
+                for message in _read_records(path):
+                    batch.append(message)
+                    if len(batch) >= batch_size:
+                        ContactMessage.objects.bulk_create(batch, ignore_conflicts=True)
+                        flushed += len(batch)
+                        batch = []
+                if batch:
+                    ContactMessage.objects.bulk_create(batch, ignore_conflicts=True)
+                    flushed += len(batch)
+            path.unlink()
+    return flushed
+
+
+def _flush_forever(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            flush()
+        except Exception:
+            logger.exception('Contact spool flush failed; will retry')
+        finally:
+            close_old_connections()
+
+
+def ensure_flusher():
+    """Start this process's background flusher thread, once"""
+    global _flusher
+    interval = getattr(settings, 'CONTACT_SPOOL_FLUSH_INTERVAL', 0)
+    if not interval or (_flusher is not None and _flusher.is_alive()):
+        return
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(
+                target=_flush_forever, args=(interval,), name='contact-spool-flusher', daemon=True
+            )
+            _flusher.start()
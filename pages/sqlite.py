@@ -0,0 +1,71 @@
+"""
+Tuned SQLite for single-node deployments, enabled with SQLITE_TUNED.
+
+With Django's defaults every gunicorn worker opens SQLite per request in
+rollback-journal mode with synchronous=FULL, so a session or contact write
+locks readers out and every commit waits for two fsyncs. configure() runs on
+each new connection and switches it to WAL (readers no longer wait for the
+writer), synchronous=NORMAL (one fsync per checkpoint instead of per commit,
+still safe against corruption in WAL mode), memory-mapped reads, a larger
+page cache and a busy timeout so a writer waits for the lock instead of
+failing. Transactions start with BEGIN IMMEDIATE: a deferred transaction
+that reads and then writes cannot wait for the write lock, and fails with
+"database is locked" whatever the busy timeout. optimize_if_due() runs
+PRAGMA optimize on persistent connections every SQLITE_OPTIMIZE_INTERVAL
+seconds, so the query planner's statistics follow the data.
+"""
+import time
+from types import MethodType
+
+from django.conf import settings
+from django.db import connections
+
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('mmap_size', 256 * 1024 * 1024),
+    ('busy_timeout', 5000),
+    # Negative: in KiB rather than pages
+    ('cache_size', -32 * 1024),
+    ('temp_store', 'MEMORY'),
+)
+
+
+def enabled():
+    return getattr(settings, 'SQLITE_TUNED', False)
+
+
+def _begin_immediate(self):
+    self.cursor().execute('BEGIN IMMEDIATE')
+
+
+def configure(sender, connection, **kwargs):
+    """connection_created hook"""
+    if connection.vendor != 'sqlite' or not enabled():
+        return
+    # The raw sqlite3 connection, so the pragmas skip query logging and execute wrappers
+    cursor = connection.connection.cursor()
+    try:
+        for name, value in PRAGMAS:
+            cursor.execute(f'PRAGMA {name} = {value}')
+        # Cheap on a new connection; only looks at tables the planner has reason to
+        cursor.execute('PRAGMA optimize = 0x10002')
+    finally:
+        cursor.close()
+    connection._start_transaction_under_autocommit = MethodType(_begin_immediate, connection)
+    connection.sqlite_optimized_at = time.monotonic()
+
+
+def optimize_if_due(sender=None, **kwargs):
+    """request_finished hook: PRAGMA optimize on this thread's connections once per interval"""
+    if not enabled():
+        return
+    interval = getattr(settings, 'SQLITE_OPTIMIZE_INTERVAL', 3600)
+    now = time.monotonic()
+    for connection in connections.all(initialized_only=True):
+        last = getattr(connection, 'sqlite_optimized_at', None)
+        if connection.vendor != 'sqlite' or connection.connection is None or last is None:
+            continue
+        if now - last >= interval and not connection.in_atomic_block:
+            connection.connection.execute('PRAGMA optimize')
+            connection.sqlite_optimized_at = now
@@ -0,0 +1,102 @@
+"""
+Static files storage that optimises images during collectstatic.
+
+On top of WhiteNoise's hashed, precompressed (gzip, plus Brotli when the
+``Brotli`` package is installed) storage, every PNG/JPEG found by
+collectstatic is:
+
+* re-encoded losslessly with Pillow's optimiser when that makes a PNG smaller;
+* resized to each of STATIC_IMAGE_WIDTHS narrower than the original and
+  written as PNG/JPEG, WebP and - when Pillow has AVIF support - AVIF.
+
+Variants are named ``<stem>.<width>w.<ext>`` and go through the normal
+hashing, so they are served with far-future cache headers like any other
+static file. A sidecar ``image-variants.json`` in STATIC_ROOT lists them for
+the ``{% picture %}`` template tag.
+"""
+import json
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, features
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+VARIANTS_MANIFEST = 'image-variants.json'
+SOURCE_EXTENSIONS = {'.png': 'png', '.jpg': 'jpeg', '.jpeg': 'jpeg'}
+
+
+def variant_formats(source_format):
+    """(extension, Pillow format, save options) for each variant type"""
+    formats = [
+        ('png', 'PNG', {'optimize': True}) if source_format == 'png'
+        else ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+        ('webp', 'WEBP', {'quality': 82, 'method': 6}),
+    ]
+    if features.check('avif'):
+        formats.append(('avif', 'AVIF', {'quality': 60}))
+    return formats
+
+
+def encode(image, pil_format, options):
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+class OptimizedStaticFilesStorage(CompressedManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        variants = {}
+        if not dry_run:
+            variants = self.write_image_variants(paths)
+        yield from super().post_process(paths, dry_run, **options)
+        if not dry_run:
+            if self.exists(VARIANTS_MANIFEST):
+                self.delete(VARIANTS_MANIFEST)
+            self._save(VARIANTS_MANIFEST, ContentFile(json.dumps(variants, indent=1).encode()))
+
+    def _replace(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
+
+    def write_image_variants(self, paths):
+        """Optimise source images and add resized variants to ``paths`` so they get hashed too"""
+        widths = getattr(settings, 'STATIC_IMAGE_WIDTHS', (64, 128, 256, 512))
+        manifest = {}
+        for name in sorted(paths):
+            stem, ext = posixpath.splitext(name)
+            source_format = SOURCE_EXTENSIONS.get(ext.lower())
+            if source_format is None:
+                continue
+            storage, path = paths[name]
+            with storage.open(path) as source:
+                original = source.read()
+            image = Image.open(BytesIO(original))
+            image.load()
+
+            if source_format == 'png':
+                # Lossless, so safe to apply to the file templates link to directly
+                optimized = encode(image, 'PNG', {'optimize': True})
+                if len(optimized) < len(original):
+                    self._replace(name, optimized)
+                    paths[name] = (self, name)
+
+            entry = {'width': image.width, 'height': image.height, 'variants': {}}
+            for width in [w for w in widths if w < image.width] + [image.width]:
+                resized = image if width == image.width else image.resize(
+                    (width, round(image.height * width / image.width)), Image.LANCZOS
+                )
+                for variant_ext, pil_format, save_options in variant_formats(source_format):
+                    if width == image.width and variant_ext in ('png', 'jpg'):
+                        # The (optimised) original already covers this slot
+                        continue
+                    frame = resized if pil_format != 'JPEG' or resized.mode in ('RGB', 'L') else resized.convert('RGB')
+                    variant = f'{stem}.{width}w.{variant_ext}'
+                    self._replace(variant, encode(frame, pil_format, save_options))
+                    paths[variant] = (self, variant)
+                    entry['variants'].setdefault(variant_ext, []).append([width, variant])
+            manifest[name] = entry
+        return manifest
@@ -0,0 +1,55 @@
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from pages.critical_css import critical_name
+
+register = template.Library()
+
+def _read_critical(name):
+    if settings.DEBUG:
+        # Straight from static/ so a rebuild shows up without a restart
+        path = finders.find(name)
+        if not path:
+            return ''
+        with open(path, encoding='utf-8') as critical:
+            return critical.read()
+    try:
+        with staticfiles_storage.open(name) as critical:
+            return critical.read().decode('utf-8')
+    except OSError:
+        return ''
+
+@lru_cache(maxsize=None)
+def _cached_critical(name):
+    return _read_critical(name)
+
+def critical_css_for(template_name):
+    """The extracted above-the-fold CSS for a page template, or '' if none was built"""
+    name = critical_name(template_name)
+    return _read_critical(name) if settings.DEBUG else _cached_critical(name)
+
+@register.simple_tag(takes_context=True)
+def critical_css(context, stylesheet='css/site.css'):
+    """
+    Inline the current page's critical CSS and load the full stylesheet
+    without blocking first paint, e.g. {% critical_css 'css/site.css' %}.
+    Falls back to a normal stylesheet link for pages without critical CSS.
+    """
+    href = static(stylesheet)
+    critical = critical_css_for(context.template.name) if context.template else ''
+    if not critical:
+        return format_html('<link rel="stylesheet" href="{}">', href)
+    return format_html(
+        '<style>{}</style>'
+        '<link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+        '<noscript><link rel="stylesheet" href="{}"></noscript>',
+        # CSS never legitimately contains "</", but it must not be able to close the <style> element
+        mark_safe(critical.replace('</', '<\\/')), href, href,
+    )
@@ -1,14 +1,11 @@
-import markdown
 from django import template
 from django.utils.safestring import mark_safe
 
+from pages.rendering import render_markdown
+
 register = template.Library()
 
 @register.filter(name='markdown')
 def markdown_filter(text):
     """Convert markdown text to HTML"""
-    if not text:
-        return ''
-    md = markdown.Markdown(extensions=['nl2br', 'fenced_code'])
-    return mark_safe(md.convert(text))
-
+    return mark_safe(render_markdown(text))
@@ -0,0 +1,86 @@
+import json
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from pages import images
+from pages.storage import VARIANTS_MANIFEST
+
+register = template.Library()
+
+STATIC_SOURCE_TYPES = (('avif', 'image/avif'), ('webp', 'image/webp'))
+
+@lru_cache(maxsize=1)
+def static_image_variants():
+    """The variants collectstatic wrote for static images, or {} before collectstatic"""
+    if settings.DEBUG:
+        # Static files come straight from the finders; variants only exist in STATIC_ROOT
+        return {}
+    try:
+        with staticfiles_storage.open(VARIANTS_MANIFEST) as manifest:
+            return json.load(manifest)
+    except (OSError, ValueError):
+        return {}
+
+@register.filter(name='srcset')
+def srcset_filter(image, fmt='webp'):
+    """srcset value for an image's generated derivatives, e.g. {{ project.image|srcset:"jpg" }}"""
+    return images.srcset(image, fmt)
+
+@register.simple_tag
+def responsive_image(image, alt='', css_class='', sizes='100vw', loading='lazy'):
+    """
+    Render an uploaded image as a <picture> that lets the browser pick the
+    smallest WebP/JPEG derivative matching ``sizes``. Falls back to the
+    original upload until derivatives have been generated.
+    """
+    if not image:
+        return ''
+    dimensions = ''
+    width_field, height_field = image.field.width_field, image.field.height_field
+    width = getattr(image.instance, width_field, None) if width_field else None
+    height = getattr(image.instance, height_field, None) if height_field else None
+    if width and height:
+        dimensions = format_html(' width="{}" height="{}"', width, height)
+
+    webp, jpg = images.srcset(image, 'webp'), images.srcset(image, 'jpg')
+    if not (webp or jpg):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}"{} loading="{}" decoding="async">',
+            image.url, alt, css_class, dimensions, loading,
+        )
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}"{} loading="{}" decoding="async"></picture>',
+        webp, sizes, image.url, jpg, sizes, alt, css_class, dimensions, loading,
+    )
+
+@register.simple_tag
+def picture(path, alt='', css_class='', sizes='100vw', loading='lazy'):
+    """
+    Render a static image as a <picture> offering the AVIF/WebP/resized
+    variants built by collectstatic, e.g.
+    {% picture 'images/jai_logo.png' alt='Logo' sizes='64px' %}
+    """
+    src = static(path)
+    entry = static_image_variants().get(path)
+    if not entry:
+        return format_html('<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">', src, alt, css_class, loading)
+
+    def srcset(candidates):
+        return ', '.join(f'{static(name)} {width}w' for width, name in candidates)
+
+    variants = entry['variants']
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((mime, srcset(variants[ext]), sizes) for ext, mime in STATIC_SOURCE_TYPES if ext in variants),
+    )
+    fallback = variants.get('png' if path.lower().endswith('.png') else 'jpg', []) + [[entry['width'], path]]
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" width="{}" height="{}" loading="{}" decoding="async"></picture>',
+        sources, src, srcset(fallback), sizes, alt, css_class, entry['width'], entry['height'], loading,
+    )
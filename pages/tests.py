@@ -1,3 +1,1636 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from django.utils.module_loading import import_string
+from PIL import Image
+
+from personalwebsite.backends.postgresql_pool import pool as db_pool
+
+from . import async_views
+from . import cache as page_cache
+from . import critical_css, facets, images, inbox, metrics, prerender, search, spool, sqlite, warmup
+from . import urls as page_urls
+from .models import Project, Technology, Skill, Experience, ContactMessage, SearchDocument
+from .rendering import render_markdown
+from .templatetags.responsive_images import static_image_variants
+
+
+def count_queries(client, url, **extra):
+    """Return the number of queries issued while serving a GET to url"""
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url, **extra)
+    assert response.status_code == 200, response.status_code
+    return len(ctx.captured_queries)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class PagesTestCase(TestCase):
+    """Base test case that renders templates without a collectstatic manifest"""
+
+    def setUp(self):
+        # Cached pages and version counters outlive the per-test transaction
+        cache.clear()
+        page_cache.reset_stats()
+
+
+@override_settings(PAGE_CACHE_ENABLED=False)
+class AboutPageTests(PagesTestCase):
+    """The about page groups skills in memory and has a fixed query budget"""
+
+    def create_content(self, per_category):
+        skills = []
+        for code, _ in Skill.CATEGORY_CHOICES:
+            for i in range(per_category):
+                skills.append(Skill(name=f'{code} skill {i}', category=code, icon='*', level=50, display_order=i))
+        Skill.objects.bulk_create(skills)
+        Experience.objects.bulk_create([
+            Experience(title=f'Role {i}', company='Company', start_date=date(2020, 1, 1), description='Did things', display_order=i)
+            for i in range(per_category)
+        ])
+
+    def test_skills_grouped_in_choice_order(self):
+        Skill.objects.create(name='Git', category='TOOL', icon='*', level=90)
+        Skill.objects.create(name='Python', category='LANG', icon='*', level=90)
+        Skill.objects.create(name='Django', category='FRAME', icon='*', level=90)
+
+        response = self.client.get(reverse('pages:about'))
+
+        grouped = response.context['skills_by_category']
+        self.assertEqual(list(grouped), ['Languages', 'Frameworks', 'Developer Tools'])
+        self.assertEqual([s.name for s in grouped['Languages']], ['Python'])
+
+    def test_query_count_independent_of_data_size(self):
+        url = reverse('pages:about')
+        self.client.get(url)
+
+        self.create_content(per_category=1)
+        small = count_queries(self.client, url)
+        small_partial = count_queries(self.client, url, HTTP_HX_REQUEST='true')
+
+        self.create_content(per_category=25)
+        self.assertEqual(count_queries(self.client, url), small)
+        self.assertEqual(count_queries(self.client, url, HTTP_HX_REQUEST='true'), small_partial)
+
+    def test_query_budget(self):
+        url = reverse('pages:about')
+        self.client.get(url)
+        self.create_content(per_category=10)
+
+        # One validator aggregate per model for the ETag, then one query each
+        # for skills and experiences
+        with self.assertNumQueries(4):
+            self.client.get(url)
+        with self.assertNumQueries(4):
+            self.client.get(url, HTTP_HX_REQUEST='true')
+
+
+@override_settings(PAGE_CACHE_ENABLED=False)
+class PortfolioPageTests(PagesTestCase):
+    """The portfolio page prefetches technologies and has a fixed query budget"""
+
+    def create_projects(self, count, techs_per_project):
+        technologies = Technology.objects.bulk_create([
+            Technology(name=f'Tech {Technology.objects.count()}-{i}') for i in range(techs_per_project)
+        ])
+        for i in range(count):
+            project = Project.objects.create(title=f'Project {i}', description='Built it', display_order=i)
+            project.technologies.set(technologies)
+
+    def test_featured_project_taken_from_listing(self):
+        Project.objects.create(title='Plain', description='x', display_order=1)
+        featured = Project.objects.create(title='Star', description='x', display_order=2, featured=True)
+        Project.objects.create(title='Later star', description='x', display_order=3, featured=True)
+
+        response = self.client.get(reverse('pages:portfolio'))
+
+        self.assertEqual(response.context['featured_project'], featured)
+
+    def test_query_count_independent_of_data_size(self):
+        url = reverse('pages:portfolio')
+        self.client.get(url)
+
+        self.create_projects(count=2, techs_per_project=1)
+        small = count_queries(self.client, url)
+        small_partial = count_queries(self.client, url, HTTP_HX_REQUEST='true')
+
+        self.create_projects(count=30, techs_per_project=6)
+        self.assertEqual(count_queries(self.client, url), small)
+        self.assertEqual(count_queries(self.client, url, HTTP_HX_REQUEST='true'), small_partial)
+
+    def test_technologies_list_uses_prefetch(self):
+        self.create_projects(count=3, techs_per_project=2)
+        projects = list(Project.objects.prefetch_related('technologies'))
+
+        with self.assertNumQueries(0):
+            names = [project.get_technologies_list() for project in projects]
+        self.assertEqual(names[0], ['Tech 0-0', 'Tech 0-1'])
+
+
+class PageCacheTests(PagesTestCase):
+    """Public pages are served from cache until a content model changes"""
+
+    def test_second_request_is_a_hit(self):
+        url = reverse('pages:about')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'HIT')
+        self.assertEqual(page_cache.stats()['hits'], 1)
+        self.assertEqual(page_cache.stats()['misses'], 1)
+
+    def test_partial_cached_separately(self):
+        url = reverse('pages:portfolio')
+        full = self.client.get(url)
+        partial = self.client.get(url, HTTP_HX_REQUEST='true')
+
+        self.assertEqual(partial['X-Page-Cache'], 'MISS')
+        self.assertNotIn(b'<html', partial.content)
+        self.assertIn(b'<html', full.content)
+        self.assertIn('HX-Request', full['Vary'])
+
+    def test_save_invalidates_dependent_pages_only(self):
+        about, portfolio = reverse('pages:about'), reverse('pages:portfolio')
+        self.client.get(about)
+        self.client.get(portfolio)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(name='Rust', category='LANG', icon='*', level=70)
+
+        response = self.client.get(about)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'Rust')
+        self.assertEqual(self.client.get(portfolio)['X-Page-Cache'], 'HIT')
+
+    def test_m2m_change_invalidates_portfolio(self):
+        project = Project.objects.create(title='Site', description='x')
+        url = reverse('pages:portfolio')
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            project.technologies.add(Technology.objects.create(name='HTMX'))
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'HTMX')
+
+    def test_versions_bumped_on_commit(self):
+        url = reverse('pages:about')
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(name='Rust', category='LANG', icon='*', level=70)
+            # Still the old versions: another connection would read the old rows here,
+            # and that page must not be cached under the key of the new content
+            self.assertEqual(self.client.get(url)['X-Page-Cache'], 'HIT')
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'Rust')
+
+    def test_staff_bypass_cache(self):
+        User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.login(username='admin', password='pw')
+        url = reverse('pages:home')
+
+        self.client.get(url)
+        self.assertNotIn('X-Page-Cache', self.client.get(url))
+
+    def test_query_string_is_normalized(self):
+        url = reverse('pages:portfolio')
+        self.assertEqual(self.client.get(url + '?tech=Django&match=&tech=Django')['X-Page-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url + '?tech=Django')['X-Page-Cache'], 'HIT')
+        self.assertEqual(self.client.get(url + '?tech=Django&tech=HTMX')['X-Page-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url + '?tech=HTMX&tech=Django')['X-Page-Cache'], 'MISS')
+
+    def test_unknown_query_parameters_bypass_cache(self):
+        url = reverse('pages:portfolio')
+        for query in ('?utm_source=a', '?utm_source=b'):
+            response = self.client.get(url + query)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('X-Page-Cache', response)
+        self.assertEqual(page_cache.stats()['misses'], 0)
+
+    def test_stats_endpoint_is_admin_only(self):
+        self.assertEqual(self.client.get(reverse('pages:cache_stats')).status_code, 403)
+
+        User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.login(username='admin', password='pw')
+        response = self.client.get(reverse('pages:cache_stats'))
+        self.assertEqual(set(response.json()), {'pid', 'hits', 'misses', 'hit_ratio'})
+
+
+class WarmUpTests(PagesTestCase):
+    """A new gunicorn worker loads templates and URLs and fills the page cache before serving"""
+
+    def test_warm_up_primes_public_pages(self):
+        summary = warmup.warm_up()
+
+        self.assertNotIn('failed', summary)
+        self.assertIn(f'{2 * len(warmup.PRIMED_PAGES)} primed pages', summary)
+        for name in warmup.PRIMED_PAGES:
+            self.assertEqual(self.client.get(reverse(name))['X-Page-Cache'], 'HIT')
+            self.assertEqual(self.client.get(reverse(name), HTTP_HX_REQUEST='true')['X-Page-Cache'], 'HIT')
+
+    def test_failing_step_does_not_stop_the_others(self):
+        with mock.patch.object(warmup, 'connect_databases', side_effect=RuntimeError('down')), \
+                self.assertLogs('pages.warmup', 'WARNING'):
+            summary = warmup.warm_up()
+
+        self.assertIn('database connections failed', summary)
+        self.assertIn('primed pages', summary)
+
+
+class ExperienceMarkdownTests(PagesTestCase):
+    """Experience descriptions are rendered once, on save"""
+
+    def create_experience(self, description):
+        return Experience.objects.create(title='Engineer', company='Acme', start_date=date(2021, 5, 1), description=description)
+
+    def test_description_html_rendered_on_save(self):
+        experience = self.create_experience('**Shipped** things')
+        self.assertEqual(experience.description_html, '<p><strong>Shipped</strong> things</p>')
+
+        experience.description = '- one\n- two'
+        experience.save(update_fields=['description'])
+        experience.refresh_from_db()
+        self.assertIn('<li>one</li>', experience.description_html)
+
+    def test_about_page_uses_stored_html(self):
+        experience = self.create_experience('plain')
+        Experience.objects.filter(pk=experience.pk).update(description_html='<p>stored copy</p>')
+
+        self.assertContains(self.client.get(reverse('pages:about')), '<p>stored copy</p>')
+
+    def test_render_markdown_command_backfills(self):
+        experience = self.create_experience('*old row*')
+        Experience.objects.filter(pk=experience.pk).update(description_html='')
+
+        call_command('render_markdown', stdout=StringIO())
+
+        experience.refresh_from_db()
+        self.assertEqual(experience.description_html, '<p><em>old row</em></p>')
+
+    def test_filter_output_is_cached_and_stable(self):
+        self.assertEqual(render_markdown('a\nb'), '<p>a<br />\nb</p>')
+        self.assertIs(render_markdown('a\nb'), render_markdown('a\nb'))
+
+
+class ConditionalGetTests(PagesTestCase):
+    """Content pages answer revalidation with 304 until their models change"""
+
+    def test_unchanged_page_returns_304(self):
+        Skill.objects.create(name='Python', category='LANG', icon='*', level=90)
+        url = reverse('pages:about')
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as ctx:
+            revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.content, b'')
+        self.assertFalse(any('pages_skill"."name' in q['sql'] for q in ctx.captured_queries))
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_deleting_an_older_row_is_not_modified_since(self):
+        older = Project.objects.create(title='Old', description='x')
+        Project.objects.create(title='Site', description='x')
+        url = reverse('pages:portfolio')
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+
+        older.delete()
+        # The newest updated_at is unchanged; only the ETag can tell
+        since = http_date(time.time() + 60)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_partial_and_full_have_different_etags(self):
+        url = reverse('pages:about')
+        full = self.client.get(url)
+        partial = self.client.get(url, HTTP_HX_REQUEST='true')
+
+        self.assertNotEqual(full['ETag'], partial['ETag'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=full['ETag'], HTTP_HX_REQUEST='true').status_code, 200)
+
+    def test_content_changes_update_etag(self):
+        project = Project.objects.create(title='Site', description='x')
+        url = reverse('pages:portfolio')
+        etag = self.client.get(url)['ETag']
+
+        project.technologies.add(Technology.objects.create(name='Django'))
+        technology_added = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(technology_added.status_code, 200)
+
+        project.delete()
+        self.assertNotEqual(self.client.get(url)['ETag'], technology_added['ETag'])
+
+    def test_etag_ignores_unread_query_parameters(self):
+        url = reverse('pages:portfolio')
+        etag = self.client.get(url + '?tech=Django')['ETag']
+        self.assertEqual(self.client.get(url + '?tech=Django&utm_source=x&match=')['ETag'], etag)
+        self.assertNotEqual(self.client.get(url + '?tech=Django&match=any')['ETag'], etag)
+
+    def test_home_page_is_conditional(self):
+        url = reverse('pages:home')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class GuestModeTests(PagesTestCase):
+    """Unauthenticated visitors are served as a sessionless guest"""
+
+    def test_cold_visit_writes_nothing(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('pages:home'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'].username, 'guest')
+        self.assertFalse(Session.objects.exists())
+        self.assertFalse(User.objects.filter(username='guest').exists())
+        self.assertNotIn('sessionid', response.cookies)
+
+    def test_guest_is_not_admin(self):
+        response = self.client.get(reverse('pages:experiences'))
+        self.assertRedirects(response, reverse('pages:login'))
+
+    def test_logged_in_admin_keeps_identity(self):
+        User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.login(username='admin', password='pw')
+
+        response = self.client.get(reverse('pages:experiences'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'].username, 'admin')
+
+    def test_clear_guest_sessions_command(self):
+        guest = User.objects.create_user('guest')
+        admin = User.objects.create_user('admin', is_staff=True)
+        for user in (guest, guest, guest, admin):
+            session = SessionStore()
+            session[SESSION_KEY] = str(user.pk)
+            session.create()
+
+        call_command('clear_guest_sessions', batch_size=2, stdout=StringIO())
+
+        remaining = [s.get_decoded()[SESSION_KEY] for s in Session.objects.all()]
+        self.assertEqual(remaining, [str(admin.pk)])
+
+
+class ContactSubmissionTests(PagesTestCase):
+    """Contact POSTs are validated and either saved directly or spooled"""
+
+    submission = {'name': 'Ada', 'email': 'ada@example.com', 'subject': 'Hi', 'message': 'Hello there'}
+
+    def setUp(self):
+        super().setUp()
+        self.spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_dir)
+
+    def test_saved_directly_without_spool(self):
+        response = self.client.post(reverse('pages:contact'), self.submission, HTTP_HX_REQUEST='true')
+
+        self.assertContains(response, 'Thank you Ada!')
+        self.assertEqual(ContactMessage.objects.get().subject, 'Hi')
+
+    def test_invalid_submission_not_saved(self):
+        self.client.post(reverse('pages:contact'), {**self.submission, 'email': 'not-an-email'})
+        self.assertFalse(ContactMessage.objects.exists())
+
+    def test_spooled_then_flushed(self):
+        with self.settings(CONTACT_SPOOL_DIR=self.spool_dir, CONTACT_SPOOL_FLUSH_INTERVAL=0):
+            for _ in range(3):
+                response = self.client.post(reverse('pages:contact'), self.submission, HTTP_HX_REQUEST='true')
+                self.assertContains(response, 'Thank you Ada!')
+            self.assertFalse(ContactMessage.objects.exists())
+            self.assertEqual(len((Path(self.spool_dir) / spool.SPOOL_NAME).read_text().splitlines()), 3)
+
+            call_command('flush_contact_spool', batch_size=2, stdout=StringIO())
+
+            self.assertEqual(ContactMessage.objects.count(), 3)
+            self.assertEqual(list(Path(self.spool_dir).glob('*.jsonl*')), [])
+
+    def test_replayed_spool_does_not_duplicate(self):
+        with self.settings(CONTACT_SPOOL_DIR=self.spool_dir, CONTACT_SPOOL_FLUSH_INTERVAL=0):
+            spool.submit(self.submission)
+            live = Path(self.spool_dir) / spool.SPOOL_NAME
+            saved_copy = live.read_bytes()
+            self.assertEqual(spool.flush(), 1)
+
+            # Simulate a crash after commit but before the processing file was removed
+            (Path(self.spool_dir) / f'contact-1.jsonl{spool.PROCESSING_SUFFIX}').write_bytes(saved_copy)
+            spool.flush()
+
+        self.assertEqual(ContactMessage.objects.count(), 1)
+
+    def test_malformed_records_are_rejected_not_dropped(self):
+        directory = Path(self.spool_dir)
+        with self.settings(CONTACT_SPOOL_DIR=self.spool_dir, CONTACT_SPOOL_FLUSH_INTERVAL=0):
+            spool.submit(self.submission)
+            bad = ['{"submission_id": "not-a-uuid"}', '["a", "list"]', '{"name": "Ada"}']
+            with open(directory / spool.SPOOL_NAME, 'a') as live:
+                live.write('\n'.join(bad) + '\n')
+            spool.submit(self.submission)
+
+            self.assertEqual(spool.flush(), 2)
+
+        self.assertEqual(ContactMessage.objects.count(), 2)
+        self.assertEqual((directory / spool.REJECTED_NAME).read_text().splitlines(), bad)
+        self.assertEqual(list(directory.glob(f'*{spool.PROCESSING_SUFFIX}')), [])
+
+    def test_submit_after_a_torn_write_starts_a_new_line(self):
+        directory = Path(self.spool_dir)
+        with self.settings(CONTACT_SPOOL_DIR=self.spool_dir, CONTACT_SPOOL_FLUSH_INTERVAL=0):
+            spool.submit(self.submission)
+            # A crash part way through the next write
+            with open(directory / spool.SPOOL_NAME, 'a') as live:
+                live.write('{"submission_id": "5f0e')
+            spool.submit({**self.submission, 'name': 'Grace'})
+
+            self.assertEqual(spool.flush(), 2)
+
+        self.assertEqual(sorted(ContactMessage.objects.values_list('name', flat=True)), ['Ada', 'Grace'])
+        self.assertEqual((directory / spool.REJECTED_NAME).read_text(), '{"submission_id": "5f0e\n')
+
+
+def png_upload(name='shot.png', size=(1000, 500)):
+    buffer = BytesIO()
+    Image.new('RGBA', size, (200, 30, 30, 255)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ImageDerivativeTests(PagesTestCase):
+    """Uploads get resized WebP/JPEG variants and a srcset in the templates"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = self.settings(MEDIA_ROOT=media_root, IMAGE_DERIVATIVE_WIDTHS=(96, 384, 2000))
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_dimensions_stored_on_save(self):
+        project = Project.objects.create(title='Site', description='x', image=png_upload())
+        self.assertEqual((project.image_width, project.image_height), (1000, 500))
+
+    def test_generate_derivatives_skips_upscaling(self):
+        project = Project.objects.create(title='Site', description='x', image=png_upload())
+
+        self.assertEqual(images.generate_derivatives(project.image), 4)
+        self.assertEqual(images.generate_derivatives(project.image), 0)
+
+        name = images.derivative_name(project.image.name, 384, 'webp')
+        with project.image.storage.open(name) as derivative:
+            self.assertEqual(Image.open(derivative).size, (384, 192))
+        self.assertFalse(project.image.storage.exists(images.derivative_name(project.image.name, 2000, 'jpg')))
+
+    def test_srcset_built_from_recorded_widths(self):
+        project = Project.objects.create(title='Site', description='x', image=png_upload())
+        self.assertEqual(images.srcset(project.image, 'webp'), '')
+        images.generate_derivatives(project.image)
+
+        project = Project.objects.get()
+        self.assertEqual(project.image_derivatives, {'name': project.image.name, 'widths': [96, 384]})
+        with mock.patch('django.core.files.storage.FileSystemStorage.exists') as exists:
+            candidates = images.srcset(project.image, 'jpg')
+        exists.assert_not_called()
+        self.assertEqual(candidates.count('w, '), 1)
+        self.assertIn(images.derivative_name(project.image.name, 384, 'jpg'), candidates)
+
+    def test_existing_derivatives_skip_decoding(self):
+        project = Project.objects.create(title='Site', description='x', image=png_upload())
+        images.generate_derivatives(project.image)
+
+        with mock.patch.object(Image.Image, 'load') as load:
+            self.assertEqual(images.generate_derivatives(project.image), 0)
+        load.assert_not_called()
+
+    def test_exif_rotation_decides_the_width(self):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        Image.new('RGB', (1000, 200)).save(buffer, 'JPEG', exif=exif)
+        project = Project.objects.create(
+            title='Site', description='x', image=SimpleUploadedFile('shot.jpg', buffer.getvalue(), content_type='image/jpeg'),
+        )
+
+        # Displayed 200 pixels wide once rotated, so only the 96w variant fits
+        self.assertEqual(images.generate_derivatives(project.image), 2)
+        self.assertEqual(images.recorded_widths(project.image), [96])
+
+    def test_derivatives_scheduled_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            experience = Experience.objects.create(
+                title='Engineer', company='Acme', start_date=date(2022, 1, 1), description='x', image=png_upload(),
+            )
+        # The page cache version bump and the derivative job
+        self.assertEqual(len(callbacks), 2)
+
+        # Run the job inline instead of on the background executor
+        images._generate_in_background(Experience, experience.pk, 'image')
+        experience.refresh_from_db()
+        self.assertIn('96w', images.srcset(experience.image, 'webp'))
+
+    def test_template_renders_picture_once_generated(self):
+        project = Project.objects.create(title='Site', description='x', image=png_upload())
+        url = reverse('pages:portfolio')
+        self.assertNotContains(self.client.get(url), '<picture>')
+
+        call_command('generate_image_derivatives', stdout=StringIO())
+
+        response = self.client.get(url)
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, images.derivative_name(project.image.name, 384, 'jpg'))
+        self.assertContains(response, 'width="1000" height="500"')
+
+
+class MediaServingTests(PagesTestCase):
+    """Uploads are streamed with validators, Range support and long-lived caching"""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = self.settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        (Path(self.media_root) / 'docs').mkdir()
+        (Path(self.media_root) / 'docs' / 'notes.txt').write_bytes(b'0123456789')
+
+    def test_full_response(self):
+        response = self.client.get('/media/docs/notes.txt')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_range_requests(self):
+        url = '/media/docs/notes.txt'
+        partial = self.client.get(url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(b''.join(partial.streaming_content), b'2345')
+        self.assertEqual(partial['Content-Range'], 'bytes 2-5/10')
+
+        suffix = self.client.get(url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(suffix.streaming_content), b'789')
+
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=50-').status_code, 416)
+        stale = self.client.get(url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"old"')
+        self.assertEqual(stale.status_code, 200)
+
+    def test_if_none_match(self):
+        url = '/media/docs/notes.txt'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_missing_and_traversal(self):
+        self.assertEqual(self.client.get('/media/docs/missing.txt').status_code, 404)
+        self.assertEqual(self.client.get('/media/docs').status_code, 404)
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+
+    def test_hashed_upload_is_immutable(self):
+        project = Project.objects.create(title='Site', description='x', image=png_upload('Shot.PNG'))
+        self.assertRegex(project.image.name, r'^projects/Shot\.[0-9a-f]{12}\.png$')
+
+        response = self.client.get(project.image.url)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'image/png')
+
+    def test_sendfile_delegation(self):
+        with self.settings(MEDIA_SENDFILE='x-accel-redirect'):
+            response = self.client.get('/media/docs/notes.txt')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/docs/notes.txt')
+        self.assertEqual(response.content, b'')
+
+
+@override_settings(STATIC_IMAGE_WIDTHS=(32,))
+class StaticImageOptimizationTests(PagesTestCase):
+    """collectstatic writes resized/modern-format variants that {% picture %} offers"""
+
+    def setUp(self):
+        super().setUp()
+        source_dir, static_root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source_dir)
+        self.addCleanup(shutil.rmtree, static_root)
+        (Path(source_dir) / 'images').mkdir()
+        Image.new('RGBA', (100, 50), (200, 30, 30, 255)).save(Path(source_dir) / 'images' / 'logo.png')
+        override = self.settings(
+            STATICFILES_DIRS=[source_dir],
+            STATIC_ROOT=static_root,
+            STATICFILES_STORAGE='pages.storage.OptimizedStaticFilesStorage',
+            DEBUG=False,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.static_root = Path(static_root)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        static_image_variants.cache_clear()
+        self.addCleanup(static_image_variants.cache_clear)
+
+    def test_variants_written_and_hashed(self):
+        manifest = json.loads((self.static_root / 'image-variants.json').read_text())
+        entry = manifest['images/logo.png']
+        self.assertEqual((entry['width'], entry['height']), (100, 50))
+        self.assertEqual(entry['variants']['webp'], [[32, 'images/logo.32w.webp'], [100, 'images/logo.100w.webp']])
+        self.assertEqual(entry['variants']['png'], [[32, 'images/logo.32w.png']])
+
+        hashed = list((self.static_root / 'images').glob('logo.32w.*.webp'))
+        self.assertEqual(len(hashed), 1)
+        with Image.open(hashed[0]) as variant:
+            self.assertEqual(variant.size, (32, 16))
+
+    def test_picture_tag(self):
+        html = Template("{% load responsive_images %}{% picture 'images/logo.png' alt='Logo' sizes='32px' %}").render(Context())
+
+        self.assertIn('<source type="image/webp"', html)
+        self.assertRegex(html, r'/static/images/logo\.32w\.[0-9a-f]{12}\.webp 32w')
+        self.assertIn('width="100" height="50"', html)
+
+
+class CriticalCssTests(PagesTestCase):
+    """Pages inline their above-the-fold CSS and load the full stylesheet asynchronously"""
+
+    def test_prune_keeps_used_rules(self):
+        css = (
+            '*,:after{--tw-x:0}.flex{display:flex}.grid{display:grid}.sm\\:h-16:hover{height:4rem}'
+            'ul{list-style:none}table{border-collapse:collapse}::backdrop{--tw-x:0}'
+            '@media (min-width:640px){.sm\\:flex{display:flex}.grid{gap:1rem}}'
+            '.animate-fade-in{animation:fadeIn .5s}@keyframes fadeIn{0%{opacity:0}}@keyframes spin{to{rotate:1turn}}'
+        )
+        critical, _ = critical_css.prune(css, {'flex', 'sm:h-16', 'sm:flex', 'animate-fade-in'}, {'ul'})
+
+        self.assertEqual(critical, (
+            '*,:after{--tw-x:0}.flex{display:flex}ul{list-style:none}'
+            '@media (min-width:640px){.sm\\:flex{display:flex}}'
+            '.animate-fade-in{animation:fadeIn .5s}@keyframes fadeIn{0%{opacity:0}}'
+        ))
+
+    def test_hidden_elements_are_not_above_the_fold(self):
+        markup = critical_css.visible_markup(
+            '<div class="hidden flex"><span class="loader"></span></div>'
+            '<ul class="hidden md:flex"><li class="text-white transition-colors"></li></ul>'
+            '<div style="display: none;"><img class="w-6"><p class="block"></p></div>'
+            "{% picture 'images/logo.png' css_class='h-14 object-contain' %}"
+        )
+        self.assertEqual(critical_css.used_classes(markup), {'hidden', 'md:flex', 'text-white', 'h-14', 'object-contain'})
+        self.assertEqual(critical_css.used_tags(markup), {'ul', 'li', 'picture', 'source', 'img'})
+
+    def test_build_fails_over_budget(self):
+        output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output)
+        with self.settings(CRITICAL_CSS_BUDGET=1000), self.assertRaisesMessage(CommandError, 'pages/home.html'):
+            call_command('build_critical_css', output=output, stdout=StringIO())
+        self.assertEqual(os.listdir(output), [])
+
+        call_command('build_critical_css', output=output, stdout=StringIO())
+        sizes = [path.stat().st_size for path in Path(output).iterdir()]
+        self.assertTrue(sizes)
+        self.assertLessEqual(max(sizes), 10 * 1024)
+
+    def test_above_the_fold_uses_layout_and_start_of_content(self):
+        classes = critical_css.used_classes(critical_css.above_the_fold('pages/portfolio.html', 3000))
+        self.assertIn('backdrop-blur-md', classes)  # header, from the base layout
+        self.assertNotIn('mt-16', classes)  # footer, far below the fold
+        # Nothing after the home page's screen-filling hero
+        self.assertNotIn('grid-cols-1', critical_css.used_classes(critical_css.above_the_fold('pages/home.html', 3000)))
+
+    @override_settings(DEBUG=True)
+    def test_page_inlines_critical_css(self):
+        response = self.client.get(reverse('pages:about'))
+
+        self.assertContains(response, '<style>*,:after,:before{')
+        self.assertContains(response, 'rel="preload"')
+        self.assertContains(response, '<noscript><link rel="stylesheet"')
+
+    def test_falls_back_to_stylesheet_link(self):
+        # Nothing collected into STATIC_ROOT here, so there is no critical CSS to inline
+        response = self.client.get(reverse('pages:about'))
+
+        self.assertNotContains(response, '<style>*,:after,:before{')
+        self.assertContains(response, '<link rel="stylesheet" href="/static/css/site.css">')
+
+
+class IndexUsageTests(PagesTestCase):
+    """With realistic row counts the list queries read their ordering index instead of sorting"""
+
+    ROWS = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        Project.objects.bulk_create(
+            Project(title=f'P{i}', description='x', display_order=i % 50, featured=i % 500 == 0) for i in range(cls.ROWS)
+        )
+        Skill.objects.bulk_create(
+            Skill(name=f'S{i}', category=Skill.CATEGORY_CHOICES[i % 8][0], icon='*', level=50, display_order=i % 20)
+            for i in range(cls.ROWS)
+        )
+        Experience.objects.bulk_create(
+            Experience(title='E', company=f'C{i}', start_date=date(2000 + i % 25, 1, 1), description='x', display_order=i % 30)
+            for i in range(cls.ROWS)
+        )
+        ContactMessage.objects.bulk_create(
+            ContactMessage(name='N', email='n@example.com', subject='S', message='M', read=i % 100 != 0,
+                           created_at=now - timedelta(minutes=i))
+            for i in range(cls.ROWS)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        # SQLite reports a separate sort step; Postgres a Sort node
+        self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+        self.assertNotRegex(plan, r'(?m)^\s*(->\s*)?Sort\b')
+
+    def test_view_queries_use_ordering_indexes(self):
+        # The same querysets the about and portfolio views evaluate
+        self.assertUsesIndex(Project.objects.prefetch_related('technologies'), 'project_order_idx')
+        self.assertUsesIndex(Skill.objects.all(), 'skill_order_idx')
+        self.assertUsesIndex(Experience.objects.all(), 'experience_order_idx')
+        # The admin's first changelist page
+        self.assertUsesIndex(ContactMessage.objects.all()[:100], 'contact_created_idx')
+
+    def test_filtered_queries_use_partial_indexes(self):
+        self.assertUsesIndex(ContactMessage.objects.filter(read=False), 'contact_unread_idx')
+
+
+class ContactAdminTests(PagesTestCase):
+    """The message changelist pages by cursor, caps its counts and searches through the full-text index"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        now = timezone.now()
+        ContactMessage.objects.bulk_create(
+            ContactMessage(name=f'Sender {i}', email=f'sender{i}@example.com', subject='Hello',
+                           message='spam offer' if i % 2 else 'project enquiry', created_at=now - timedelta(minutes=i))
+            for i in range(250)
+        )
+        self.url = reverse('admin:pages_contactmessage_changelist')
+
+    def changelist(self, query=''):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    def test_keyset_pages_walk_the_inbox(self):
+        first = self.changelist()
+        self.assertEqual(len(first.result_list), 100)
+        self.assertIsNone(first.newer_url)
+
+        second = self.changelist(first.older_url)
+        third = self.changelist(second.older_url)
+        self.assertEqual(len(third.result_list), 50)
+        self.assertIsNone(third.older_url)
+
+        names = [m.name for cl in (first, second, third) for m in cl.result_list]
+        self.assertEqual(names, [f'Sender {i}' for i in range(250)])
+
+        back = self.changelist(third.newer_url)
+        self.assertEqual([m.pk for m in back.result_list], [m.pk for m in second.result_list])
+        self.assertEqual(back.older_url, second.older_url)
+
+    def test_counts_are_capped(self):
+        self.assertEqual(self.changelist().result_count_display, '250')
+        with mock.patch.object(inbox, 'COUNT_CAP', 100):
+            response = self.client.get(self.url)
+        self.assertContains(response, '100+ Contact Messages')
+
+    def test_search_uses_full_text_index(self):
+        cl = self.changelist('?q=enqu')
+        self.assertEqual(cl.result_count, 125)
+
+        message = ContactMessage.objects.get(name='Sender 0')
+        message.message = 'unrelated'
+        message.save()
+        ContactMessage.objects.filter(name='Sender 2').delete()
+        self.assertEqual(self.changelist('?q=enquiry').result_count, 123)
+        self.assertEqual(self.changelist('?q=sender1%40example.com').result_count, 1)
+
+    def test_search_matches_every_word_as_a_prefix(self):
+        self.assertEqual(self.changelist('?q=proj+enqu').result_count, 125)
+        self.assertEqual(self.changelist('?q=send+spa').result_count, 125)
+        self.assertEqual(self.changelist('?q=spa+enqu').result_count, 0)
+        # Query syntax is matched as text, not interpreted
+        self.assertEqual(self.changelist('?q=enqu%29+%7C+spam').result_count, 0)
+
+    def test_search_index_restored_after_table_rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER pages_contactmessage_fts_ai')
+        ContactMessage.objects.create(name='Late', email='late@example.com', subject='Hi', message='latecomer')
+
+        inbox.ensure_search_index(connection)
+        self.assertEqual(self.changelist('?q=latecomer').result_count, 1)
+
+    def post_action(self, action, selected=(), query='', **extra):
+        data = {'action': action, 'index': 0, '_selected_action': [m.pk for m in selected], **extra}
+        return self.client.post(self.url + query, data)
+
+    def test_bulk_read_and_archive_in_chunks(self):
+        with mock.patch.object(inbox, 'BULK_CHUNK_SIZE', 40), CaptureQueriesContext(connection) as queries:
+            # "Select all" across the filtered changelist, not just the visible page
+            self.post_action('mark_read', ContactMessage.objects.all()[:1], query='?q=spam', select_across=1)
+        self.assertEqual(ContactMessage.objects.filter(read=True).count(), 125)
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 4)
+
+        selected = ContactMessage.objects.order_by('pk')[:3]
+        self.post_action('archive', selected)
+        self.assertEqual(ContactMessage.objects.filter(archived=True).count(), 3)
+        self.assertEqual(self.changelist().result_count, 247)
+        self.assertEqual(self.changelist('?folder=archive').result_count, 3)
+
+        self.post_action('unarchive', selected, query='?folder=archive')
+        self.assertFalse(ContactMessage.objects.filter(archived=True).exists())
+
+    def test_bulk_delete_confirms_with_a_count(self):
+        response = self.post_action('delete_messages', ContactMessage.objects.all()[:1], query='?q=enquiry', select_across=1)
+        self.assertContains(response, 'permanently delete 125 messages')
+        self.assertEqual(ContactMessage.objects.count(), 250)
+
+        self.post_action('delete_messages', ContactMessage.objects.all()[:1], query='?q=enquiry', select_across=1, post='yes')
+        self.assertEqual(ContactMessage.objects.count(), 125)
+        self.assertEqual(self.changelist('?q=enquiry').result_count, 0)
+
+    def test_triage_command(self):
+        out = StringIO()
+        call_command('triage_contact_messages', 'delete', '--search', 'spam', '--chunk-size', '50', stdout=out)
+
+        self.assertIn('delete: 125 messages changed', out.getvalue())
+        self.assertIn('100 of 125 done', out.getvalue())
+        self.assertEqual(ContactMessage.objects.count(), 125)
+
+
+class SeedCommandTests(PagesTestCase):
+    """Seeding is a handful of set-based statements and leaves unchanged rows alone"""
+
+    def seed(self, command):
+        out = StringIO()
+        # Only the seeding statements count; search and cache invalidation run after commit
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                call_command(command, stdout=out)
+        return out.getvalue(), len(queries)
+
+    def test_seed_skills_upserts(self):
+        output, _ = self.seed('seed_skills')
+        self.assertIn('35 created, 0 updated, 0 unchanged', output)
+
+        Skill.objects.filter(name='Python').update(level=10)
+        version = page_cache.get_versions([Skill])
+        output, queries = self.seed('seed_skills')
+        self.assertIn('0 created, 1 updated, 34 unchanged', output)
+        self.assertLessEqual(queries, 4)
+        self.assertEqual(Skill.objects.get(name='Python').level, 95)
+        self.assertNotEqual(page_cache.get_versions([Skill]), version)
+
+    def test_seed_projects_syncs_technologies(self):
+        output, _ = self.seed('seed_projects')
+        self.assertIn('Project technologies: 22 added, 0 removed', output)
+        portfolio = Project.objects.get(title='Portfolio Website')
+        self.assertTrue(portfolio.featured)
+
+        portfolio.technologies.add(Technology.objects.create(name='COBOL'))
+        portfolio.technologies.remove(Technology.objects.get(name='Docker'))
+        version = page_cache.get_versions([Project])
+        output, queries = self.seed('seed_projects')
+
+        self.assertIn('Projects: 0 created, 0 updated, 4 unchanged', output)
+        self.assertIn('Project technologies: 1 added, 1 removed', output)
+        self.assertLessEqual(queries, 10)
+        self.assertNotIn('COBOL', portfolio.get_technologies_list())
+        self.assertIn('Docker', portfolio.get_technologies_list())
+        self.assertNotEqual(page_cache.get_versions([Project]), version)
+
+        _, queries = self.seed('seed_projects')
+        self.assertLessEqual(queries, 6)
+
+    def test_seeded_content_is_searchable(self):
+        self.seed('seed_skills')
+        self.seed('seed_projects')
+        self.assertEqual(SearchDocument.objects.filter(kind='skill').count(), 35)
+        self.assertEqual(SearchDocument.objects.filter(kind='project').count(), 4)
+        kinds = {result.kind for result in search.search('python')}
+        self.assertEqual(kinds, {'skill', 'project'})
+
+
+class ContentSyncTests(PagesTestCase):
+    """content export/import round-trips the site content and only writes what changed"""
+
+    def setUp(self):
+        super().setUp()
+        django_tech = Technology.objects.create(name='Django')
+        project = Project.objects.create(title='Site', description='A site', featured=True)
+        project.technologies.add(django_tech, Technology.objects.create(name='HTMX'))
+        Skill.objects.create(name='Python', category='LANG', icon='*', level=90)
+        Experience.objects.create(title='Engineer', company='Acme', start_date=date(2022, 1, 1), description='**Built** things')
+
+    def export(self):
+        out = StringIO()
+        call_command('content', 'export', stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def load(self, data):
+        path = Path(tempfile.mkdtemp()) / 'content.jsonl'
+        self.addCleanup(shutil.rmtree, path.parent)
+        path.write_text(data)
+        out = StringIO()
+        call_command('content', 'import', str(path), '--batch-size', '2', stdout=out)
+        return out.getvalue()
+
+    def test_round_trip_into_empty_database(self):
+        data = self.export()
+        self.assertEqual(len(data.splitlines()), 5)
+        for model in (Project, Technology, Skill, Experience):
+            model.objects.all().delete()
+
+        output = self.load(data)
+        self.assertIn('pages.project: 1 created, 0 updated, 0 unchanged', output)
+        self.assertIn('project technologies: 2 added, 0 removed', output)
+        project = Project.objects.get(title='Site')
+        self.assertEqual(sorted(project.get_technologies_list()), ['Django', 'HTMX'])
+        self.assertIn('<strong>Built</strong>', Experience.objects.get().description_html)
+
+    def test_reimport_writes_only_changes(self):
+        lines = [json.loads(line) for line in self.export().splitlines()]
+        self.assertIn('unchanged', self.load('\n'.join(json.dumps(line) for line in lines)))
+
+        for line in lines:
+            if line['model'] == 'pages.project':
+                line['fields']['technologies'] = ['Django', 'Tailwind']
+            if line['model'] == 'pages.skill':
+                line['fields']['level'] = 50
+        version = page_cache.get_versions([Skill])
+        output = self.load('\n'.join(json.dumps(line) for line in lines))
+
+        self.assertIn('pages.skill: 0 created, 1 updated, 0 unchanged', output)
+        self.assertIn('pages.project: 0 created, 0 updated, 1 unchanged', output)
+        self.assertIn('project technologies: 1 added, 1 removed', output)
+        self.assertEqual(Skill.objects.get().level, 50)
+        self.assertNotEqual(page_cache.get_versions([Skill]), version)
+
+    def test_bad_line_reports_its_number(self):
+        with self.assertRaisesMessage(CommandError, 'line 2'):
+            self.load('{"model": "pages.skill", "fields": {"name": "Go", "icon": "*", "level": 1}}\nnot json\n')
+
+    def test_bad_line_after_written_batch_still_invalidates(self):
+        version = page_cache.get_versions([Skill])
+        skill = '{"model": "pages.skill", "fields": {"name": "%s", "icon": "*", "level": 1}}\n'
+        with self.assertRaisesMessage(CommandError, 'line 4'):
+            self.load(skill % 'Go' + skill % 'Rust' + skill % 'Zig' + 'not json\n')
+
+        # The first batch was committed before the bad line was read
+        self.assertTrue(Skill.objects.filter(name='Rust').exists())
+        self.assertFalse(Skill.objects.filter(name='Zig').exists())
+        self.assertNotEqual(page_cache.get_versions([Skill]), version)
+        self.assertTrue(SearchDocument.objects.filter(kind='skill', title='Rust').exists())
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True, METRICS_TOKEN='scrape-token')
+class RequestMetricsTests(PagesTestCase):
+    """Server-Timing headers and the Prometheus endpoint"""
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+        Skill.objects.create(name='Python', category='LANG', icon='*', level=90)
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('pages:about'))
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn(f'desc="{len(queries)} queries"', timing)
+        self.assertRegex(timing, r'template;dur=(?!0\.0,)[\d.]+')
+        self.assertIn('view;dur=', timing)
+
+    def test_metrics_endpoint(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('pages:about'))
+            self.client.get(reverse('pages:about'))
+        query_count = len(queries)
+
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('pages_request_duration_seconds_bucket{view="pages:about",method="GET",le="+Inf"} 2', body)
+        self.assertIn('pages_requests_total{view="pages:about",method="GET",status="200"} 2', body)
+        self.assertIn(f'pages_db_queries_total{{view="pages:about",method="GET"}} {query_count}', body)
+        self.assertIn('pages_page_cache_hits_total 1', body)
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled_middleware_is_not_used(self):
+        response = self.client.get(reverse('pages:about'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+class PrerenderTests(PagesTestCase):
+    """Public pages written to disk and served before the session, auth and view layers"""
+
+    def setUp(self):
+        super().setUp()
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        override = self.settings(PRERENDER_DIR=str(self.root))
+        override.enable()
+        self.addCleanup(override.disable)
+        Skill.objects.create(name='Python', category='LANG', icon='*', level=90)
+
+    def test_command_writes_full_pages_and_partials(self):
+        out = StringIO()
+        call_command('prerender', stdout=out)
+
+        self.assertIn('Rendered 8 files', out.getvalue())
+        self.assertIn(b'<html', (self.root / 'about' / 'index.html').read_bytes())
+        partial = (self.root / 'about' / 'index.hx.html').read_bytes()
+        self.assertNotIn(b'<html', partial)
+        self.assertIn(b'Python', partial)
+        self.assertTrue((self.root / 'index.html').exists())
+
+    def test_cookieless_get_is_served_without_queries(self):
+        call_command('prerender', stdout=StringIO())
+        url = reverse('pages:about')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+            partial = self.client.get(url, HTTP_HX_REQUEST='true')
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response['X-Page-Cache'], 'PRERENDERED')
+        self.assertEqual(response.content, (self.root / 'about' / 'index.html').read_bytes())
+        self.assertEqual(partial.content, (self.root / 'about' / 'index.hx.html').read_bytes())
+        self.assertIn('Cookie', response['Vary'])
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+        self.assertEqual(not_modified.status_code, 304)
+
+    async def test_served_by_the_async_stack(self):
+        await sync_to_async(call_command)('prerender', stdout=StringIO())
+
+        response = await self.async_client.get(reverse('pages:portfolio'), headers={'HX-Request': 'true'})
+        self.assertEqual(response['X-Page-Cache'], 'PRERENDERED')
+        self.assertEqual(response.content, (self.root / 'portfolio' / 'index.hx.html').read_bytes())
+
+    def test_sessions_and_missing_files_get_the_views(self):
+        call_command('prerender', 'home', stdout=StringIO())
+        self.assertEqual(self.client.get(reverse('pages:about'))['X-Page-Cache'], 'MISS')
+        self.assertNotIn('X-Page-Cache', self.client.get(reverse('pages:home') + '?utm=x'))
+
+        User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.login(username='admin', password='pw')
+        response = self.client.get(reverse('pages:home'))
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertContains(response, 'Logout (admin)')
+
+    def test_content_change_rerenders_affected_pages(self):
+        call_command('prerender', stdout=StringIO())
+        portfolio = (self.root / 'portfolio' / 'index.html').stat().st_mtime_ns
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(name='Rust', category='LANG', icon='*', level=70)
+
+        self.assertIn(b'Rust', (self.root / 'about' / 'index.html').read_bytes())
+        self.assertIn(b'Rust', (self.root / 'about' / 'index.hx.html').read_bytes())
+        self.assertEqual((self.root / 'portfolio' / 'index.html').stat().st_mtime_ns, portfolio)
+
+    def test_failed_rerender_falls_back_to_the_view(self):
+        call_command('prerender', stdout=StringIO())
+
+        with mock.patch.object(prerender, 'render', side_effect=RuntimeError('boom')), \
+                self.assertLogs('pages.prerender', 'ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(name='Rust', category='LANG', icon='*', level=70)
+
+        self.assertFalse((self.root / 'about' / 'index.html').exists())
+        response = self.client.get(reverse('pages:about'))
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'Rust')
+
+
+class TunedSqliteTests(PagesTestCase):
+    """SQLITE_TUNED connections run in WAL mode with immediate transactions"""
+
+    def open_connection(self):
+        """A new connection to a scratch database file, so connection_created fires"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        wrapper = type(connections['default'])({**connection.settings_dict, 'NAME': str(Path(directory) / 'tuned.sqlite3')})
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        return wrapper.connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+    @override_settings(SQLITE_TUNED=True)
+    def test_tuned_connection(self):
+        wrapper = self.open_connection()
+
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -32 * 1024)
+        with CaptureQueriesContext(wrapper) as queries:
+            wrapper._start_transaction_under_autocommit()
+        self.assertEqual(queries[0]['sql'], 'BEGIN IMMEDIATE')
+        wrapper.connection.rollback()
+
+    @override_settings(SQLITE_TUNED=False)
+    def test_default_connection_is_untouched(self):
+        wrapper = self.open_connection()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 2)
+
+    @override_settings(SQLITE_TUNED=True, SQLITE_OPTIMIZE_INTERVAL=60)
+    def test_optimize_runs_once_per_interval(self):
+        wrapper = self.open_connection()
+        opened = wrapper.sqlite_optimized_at
+
+        with mock.patch.object(sqlite.connections, 'all', return_value=[wrapper]):
+            sqlite.optimize_if_due()
+            self.assertEqual(wrapper.sqlite_optimized_at, opened)
+            wrapper.sqlite_optimized_at -= 61
+            sqlite.optimize_if_due()
+        self.assertGreater(wrapper.sqlite_optimized_at, opened)
+
+
+class FakeConnection:
+    """Stand-in for a psycopg2 connection"""
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """The per-process connection pool behind the pooled Postgres backend"""
+
+    def setUp(self):
+        self.now = 0.0
+        self.opened = []
+
+    def connect(self):
+        self.opened.append(FakeConnection())
+        return self.opened[-1]
+
+    def make_pool(self, **options):
+        return db_pool.ConnectionPool(clock=lambda: self.now, **options)
+
+    def test_released_connections_are_reused(self):
+        pool = self.make_pool()
+        first = pool.acquire(self.connect)
+        pool.release(first)
+
+        self.assertIs(pool.acquire(self.connect), first)
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(pool.stats()['checkouts'], 2)
+        self.assertEqual(pool.stats()['in_use'], 1)
+
+    def test_full_pool_waits_then_times_out(self):
+        pool = db_pool.ConnectionPool(max_size=1, timeout=5)
+        held = pool.acquire(self.connect)
+        received = []
+        waiter = threading.Thread(target=lambda: received.append(pool.acquire(self.connect)))
+        waiter.start()
+        while not pool.stats()['waiting']:
+            time.sleep(0.001)
+        pool.release(held)
+        waiter.join()
+        self.assertEqual(received, [held])
+
+        pool.timeout = 0.01
+        with self.assertRaises(db_pool.PoolTimeout):
+            pool.acquire(self.connect)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_idle_connection_is_checked_before_reuse(self):
+        healthy = {}
+        pool = self.make_pool(check_interval=30, check=lambda conn: healthy.get(conn, False))
+        first = pool.acquire(self.connect)
+        pool.release(first)
+
+        self.now = 10
+        self.assertIs(pool.acquire(self.connect), first)
+        pool.release(first)
+
+        self.now = 100
+        second = pool.acquire(self.connect)
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['failed_checks'], 1)
+
+    def test_broken_and_expired_connections_are_closed(self):
+        pool = self.make_pool(max_lifetime=60, reset=lambda conn: not conn.closed)
+        broken = pool.acquire(self.connect)
+        broken.closed = True
+        pool.release(broken)
+        self.assertEqual(pool.stats()['size'], 0)
+
+        old = pool.acquire(self.connect)
+        self.now = 61
+        pool.release(old)
+        self.assertTrue(old.closed)
+        self.assertEqual(pool.stats()['closed'], 2)
+
+    def test_idle_connections_shrink_to_min_size(self):
+        pool = self.make_pool(min_size=1, max_idle=60)
+        held = [pool.acquire(self.connect) for _ in range(3)]
+        for conn in held:
+            pool.release(conn)
+        self.assertEqual(pool.stats()['idle'], 3)
+
+        self.now = 120
+        pool.release(pool.acquire(self.connect))
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_pool_metrics(self):
+        pool = self.make_pool(max_size=4)
+        pool.acquire(self.connect)
+        with mock.patch.dict(db_pool._pools, {'default': pool}):
+            body = metrics.render()
+        self.assertIn('pages_db_pool_in_use{alias="default"} 1', body)
+        self.assertIn('pages_db_pool_max_size{alias="default"} 4', body)
+        self.assertIn('pages_db_pool_checkouts_total{alias="default"} 1', body)
+
+
+@unittest.skipUnless(os.environ.get('POSTGRES_TEST_URL'), 'set POSTGRES_TEST_URL to run against a local Postgres')
+class PooledPostgresBackendTests(SimpleTestCase):
+    """The pooled backend against a real server, e.g. POSTGRES_TEST_URL=postgres://postgres@localhost/postgres"""
+
+    def setUp(self):
+        import dj_database_url
+        from personalwebsite.backends.postgresql_pool.base import DatabaseWrapper
+
+        settings_dict = dj_database_url.parse(os.environ['POSTGRES_TEST_URL'])
+        settings_dict.update(ENGINE='personalwebsite.backends.postgresql_pool', POOL={'max_size': 2})
+        self.wrapper = DatabaseWrapper(settings_dict, alias='pool-test')
+        self.addCleanup(db_pool._pools.pop, 'pool-test', None)
+        self.addCleanup(lambda: self.wrapper.pool.close())
+        self.addCleanup(self.wrapper.close)
+
+    def test_close_returns_the_connection_to_the_pool(self):
+        self.wrapper.ensure_connection()
+        raw = self.wrapper.connection
+        self.wrapper.close()
+
+        self.wrapper.ensure_connection()
+        self.assertIs(self.wrapper.connection, raw)
+        self.assertEqual(self.wrapper.pool.stats()['created'], 1)
+
+    def test_held_server_side_cursors_are_closed_on_release(self):
+        self.wrapper.ensure_connection()
+        cursor = self.wrapper.chunked_cursor()
+        cursor.execute('SELECT generate_series(1, 1000)')
+        self.assertEqual(len(cursor.fetchmany(10)), 10)
+        self.wrapper.close()
+
+        self.wrapper.ensure_connection()
+        with self.wrapper.connection.cursor() as raw:
+            raw.execute('SELECT count(*) FROM pg_cursors')
+            self.assertEqual(raw.fetchone()[0], 0)
+
+
+@unittest.skipUnless(os.environ.get('POSTGRES_TEST_URL'), 'set POSTGRES_TEST_URL to run against a local Postgres')
+class PostgresInboxSearchTests(SimpleTestCase):
+    """The inbox's tsquery matches prefixes on a real server, as FTS5 does on SQLite"""
+
+    def setUp(self):
+        import dj_database_url
+        import psycopg2
+
+        settings_dict = dj_database_url.parse(os.environ['POSTGRES_TEST_URL'])
+        self.connection = psycopg2.connect(
+            dbname=settings_dict['NAME'], user=settings_dict['USER'], password=settings_dict['PASSWORD'],
+            host=settings_dict['HOST'], port=settings_dict['PORT'] or None,
+        )
+        self.addCleanup(self.connection.close)
+
+    def matches(self, term, text='Sender 3 sender3@example.com Hello project enquiry'):
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT to_tsvector('english', %s) @@ to_tsquery('english', %s)", [text, inbox._pg_query(term)])
+            return cursor.fetchone()[0]
+
+    def test_every_word_matches_as_a_prefix(self):
+        self.assertTrue(self.matches('proj enqu'))
+        self.assertTrue(self.matches('Send hel'))
+        self.assertFalse(self.matches('proj spam'))
+
+    def test_stopwords_and_query_syntax_are_ignored(self):
+        self.assertTrue(self.matches('the enqu'))
+        self.assertTrue(self.matches("(enqu) & 'pro*"))
+        self.assertFalse(self.matches('enqu) | !spam'))
+
+
+class AsyncPagesURLConf:
+    """ROOT_URLCONF with the async public views swapped in, as ASYNC_VIEWS=True does"""
+    urlpatterns = [
+        path('', include(([
+            path(str(pattern.pattern), getattr(async_views, pattern.name, pattern.callback), name=pattern.name)
+            for pattern in page_urls.urlpatterns
+        ], 'pages'))),
+    ]
+
+
+class AsyncViewTests(PagesTestCase):
+    """The async public views match the sync ones and keep the cache and conditional GET behaviour"""
+
+    def setUp(self):
+        super().setUp()
+        Skill.objects.create(name='Python', category='LANG', icon='*', level=90)
+        Experience.objects.create(title='Engineer', company='Acme', start_date=date(2022, 1, 1), description='Built things')
+        project = Project.objects.create(title='Site', description='A site', featured=True)
+        project.technologies.add(Technology.objects.create(name='Django'))
+
+    def test_middleware_stack_is_async_capable(self):
+        for middleware in settings.MIDDLEWARE:
+            self.assertTrue(getattr(import_string(middleware), 'async_capable', False), middleware)
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    async def test_same_output_as_sync_views(self):
+        for name in ('home', 'about', 'portfolio', 'contact', 'search'):
+            for headers in ({}, {'HX-Request': 'true'}):
+                url = reverse(f'pages:{name}')
+                expected = await sync_to_async(self.client.get)(url, headers=headers)
+                with override_settings(ROOT_URLCONF=AsyncPagesURLConf):
+                    response = await self.async_client.get(url, headers=headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, expected.content, (name, headers))
+
+    @override_settings(ROOT_URLCONF=AsyncPagesURLConf)
+    async def test_page_cache_and_conditional_get(self):
+        url = reverse('pages:portfolio')
+        first = await self.async_client.get(url)
+        self.assertEqual(first['X-Page-Cache'], 'MISS')
+        second = await self.async_client.get(url)
+        self.assertEqual(second['X-Page-Cache'], 'HIT')
+
+        not_modified = await self.async_client.get(url, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+
+    @override_settings(ROOT_URLCONF=AsyncPagesURLConf)
+    async def test_contact_post_saves_message(self):
+        response = await self.async_client.post(reverse('pages:contact'), {
+            'name': 'Ada', 'email': 'ada@example.com', 'subject': 'Hi', 'message': 'Hello',
+        }, headers={'HX-Request': 'true'})
+        self.assertContains(response, 'Thank you Ada!')
+        self.assertEqual(await ContactMessage.objects.filter(email='ada@example.com').acount(), 1)
+
+    @override_settings(ROOT_URLCONF=AsyncPagesURLConf)
+    async def test_logged_in_admin_is_resolved_off_the_event_loop(self):
+        admin = await User.objects.acreate(username='admin', is_staff=True)
+        await sync_to_async(self.async_client.force_login)(admin)
+
+        response = await self.async_client.get(reverse('pages:about'))
+        self.assertContains(response, 'Logout (admin)')
+        self.assertNotIn('X-Page-Cache', response)
+
+
+class SiteSearchTests(PagesTestCase):
+    """/search/ finds projects, experiences and skills through the full-text index, kept in sync by signals"""
+
+    def setUp(self):
+        super().setUp()
+        self.django = Technology.objects.create(name='Django')
+        self.project = Project.objects.create(title='Recommendation engine', description='Ranks <items> for users')
+        self.project.technologies.add(self.django)
+        self.experience = Experience.objects.create(
+            title='Engineer', company='Acme', start_date=date(2022, 1, 1), description='Built a **recommendation** service',
+        )
+        self.skill = Skill.objects.create(name='Python', category='LANG', icon='*', level=90)
+
+    def hits(self, term, limit=search.RESULT_LIMIT):
+        return [(result.kind, result.object_id) for result in search.search(term, limit)]
+
+    def test_documents_follow_saves_links_and_deletes(self):
+        self.assertEqual(self.hits('django'), [('project', self.project.pk)])
+        self.assertEqual(self.hits('python'), [('skill', self.skill.pk)])
+
+        # Search results are cached until the versions are bumped on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.django.name = 'Flask'
+            self.django.save()
+        self.assertEqual(self.hits('django'), [])
+        self.assertEqual(self.hits('flask'), [('project', self.project.pk)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.django.projects.clear()
+        self.assertEqual(self.hits('flask'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.technologies.add(self.django)
+            self.django.delete()
+        self.assertEqual(self.hits('flask'), [])
+
+        self.project.delete()
+        self.skill.delete()
+        self.assertEqual(list(SearchDocument.objects.values_list('kind', flat=True)), ['experience'])
+
+    def test_title_matches_rank_first_and_are_highlighted(self):
+        results = search.search('Recommend')
+        self.assertEqual([result.kind for result in results], ['project', 'experience'])
+        self.assertEqual(results[0].title_html, '<mark>Recommendation</mark> engine')
+        # The markdown is indexed as text, and the document text is escaped around the marks
+        self.assertIn('<mark>recommendation</mark> service', results[1].snippet_html)
+        self.assertNotIn('**', results[1].snippet_html)
+        self.assertEqual(results[0].url, f'/portfolio/#project-{self.project.pk}')
+
+    def test_best_match_wins_over_newer_weaker_ones(self):
+        SearchDocument.objects.bulk_create(
+            SearchDocument(kind='skill', object_id=1000 + i, title=f'Skill {i}', body='Some recommendation work')
+            for i in range(30)
+        )
+        self.assertEqual(self.hits('recommendation', 1), [('project', self.project.pk)])
+
+    def test_postgres_prefix_survives_a_stopword(self):
+        # to_tsquery('english', 'the:*') is empty; the 'simple' config keeps the word as typed
+        sql, params = search._pg_query('rust the')
+        self.assertEqual(params, ['rust', 'the:*', 'the:*'])
+        self.assertIn("to_tsquery('simple', %s)", sql)
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(search.normalize('  "Django" AND (users*  '), 'django and users')
+        self.assertEqual(self.hits('"Django" AND'), [])
+        self.assertEqual(self.hits('Django) users*'), [('project', self.project.pk)])
+        self.assertEqual(self.hits('*** '), [])
+
+    def test_results_are_cached_per_normalized_query(self):
+        search.search('django')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(search.search('  DJANGO!')), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Project.objects.create(title='Django blog', description='Posts')
+        self.assertEqual(len(search.search('django')), 2)
+
+    def test_search_page_and_live_search_partial(self):
+        url = reverse('pages:search')
+        response = self.client.get(url, {'q': 'engine'})
+        self.assertContains(response, 'hx-get="/search/"')
+        self.assertContains(response, '<mark>engine</mark>', html=False)
+        self.assertContains(response, 'Ranks &lt;items&gt;')
+
+        partial = self.client.get(url, {'q': 'nothing here'}, headers={'HX-Request': 'true'})
+        self.assertNotContains(partial, '<html')
+        self.assertContains(partial, 'No results for')
+        self.assertNotContains(self.client.get(url), 'No results for')
+
+    def test_history_restore_gets_the_full_page(self):
+        restore = {'HX-Request': 'true', 'HX-History-Restore-Request': 'true'}
+        response = self.client.get(reverse('pages:search'), {'q': 'engine'}, headers=restore)
+        self.assertContains(response, '<html')
+        self.assertContains(response, '<mark>engine</mark>', html=False)
+
+    @override_settings(ROOT_URLCONF=AsyncPagesURLConf)
+    async def test_async_history_restore_gets_the_full_page(self):
+        restore = {'HX-Request': 'true', 'HX-History-Restore-Request': 'true'}
+        response = await self.async_client.get(reverse('pages:search'), {'q': 'engine'}, headers=restore)
+        self.assertContains(response, '<html')
+
+    def test_bulk_import_and_rebuild_command(self):
+        SearchDocument.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Updated 3 search documents', out.getvalue())
+        self.assertEqual(len(self.hits('acme')), 1)
+
+        path = Path(tempfile.mkdtemp()) / 'content.jsonl'
+        self.addCleanup(shutil.rmtree, path.parent)
+        path.write_text('{"model": "pages.skill", "fields": {"name": "Rust", "category": "LANG", "icon": "*", "level": 1}}\n')
+        call_command('content', 'import', str(path), stdout=StringIO())
+        self.assertEqual(len(self.hits('rust')), 1)
+
+    def test_admin_search_uses_index(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        Project.objects.create(title='Unrelated', description='Nothing to see')
+        response = self.client.get(reverse('admin:pages_project_changelist'), {'q': 'djan'})
+        self.assertEqual([project.pk for project in response.context['cl'].result_list], [self.project.pk])
+
+    def test_index_survives_table_rebuild(self):
+        search.drop_search_index(connection)
+        search.ensure_search_index(connection)
+        self.assertEqual(self.hits('acme'), [('experience', self.experience.pk)])
+
+
+class TechnologyFacetTests(PagesTestCase):
+    """/portfolio/?tech= filters through the in-memory technology index, which follows link changes"""
+
+    def setUp(self):
+        super().setUp()
+        self.python, self.django, self.react = (Technology.objects.create(name=name) for name in ('Python', 'Django', 'React'))
+        self.site = Project.objects.create(title='Site', description='A site')
+        self.site.technologies.add(self.python, self.django)
+        self.script = Project.objects.create(title='Script', description='A script')
+        self.script.technologies.add(self.python)
+        self.app = Project.objects.create(title='App', description='An app')
+        self.app.technologies.add(self.react)
+
+    def portfolio(self, query, **extra):
+        response = self.client.get(reverse('pages:portfolio') + query, **extra)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def titles(self, response):
+        return sorted(project.title for project in response.context['projects'])
+
+    def counts(self, response):
+        return {facet.name: facet.count for facet in response.context['facets']}
+
+    def test_bitmaps(self):
+        self.assertEqual(facets.members(facets.bitmap([70, 3, 1])), [1, 3, 70])
+        self.assertEqual(facets.members(0), [])
+
+    def test_match_all_and_any(self):
+        response = self.portfolio('?tech=Python&tech=Django')
+        self.assertEqual(self.titles(response), ['Site'])
+        self.assertEqual(self.counts(response), {'Django': 1, 'Python': 1, 'React': 0})
+
+        response = self.portfolio('?tech=Django&tech=React&match=any')
+        self.assertEqual(self.titles(response), ['App', 'Site'])
+        self.assertEqual(self.counts(response), {'Django': 1, 'Python': 2, 'React': 1})
+
+        response = self.portfolio('')
+        self.assertEqual(self.titles(response), ['App', 'Script', 'Site'])
+        self.assertEqual(self.counts(response), {'Django': 1, 'Python': 2, 'React': 1})
+
+    def test_chips_toggle_and_htmx_partial(self):
+        response = self.portfolio('?tech=Python', headers={'HX-Request': 'true'})
+        self.assertNotContains(response, '<html')
+        self.assertContains(response, 'hx-get="/portfolio/?tech=Python&amp;tech=Django"')
+        # The selected chip links to the page without it
+        self.assertContains(response, 'hx-get="/portfolio/"', count=2)
+        self.assertEqual(self.titles(response), ['Script', 'Site'])
+
+    def test_history_restore_gets_the_full_page(self):
+        partial = self.portfolio('?tech=Python', headers={'HX-Request': 'true'})
+        restore = self.portfolio('?tech=Python', headers={'HX-Request': 'true', 'HX-History-Restore-Request': 'true'})
+        self.assertContains(restore, '<html')
+        self.assertEqual(restore['X-Page-Cache'], 'MISS')
+        self.assertNotEqual(restore['ETag'], partial['ETag'])
+        self.assertEqual(restore['ETag'], self.portfolio('?tech=Python')['ETag'])
+        self.assertIn('HX-History-Restore-Request', restore['Vary'])
+
+    def test_unknown_technology(self):
+        response = self.portfolio('?tech=Cobol')
+        self.assertEqual(self.titles(response), [])
+        self.assertContains(response, 'No projects use all of the selected technologies.')
+        self.assertEqual(self.titles(self.portfolio('?tech=Cobol&tech=React&match=any')), ['App'])
+
+    def test_links_update_the_index_in_place(self):
+        index = facets.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.script.technologies.add(self.django)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.react.projects.add(self.site)
+        self.assertIs(facets.get_index(), index)
+        self.assertEqual(facets.members(index.matching(['Django'])), [self.site.pk, self.script.pk])
+        self.assertEqual(facets.members(index.matching(['React'])), [self.site.pk, self.app.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.python.projects.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.site.technologies.remove(self.django)
+        self.assertIs(facets.get_index(), index)
+        self.assertEqual(index.matching(['Python']), 0)
+        self.assertEqual(facets.members(index.matching(['Django'])), [self.script.pk])
+
+    def test_rebuilds_after_changes_it_did_not_see(self):
+        index = facets.get_index()
+        # As another worker would: the links change here, only the counters reach this process
+        Project.technologies.through.objects.create(project=self.app, technology=self.python)
+        page_cache.bump_version(Project, Technology)
+        rebuilt = facets.get_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(len(facets.members(rebuilt.matching(['Python']))), 3)
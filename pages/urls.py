@@ -1,18 +1,24 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'pages'
 
+# The public pages have async twins for ASGI deployments
+public = async_views if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
-    path('', views.home, name='home'),
-    path('about/', views.about, name='about'),
-    path('portfolio/', views.portfolio, name='portfolio'),
-    path('contact/', views.contact, name='contact'),
+    path('', public.home, name='home'),
+    path('about/', public.about, name='about'),
+    path('portfolio/', public.portfolio, name='portfolio'),
+    path('contact/', public.contact, name='contact'),
+    path('search/', public.search, name='search'),
     path('experiences/', views.experiences, name='experiences'),
     path('experiences/add/', views.add_experience, name='add_experience'),
     path('experiences/<int:experience_id>/edit/', views.edit_experience, name='edit_experience'),
     path('experiences/<int:experience_id>/delete/', views.delete_experience, name='delete_experience'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
+    path('cache-stats/', views.cache_stats, name='cache_stats'),
     path('favicon.ico', views.favicon, name='favicon'),
 ]
@@ -1,118 +1,149 @@
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.http import JsonResponse, HttpResponseForbidden, HttpResponse
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm
-from .models import Project, Skill, Experience, ContactMessage
-from .forms import ExperienceForm
+from .models import Project, Technology, Skill, Experience
+from .forms import ExperienceForm, ContactForm
+from . import facets
+from . import search as site_search
+from . import spool
+from . import cache as page_cache
+from .conditional import conditional_page
 
-def is_admin(user):
-    """Check if user is admin (not guest)"""
-    return user.is_authenticated and user.username != 'guest' and (user.is_staff or user.is_superuser)
+CONTACT_CONTEXT = {
+    'title': 'Get In Touch',
+    'name': 'Jai Ohri',
+    'contact_info': {
+        'email': 'ohri1@ualberta.ca',
+        'phone': '+1 (780) 600-1976',
+        'location': 'Edmonton, AB',
+        'linkedin': 'https://linkedin.com/in/jaiohri',
+        'github': 'https://github.com/jaiohri',
+        'twitter': 'https://twitter.com/jaiohri'
+    }
+}
 
-def home(request):
-    """Home page view"""
-    context = {
+# Page contexts are shared with the async views in async_views.py
+
+def home_context():
+    return {
         'title': 'Welcome to My Personal Website',
         'name': 'Jai Ohri',
         'tagline': 'AI Engineer building real-world production systems',
         'about': 'I am passionate about building intelligent systems that bridge AI research and real-world products.',
     }
-    return render(request, 'pages/home.html', context)
 
-def about(request):
-    """About page view"""
-    # Get skills and experience from database
-    skills = Skill.objects.all()
-    
-    # Group skills by category
-    skills_by_category = {}
-    for choice_code, choice_name in Skill.CATEGORY_CHOICES:
-        category_skills = skills.filter(category=choice_code)
-        if category_skills.exists():
-            skills_by_category[choice_name] = category_skills
-            
-    experience = Experience.objects.all()
-    
-    context = {
+def about_context(skills, experience):
+    return {
         'title': 'About Me',
         'name': 'Jai Ohri',
         'tagline': 'AI Engineer building real-world production systems',
         'about': 'Focused on building scalable AI systems and real production software.',
         'skills': skills, # Keep for backward compatibility if needed
-        'skills_by_category': skills_by_category,
+        # Grouped in memory from the one ordered query
+        'skills_by_category': Skill.group_by_category(skills),
         'experience': experience,
     }
-    
-    # Check if request is HTMX
-    if request.headers.get('HX-Request'):
-        return render(request, 'pages/about_content.html', context)
-    
-    return render(request, 'pages/about.html', context)
 
-def portfolio(request):
-    """Portfolio page view"""
-    # Get projects from database
-    projects = Project.objects.all()
-    featured_project = Project.objects.filter(featured=True).first()
-    
-    context = {
+def portfolio_context(projects, technology_facets=(), selected=(), match_all=True):
+    return {
         'title': 'My Portfolio',
         'name': 'Jai Ohri',
         'projects': projects,
-        'featured_project': featured_project,
+        'featured_project': next((project for project in projects if project.featured), None),
+        'facets': technology_facets,
+        'selected': selected,
+        'match_all': match_all,
+        'match_toggle_url': facets.filter_url(reverse('pages:portfolio'), selected, not match_all),
     }
-    
-    # Check if request is HTMX
+
+def portfolio_filter(request):
+    """Project queryset and context for the ?tech= filter, from the in-memory technology index"""
+    selected, match_all = facets.selection(request.GET)
+    ids, technology_facets = facets.facets(selected, match_all, request.path)
+    projects = Project.objects.prefetch_related('technologies')
+    if ids is not None:
+        projects = projects.filter(pk__in=ids)
+    return projects, {'technology_facets': technology_facets, 'selected': selected, 'match_all': match_all}
+
+def search_context(query, results):
+    return {
+        'title': 'Search',
+        'name': 'Jai Ohri',
+        'query': query,
+        'results': results,
+    }
+
+def render_page(request, template_name, partial_template_name, context):
+    """Render the full page, or just its content block for HTMX requests (but not history restores)"""
+    if page_cache.is_partial(request):
+        return render(request, partial_template_name, context)
+    return render(request, template_name, context)
+
+def contact_submitted(request):
+    """Acknowledge a contact form POST: an HTMX fragment, or None after queuing a flash message"""
+    message = f"Thank you {request.POST.get('name')}! Your message has been sent successfully."
     if request.headers.get('HX-Request'):
-        return render(request, 'pages/portfolio_content.html', context)
-    
-    return render(request, 'pages/portfolio.html', context)
+        return render(request, 'pages/contact_success.html', {'message': message})
+    messages.success(request, message)
+    return None
+
+def is_admin(user):
+    """Check if user is admin (not guest)"""
+    return user.is_authenticated and user.username != 'guest' and (user.is_staff or user.is_superuser)
+
+@conditional_page()
+@page_cache.cache_page_versioned()
+def home(request):
+    """Home page view"""
+    return render(request, 'pages/home.html', home_context())
+
+@conditional_page(Skill, Experience)
+@page_cache.cache_page_versioned(Skill, Experience)
+def about(request):
+    """About page view"""
+    # One ordered query per model; grouping happens in memory
+    skills = list(Skill.objects.all())
+    experience = list(Experience.objects.all())
+    return render_page(request, 'pages/about.html', 'pages/about_content.html', about_context(skills, experience))
 
+@conditional_page(Project, Technology, Project.technologies.through)
+@page_cache.cache_page_versioned(Project, Technology)
+def portfolio(request):
+    """Portfolio page view, filtered by ?tech= (and ?match=any)"""
+    # Load projects with their technologies in two queries total
+    projects, filters = portfolio_filter(request)
+    context = portfolio_context(list(projects), **filters)
+    return render_page(request, 'pages/portfolio.html', 'pages/portfolio_content.html', context)
+
+@page_cache.cache_page_versioned()
 def contact(request):
     """Contact page view"""
-    context = {
-        'title': 'Get In Touch',
-        'name': 'Jai Ohri',
-        'contact_info': {
-            'email': 'ohri1@ualberta.ca',
-            'phone': '+1 (780) 600-1976',
-            'location': 'Edmonton, AB',
-            'linkedin': 'https://linkedin.com/in/jaiohri',
-            'github': 'https://github.com/jaiohri',
-            'twitter': 'https://twitter.com/jaiohri'
-        }
-    }
-    
     if request.method == 'POST':
         # Handle form submission
-        name = request.POST.get('name')
-        email = request.POST.get('email')
-        subject = request.POST.get('subject')
-        message = request.POST.get('message')
+        form = ContactForm(request.POST)
         
-        # Save to database
-        if name and email and subject and message:
-            ContactMessage.objects.create(
-                name=name,
-                email=email,
-                subject=subject,
-                message=message
-            )
+        # Save to database, or to the local spool when write-behind is enabled
+        if form.is_valid():
+            if spool.enabled():
+                spool.submit(form.cleaned_data)
+            else:
+                form.save()
         
-        if request.headers.get('HX-Request'):
-            return render(request, 'pages/contact_success.html', {
-                'message': f'Thank you {name}! Your message has been sent successfully.'
-            })
-        else:
-            messages.success(request, f'Thank you {name}! Your message has been sent successfully.')
-    
-    # Check if request is HTMX
-    if request.headers.get('HX-Request'):
-        return render(request, 'pages/contact_content.html', context)
+        response = contact_submitted(request)
+        if response:
+            return response
     
-    return render(request, 'pages/contact.html', context)
+    return render_page(request, 'pages/contact.html', 'pages/contact_content.html', CONTACT_CONTEXT)
+
+def search(request):
+    """Search page view; HTMX live search gets just the results"""
+    query = request.GET.get('q', '').strip()
+    context = search_context(query, site_search.search(query))
+    return render_page(request, 'pages/search.html', 'pages/search_results.html', context)
 
 def add_experience(request):
     """Add a new experience entry - Admin only"""
@@ -232,6 +263,12 @@ def logout_view(request):
     messages.success(request, 'You have been logged out successfully.')
     return redirect('pages:home')
 
+def cache_stats(request):
+    """Page cache hit/miss counters for the serving process - Admin only"""
+    if not is_admin(request.user):
+        return HttpResponseForbidden()
+    return JsonResponse(page_cache.stats())
+
 def favicon(request):
     """Handle favicon requests - return 204 No Content"""
     return HttpResponse(status=204)
@@ -0,0 +1,119 @@
+"""
+Warm-up for a freshly started worker, run by gunicorn.conf.py before the
+worker accepts its first request.
+
+Without it the first visitor to each worker pays for compiling templates,
+compiling URL patterns, connecting to the database, loading the static
+manifest and rendering pages that are not in the page cache yet. Each step
+is independent and only logs a warning on failure, so a worker still starts
+if, say, the database is briefly unreachable.
+"""
+import logging
+import os
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.template.loader import get_template
+from django.test import RequestFactory
+from django.urls import URLResolver, get_resolver, reverse
+
+from . import prerender
+
+logger = logging.getLogger(__name__)
+
+# Public pages primed into the page cache, as full pages and HTMX partials
+PRIMED_PAGES = ('pages:home', 'pages:about', 'pages:portfolio', 'pages:contact')
+
+
+def template_dirs():
+    return [Path(apps.get_app_config('pages').path) / 'templates', Path(settings.BASE_DIR) / 'templates' / 'base']
+
+
+def load_templates():
+    """Compile every template in the project's template directories; returns how many"""
+    count = 0
+    for directory in template_dirs():
+        # Names are relative to the template root, which for templates/base is templates/
+        root = directory.parent if directory.name == 'base' else directory
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in filenames:
+                if filename.endswith('.html'):
+                    get_template(str(Path(dirpath, filename).relative_to(root)))
+                    count += 1
+    return count
+
+
+def resolve_urls():
+    """Compile every URL pattern and build the reverse lookup tables; returns the pattern count"""
+    def walk(resolver):
+        resolver.reverse_dict
+        count = 0
+        for entry in resolver.url_patterns:
+            entry.pattern.regex
+            count += walk(entry) if isinstance(entry, URLResolver) else 1
+        return count
+    return walk(get_resolver())
+
+
+def connect_databases():
+    """
+    Open this worker's database connections. They outlive the first request
+    when CONN_MAX_AGE is above 0, or go back to the connection pool when
+    Postgres runs on the pooled backend.
+    """
+    for connection in connections.all():
+        connection.ensure_connection()
+    return len(connections.all())
+
+
+def prime_pages():
+    """
+    Request the public pages through the full middleware stack as a
+    cookieless guest, so they are in the page cache and everything they use
+    (static manifest, critical CSS, image variants) is loaded; returns how
+    many responses were 200.
+    """
+    handler = WSGIHandler()
+    host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host and host != '*'), 'localhost')
+    factory = RequestFactory(SERVER_NAME=host)
+    ok = 0
+    for name in PRIMED_PAGES:
+        for headers in ({}, {'HX-Request': 'true'}):
+            response = handler.get_response(factory.get(reverse(name), headers=headers))
+            ok += response.status_code == 200
+    return ok
+
+
+def prerender_pages():
+    """
+    Re-render the pre-rendered pages, when PRERENDER_DIR is set, so a deploy
+    never serves files that reference the previous build's static assets;
+    returns how many files were written.
+    """
+    return len(prerender.render_pages()) if prerender.enabled() else 0
+
+
+def warm_up():
+    """Run every warm-up step; returns a one-line summary of what each did and how long it took"""
+    steps = (
+        ('templates', load_templates),
+        ('url patterns', resolve_urls),
+        ('database connections', connect_databases),
+        ('primed pages', prime_pages),
+        ('pre-rendered files', prerender_pages),
+    )
+    done = []
+    for label, step in steps:
+        started = time.perf_counter()
+        try:
+            result = step()
+        except Exception:
+            logger.warning('Warm-up step %r failed', label, exc_info=True)
+            done.append(f'{label} failed')
+            continue
+        done.append(f'{result} {label} in {(time.perf_counter() - started) * 1000:.0f} ms')
+    return ', '.join(done)
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'personalwebsite.settings')
+# Use the async public views (pages/async_views.py) unless explicitly turned off
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
@@ -0,0 +1,5 @@
+"""
+PostgreSQL backend that keeps a pool of psycopg2 connections per process.
+
+    DATABASES['default']['ENGINE'] = 'personalwebsite.backends.postgresql_pool'
+"""
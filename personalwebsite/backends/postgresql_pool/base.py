@@ -0,0 +1,77 @@
+"""
+Django's PostgreSQL backend, drawing connections from a per-process pool.
+
+Django still opens and closes "its" connection per request (CONN_MAX_AGE=0),
+but opening takes an already-authenticated connection from the pool and
+closing gives it back after rolling back anything left open, so a request
+pays for neither TCP, TLS nor authentication. Pool options come from the
+database's POOL setting (see ConnectionPool for their meaning):
+
+    'POOL': {'min_size': 1, 'max_size': 10, 'timeout': 10, 'max_lifetime': 1800,
+             'max_idle': 300, 'check_interval': 30}
+
+QuerySet.iterator() keeps using named server-side cursors; they are declared
+WITH HOLD outside transactions, so a connection that ran one has them closed
+before it returns to the pool.
+"""
+from django.db.backends.postgresql import base as postgresql
+from django.utils.asyncio import async_unsafe
+from psycopg2 import extensions
+
+from .pool import get_pool
+
+
+def check(connection):
+    """Health check for a connection that has been idle for a while"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    return True
+
+
+def reset(connection):
+    """Make a returned connection safe to hand to the next request; False if it is broken"""
+    if connection.closed:
+        return False
+    status = connection.info.transaction_status
+    if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    if status != extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+    return True
+
+
+class DatabaseWrapper(postgresql.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.held_cursors = False
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, check=check, reset=reset, **self.settings_dict.get('POOL', {}))
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        self.held_cursors = False
+        return self.pool.acquire(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+
+    @async_unsafe
+    def chunked_cursor(self):
+        self.held_cursors = True
+        return super().chunked_cursor()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            discard = False
+            if self.in_atomic_block:
+                # Django keeps referring to a connection closed mid-transaction, so it must not be reused
+                discard = True
+            elif self.held_cursors:
+                try:
+                    with self.connection.cursor() as cursor:
+                        cursor.execute('CLOSE ALL')
+                except postgresql.Database.Error:
+                    discard = True
+            self.held_cursors = False
+            self.pool.release(self.connection, discard=discard)
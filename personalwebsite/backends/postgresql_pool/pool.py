@@ -0,0 +1,226 @@
+"""
+A thread-safe pool of DB-API connections, one per database alias and process.
+
+Independent of Django and of the driver: the backend in base.py supplies the
+callables that open, health-check and reset psycopg2 connections, and tests
+can drive the pool with stand-in connection objects.
+
+Idle connections are handed out most recently used first, so under light
+load the same few stay warm and the rest age out past max_idle (down to
+min_size). A connection idle for longer than check_interval is health-checked
+before it is handed out; one older than max_lifetime is replaced when it is
+next returned. When max_size connections are in use, acquire() waits up to
+timeout seconds for one to come back and then raises PoolTimeout.
+
+Connections must not cross a fork: gunicorn.conf.py closes the pools in the
+master before forking, and a forked child starts with empty pools regardless.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool's timeout"""
+
+
+class _Entry:
+    __slots__ = ('connection', 'created', 'returned')
+
+    def __init__(self, connection, now):
+        self.connection = connection
+        self.created = now
+        self.returned = now
+
+
+class ConnectionPool:
+    def __init__(self, min_size=1, max_size=10, timeout=10.0, max_lifetime=30 * 60.0, max_idle=5 * 60.0,
+                 check_interval=30.0, check=None, reset=None, clock=time.monotonic):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(f'invalid pool size: min_size={min_size}, max_size={max_size}')
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+        self.check = check
+        self.reset = reset
+        self.clock = clock
+        self._condition = threading.Condition()
+        self._idle = deque()
+        self._in_use = {}
+        self._opening = 0
+        self._waiting = 0
+        self.counters = {'checkouts': 0, 'created': 0, 'closed': 0, 'failed_checks': 0, 'timeouts': 0, 'wait_seconds': 0.0}
+
+    @property
+    def size(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def acquire(self, connect):
+        """A connection from the pool, or a new one from connect() if there is room"""
+        deadline = self.clock() + self.timeout
+        started = None
+        while True:
+            with self._condition:
+                while not self._idle and self.size >= self.max_size:
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        self.counters['timeouts'] += 1
+                        raise PoolTimeout(f'no connection free after {self.timeout:g}s ({self.max_size} in use)')
+                    if started is None:
+                        started = self.clock()
+                    self._waiting += 1
+                    try:
+                        self._condition.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                if started is not None:
+                    self.counters['wait_seconds'] += self.clock() - started
+                    started = None
+                entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    self._opening += 1
+            if entry is None:
+                return self._open(connect)
+            # Checked outside the lock; a failed check discards the connection and tries again
+            if self._healthy(entry):
+                with self._condition:
+                    self._in_use[id(entry.connection)] = entry
+                    self.counters['checkouts'] += 1
+                return entry.connection
+
+    def _open(self, connect):
+        try:
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self._opening -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._opening -= 1
+            self._in_use[id(connection)] = _Entry(connection, self.clock())
+            self.counters['created'] += 1
+            self.counters['checkouts'] += 1
+        return connection
+
+    def _healthy(self, entry):
+        if self.check is None or self.clock() - entry.returned < self.check_interval:
+            return True
+        try:
+            if self.check(entry.connection):
+                return True
+        except Exception:
+            pass
+        with self._condition:
+            self.counters['failed_checks'] += 1
+        self._discard(entry.connection)
+        return False
+
+    def release(self, connection, discard=False):
+        """Return a connection; it is reset, or closed if broken, too old or discard is set"""
+        with self._condition:
+            entry = self._in_use.pop(id(connection), None)
+        if entry is None:
+            # Not ours (opened before a fork, or released twice)
+            return
+        now = self.clock()
+        if not discard and now - entry.created >= self.max_lifetime:
+            discard = True
+        if not discard and self.reset is not None:
+            try:
+                discard = not self.reset(connection)
+            except Exception:
+                discard = True
+        if discard:
+            self._discard(connection)
+            return
+        entry.returned = now
+        expired = []
+        with self._condition:
+            self._idle.append(entry)
+            # Oldest idle first; trim down to min_size
+            while len(self._idle) + len(self._in_use) > self.min_size and now - self._idle[0].returned >= self.max_idle:
+                expired.append(self._idle.popleft().connection)
+            self._condition.notify()
+        for stale in expired:
+            self._discard(stale, notify=False)
+
+    def _discard(self, connection, notify=True):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self.counters['closed'] += 1
+            if notify:
+                self._condition.notify()
+
+    def close(self):
+        """Close the idle connections; ones in use go back to the pool as usual"""
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for entry in idle:
+            self._discard(entry.connection, notify=False)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'waiting': self._waiting,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                **self.counters,
+            }
+
+    def _forget(self):
+        """After fork: the inherited connections belong to the parent"""
+        self._condition = threading.Condition()
+        _inherited.extend(self._idle)
+        _inherited.extend(self._in_use.values())
+        self._idle = deque()
+        self._in_use = {}
+        self._opening = self._waiting = 0
+
+
+# Connections inherited across a fork are kept referenced, never used or
+# closed: closing one would end the parent's session on the shared socket.
+_inherited = []
+
+
+def get_pool(alias, **options):
+    """The process-wide pool for a database alias, created on first use"""
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(**options)
+        return pool
+
+
+def pools():
+    with _pools_lock:
+        return dict(_pools)
+
+
+def close_all():
+    """Close every pool's idle connections, as gunicorn's master does before forking"""
+    for pool in pools().values():
+        pool.close()
+
+
+def _after_fork_in_child():
+    global _pools_lock
+    _pools_lock = threading.Lock()
+    for pool in _pools.values():
+        pool._forget()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -41,16 +41,21 @@ INSTALLED_APPS = [
     'pages',
 ]
 
+# The pages.middleware versions of Django's built-ins behave identically under
+# WSGI; under ASGI they run on the event loop without a thread hand-off per hook.
 MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Serve static files
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'pages.middleware.SecurityMiddleware',
+    # Above the pre-rendered pages, which skip everything below them
+    'pages.middleware.XFrameOptionsMiddleware',
+    'pages.middleware.StaticFilesMiddleware',  # Serve static files (WhiteNoise, async-capable)
+    'pages.middleware.PrerenderedPagesMiddleware',  # Pre-rendered public pages, when PRERENDER_DIR is set
+    'pages.middleware.SessionMiddleware',
+    'pages.middleware.CommonMiddleware',
+    'pages.middleware.CsrfViewMiddleware',
+    'pages.middleware.AuthenticationMiddleware',
     'pages.middleware.AutoGuestLoginMiddleware',  # Auto-login guests
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'pages.middleware.RequestMetricsMiddleware',  # Server-Timing and /metrics, when enabled
+    'pages.middleware.MessageMiddleware',
 ]
 
 ROOT_URLCONF = 'personalwebsite.urls'
@@ -80,6 +85,7 @@ WSGI_APPLICATION = 'personalwebsite.wsgi.application'
 # Database configuration
 # Supports both individual env vars and DATABASE_URL (Render provides this)
 import os
+import tempfile
 
 # Try DATABASE_URL first (Render auto-generates this when database is linked)
 database_url = os.environ.get('DATABASE_URL', '').strip()
@@ -118,6 +124,93 @@ else:
             }
         }
 
+# Pooled PostgreSQL (personalwebsite/backends/postgresql_pool) for both the
+# DATABASE_URL and the DB_* configuration: each gunicorn process keeps up to
+# DB_POOL_MAX_SIZE authenticated connections and lends one to each request,
+# instead of connecting (TCP, TLS, auth) per request or pinning one per thread.
+# DB_POOL_MAX_SIZE should cover the worker's threads; a request waits up to
+# DB_POOL_TIMEOUT seconds for a free connection.
+DB_POOL_ENABLED = config('DB_POOL_ENABLED', default=True, cast=bool)
+if DB_POOL_ENABLED and DATABASES['default']['ENGINE'] in ('django.db.backends.postgresql', 'django.db.backends.postgresql_psycopg2'):
+    DATABASES['default'].update({
+        'ENGINE': 'personalwebsite.backends.postgresql_pool',
+        # Connections go back to the pool at the end of every request
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': False,
+        'POOL': {
+            'min_size': config('DB_POOL_MIN_SIZE', default=1, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+            'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=30 * 60, cast=float),
+            'max_idle': config('DB_POOL_MAX_IDLE', default=5 * 60, cast=float),
+            'check_interval': config('DB_POOL_CHECK_INTERVAL', default=30, cast=float),
+        },
+    })
+
+# Tuned SQLite (pages/sqlite.py) for local and single-node deployments: WAL,
+# synchronous=NORMAL, mmap, a busy timeout, a larger page cache, BEGIN
+# IMMEDIATE transactions, persistent connections and a PRAGMA optimize every
+# SQLITE_OPTIMIZE_INTERVAL seconds. Opt-in, since WAL leaves -wal and -shm
+# files next to the database and needs a local (not network) filesystem.
+SQLITE_TUNED = config('SQLITE_TUNED', default=False, cast=bool)
+SQLITE_OPTIMIZE_INTERVAL = config('SQLITE_OPTIMIZE_INTERVAL', default=60 * 60, cast=int)
+if SQLITE_TUNED and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default'].setdefault('CONN_MAX_AGE', 600)
+    DATABASES['default'].setdefault('CONN_HEALTH_CHECKS', True)
+
+
+# Cache
+# The page cache in pages/cache.py keeps its version counters here, so every
+# gunicorn worker must see the same cache. The file-based default is shared by
+# all workers on one host; point CACHE_BACKEND at Redis/Memcached when scaling
+# out to several hosts.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=os.path.join(tempfile.gettempdir(), 'personalwebsite-cache')),
+    }
+}
+
+PAGE_CACHE_ENABLED = config('PAGE_CACHE_ENABLED', default=True, cast=bool)
+# Upper bound on how long an unreachable page entry lingers; invalidation is version based
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+
+# Mixed into page ETags so a deploy invalidates browser caches. Render sets
+# RENDER_GIT_COMMIT; elsewhere the newest template mtime is used.
+BUILD_ID = config('BUILD_ID', default=os.environ.get('RENDER_GIT_COMMIT', ''))
+
+
+# Contact form write-behind (pages/spool.py). When CONTACT_SPOOL_DIR is set,
+# submissions are fsynced to a local spool and bulk-inserted by a background
+# thread every CONTACT_SPOOL_FLUSH_INTERVAL seconds (0 disables the thread and
+# leaves flushing to `manage.py flush_contact_spool`).
+CONTACT_SPOOL_DIR = config('CONTACT_SPOOL_DIR', default='')
+CONTACT_SPOOL_FLUSH_INTERVAL = config('CONTACT_SPOOL_FLUSH_INTERVAL', default=5, cast=float)
+
+
+# Pre-rendered public pages (pages/prerender.py). When PRERENDER_DIR is set,
+# `manage.py prerender` and each gunicorn worker's warm-up write home, about,
+# portfolio and contact there as HTML, content edits re-render the pages they
+# affect, and cookieless GETs are answered from the files.
+PRERENDER_DIR = config('PRERENDER_DIR', default='')
+
+
+# Serve home, about, portfolio and contact from the async views in
+# pages/async_views.py. personalwebsite/asgi.py turns this on by default, so
+# the sync views stay in use under WSGI, where async views would each need a
+# thread hop, and the async ones under uvicorn.
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
+
+# Request metrics (pages.middleware.RequestMetricsMiddleware). When enabled,
+# responses carry a Server-Timing header and per-view latency histograms are
+# served in Prometheus format at METRICS_PATH, to admins or to scrapers sending
+# "Authorization: Bearer <METRICS_TOKEN>". When disabled the middleware drops
+# out of the stack at startup and costs nothing per request.
+REQUEST_METRICS_ENABLED = config('REQUEST_METRICS_ENABLED', default=False, cast=bool)
+METRICS_PATH = config('METRICS_PATH', default='/metrics')
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -159,13 +252,22 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-# WhiteNoise configuration for static files
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# WhiteNoise configuration for static files, plus image variants for {% picture %}
+STATICFILES_STORAGE = 'pages.storage.OptimizedStaticFilesStorage'
+STATIC_IMAGE_WIDTHS = (64, 128, 256, 512)
 
 # Media files (user uploaded content)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# pages.media.serve_media: content-hashed uploads are cached for a year as
+# immutable; anything else gets this max-age and revalidates with its ETag.
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=60 * 60, cast=int)
+# Set to 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache/lighttpd) to let the
+# front proxy stream media; MEDIA_SENDFILE_PREFIX is nginx's internal location.
+MEDIA_SENDFILE = config('MEDIA_SENDFILE', default='')
+MEDIA_SENDFILE_PREFIX = config('MEDIA_SENDFILE_PREFIX', default='/protected-media/')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 